@@ -0,0 +1,43 @@
+"""
+Benchmarks for the DQN agent: act() latency and replay() throughput
+"""
+
+import numpy as np
+from common import measure_latencies, measure_rate, result
+
+BATCH_SIZES = [32, 64, 128]
+
+
+def _agent(batch_size=64):
+    from agent.dqn_agent import DQNAgent
+
+    return DQNAgent(state_size=11, action_size=3, batch_size=batch_size)
+
+
+def _fill_memory(agent, transitions):
+    """Fill the replay memory with random transitions."""
+    rng = np.random.default_rng(0)
+    for _ in range(transitions):
+        state = rng.integers(0, 2, 11)
+        next_state = rng.integers(0, 2, 11)
+        agent.memory.append(state, rng.integers(3), rng.normal(), next_state, rng.random() < 0.05, agent.gamma)
+
+
+def run(quick=False):
+    """Measure greedy act() latency and replay() training steps/sec at several batch sizes."""
+    results = []
+
+    agent = _agent()
+    state = np.random.default_rng(0).integers(0, 2, 11)
+    p50, p99 = measure_latencies(lambda: agent.act(state, explore=False), 100 if quick else 1000)
+    results.append(result("agent.act.p50", p50, "ms", higher_is_better=False))
+    results.append(result("agent.act.p99", p99, "ms", higher_is_better=False))
+
+    for batch_size in BATCH_SIZES:
+        agent = _agent(batch_size)
+        _fill_memory(agent, 2000)
+        agent.replay()  # Build the training function outside the timed loop
+        rate = measure_rate(agent.replay, 20 if quick else 200, repeats=3)
+        results.append(result(f"agent.replay[batch={batch_size}]", rate, "steps/s", batch_size=batch_size))
+
+    return results
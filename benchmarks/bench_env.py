@@ -0,0 +1,87 @@
+"""
+Benchmarks for the Snake Game environment: step and get_state_for_agent throughput
+"""
+
+from common import measure_rate, result
+
+from game.snake import DOWN, LEFT, RIGHT, UP, SnakeGame
+
+# (width, height) in pixels with 20px cells: 20x15, 40x30 (default) and 80x60 grids
+GRID_SIZES = [(400, 300), (800, 600), (1600, 1200)]
+SNAKE_LENGTHS = [1, 10, 50, 200]
+
+# Movement for each direction, matching SnakeGame.step
+MOVES = {UP: (0, -1), RIGHT: (1, 0), DOWN: (0, 1), LEFT: (-1, 0)}
+
+
+def hamiltonian_cycle(grid_width, rows):
+    """
+    Cycle through every cell of the top `rows` rows (grid_width must be even):
+    right along row 0, then down and up the columns from right to left.
+    """
+    cycle = [(x, 0) for x in range(grid_width)]
+    for i, x in enumerate(range(grid_width - 1, -1, -1)):
+        column = range(1, rows) if i % 2 == 0 else range(rows - 1, 0, -1)
+        cycle.extend((x, y) for y in column)
+    return cycle
+
+
+class CycleRunner:
+    """
+    Keeps a snake of fixed length moving forever along a Hamiltonian cycle,
+    so step() and get_state_for_agent() can be timed at a given length.
+    The food sits in the bottom row, off the cycle, and is never eaten.
+    """
+
+    def __init__(self, width, height, length):
+        self.game = SnakeGame(width=width, height=height, max_steps_without_food=10**9)
+        game = self.game
+
+        cycle = hamiltonian_cycle(game.grid_width, game.grid_height - 1)
+        if length >= len(cycle):
+            raise ValueError(f"Snake length {length} does not fit a {game.grid_width}x{game.grid_height} grid")
+
+        # Relative action to take at each position of the cycle
+        directions = []
+        for i, (x, y) in enumerate(cycle):
+            next_x, next_y = cycle[(i + 1) % len(cycle)]
+            directions.append({move: d for d, move in MOVES.items()}[(next_x - x, next_y - y)])
+        self.actions = []
+        for i, direction in enumerate(directions):
+            turn = (direction - directions[i - 1]) % 4
+            self.actions.append({0: 0, 1: 1, 3: 2}[turn])
+
+        # Place the snake with its head at position `length - 1` of the cycle
+        game.reset()
+        game.snake = [cycle[i] for i in range(length - 1, -1, -1)]
+        game.direction = directions[length - 2] if length > 1 else directions[-1]
+        game.food = (0, game.grid_height - 1)
+        game.update_empty_cells()
+        game.empty_cells.discard(game.food)
+        self.position = length - 1
+
+    def step(self):
+        _, _, done, _ = self.game.step(self.actions[self.position])
+        self.position = (self.position + 1) % len(self.actions)
+        assert not done
+
+    def get_state(self):
+        self.game.get_state_for_agent()
+
+
+def run(quick=False):
+    """Measure step() and get_state_for_agent() calls/sec for each grid size and snake length."""
+    iterations = 500 if quick else 5000
+    results = []
+    for width, height in GRID_SIZES:
+        for length in SNAKE_LENGTHS:
+            runner = CycleRunner(width, height, length)
+            grid = f"{runner.game.grid_width}x{runner.game.grid_height}"
+            params = {"grid": grid, "length": length}
+
+            rate = measure_rate(runner.step, iterations)
+            results.append(result(f"env.step[{grid},len={length}]", rate, "steps/s", **params))
+
+            rate = measure_rate(runner.get_state, iterations)
+            results.append(result(f"env.get_state[{grid},len={length}]", rate, "calls/s", **params))
+    return results
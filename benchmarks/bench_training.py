@@ -0,0 +1,46 @@
+"""
+Benchmark for the end-to-end training loop: SnakeTrainer episodes per minute
+"""
+
+import contextlib
+import io
+import os
+import random
+import tempfile
+import time
+
+import numpy as np
+from common import result
+
+
+def run(quick=False):
+    """Train a fresh agent for a fixed number of short episodes, without checkpoints, and time it."""
+    from agent.trainer import SnakeTrainer
+
+    episodes = 3 if quick else 20
+    max_steps = 200
+
+    random.seed(0)
+    np.random.seed(0)
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        # Keep the trainer's progress output out of the benchmark report
+        with contextlib.redirect_stdout(io.StringIO()), contextlib.redirect_stderr(io.StringIO()):
+            trainer = SnakeTrainer(
+                model_name=os.path.join(tmp_dir, "model.h5"),
+                log_dir=tmp_dir,
+                episodes=episodes,
+                max_steps=max_steps,
+                save_freq=0,
+                continue_training=False,
+            )
+            start = time.perf_counter()
+            trainer.train()
+            elapsed = time.perf_counter() - start
+
+        steps = trainer.agent.train_count
+
+    return [
+        result("trainer.episodes_per_min", episodes / elapsed * 60, "episodes/min", episodes=episodes),
+        result("trainer.replay_steps_per_sec", steps / elapsed, "steps/s", episodes=episodes),
+    ]
@@ -0,0 +1,50 @@
+"""
+Benchmark for the web frame pipeline: render plus PNG/JPEG/WebP/base64 encoding frames per second
+"""
+
+from common import measure_rate, result
+
+from game.frames import FrameEncoder, surface_to_base64, surface_to_png
+from game.snake import SnakeGame
+
+# (width, height) of the rendered surface
+FRAME_SIZES = [(400, 300), (800, 600)]
+
+# Encoder settings compared with FrameEncoder: (label, format, options)
+ENCODERS = [
+    ("png1", "png", {"compress_level": 1}),
+    ("jpeg80", "jpeg", {"quality": 80}),
+    ("webp80", "webp", {"quality": 80}),
+]
+
+
+def run(quick=False):
+    """
+    Measure surface_to_png and surface_to_base64 alone, the other FrameEncoder
+    settings, and streaming encode together with render().
+    """
+    iterations = 10 if quick else 100
+    results = []
+    for width, height in FRAME_SIZES:
+        game = SnakeGame(width=width, height=height)
+        for action in [0] * 3 + [1] + [0] * 3:
+            game.step(action)
+        surface = game.render()
+        size = f"{width}x{height}"
+
+        rate = measure_rate(lambda: surface_to_png(surface), iterations)
+        results.append(result(f"web.surface_to_png[{size}]", rate, "frames/s", size=size))
+
+        rate = measure_rate(lambda: surface_to_base64(surface), iterations)
+        results.append(result(f"web.surface_to_base64[{size}]", rate, "frames/s", size=size))
+
+        for label, format, options in ENCODERS:
+            encoder = FrameEncoder(format, **options)
+            rate = measure_rate(lambda: encoder.encode(surface), iterations)
+            results.append(
+                result(f"web.encode_{label}[{size}]", rate, "frames/s", size=size, bytes=len(encoder.encode(surface)))
+            )
+
+        rate = measure_rate(lambda: surface_to_png(game.render()), iterations)
+        results.append(result(f"web.render_and_encode[{size}]", rate, "frames/s", size=size))
+    return results
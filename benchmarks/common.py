@@ -0,0 +1,90 @@
+"""
+Shared helpers for the Snake Game benchmarks
+"""
+
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+from importlib import metadata
+
+# Benchmarks import the game and agent packages from src/
+SRC_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src")
+if SRC_DIR not in sys.path:
+    sys.path.insert(0, SRC_DIR)
+
+# Headless: no window or audio device is needed to render surfaces
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+os.environ.setdefault("TF_CPP_MIN_LOG_LEVEL", "2")
+
+
+def result(name, value, unit, higher_is_better=True, **params):
+    """One benchmark measurement, as stored in the results JSON."""
+    return {"name": name, "value": value, "unit": unit, "higher_is_better": higher_is_better, "params": params}
+
+
+def measure_rate(fn, iterations, repeats=5, setup=None):
+    """
+    Call fn() `iterations` times per repeat and return the median rate in calls/sec.
+    setup(), if given, runs untimed before each repeat.
+    """
+    rates = []
+    for _ in range(repeats):
+        if setup:
+            setup()
+        start = time.perf_counter()
+        for _ in range(iterations):
+            fn()
+        rates.append(iterations / (time.perf_counter() - start))
+    return statistics.median(rates)
+
+
+def measure_latencies(fn, iterations, warmup=10):
+    """Time each of `iterations` calls to fn() after a warm-up; returns (p50, p99) in milliseconds."""
+    for _ in range(warmup):
+        fn()
+    samples = []
+    for _ in range(iterations):
+        start = time.perf_counter_ns()
+        fn()
+        samples.append(time.perf_counter_ns() - start)
+    samples.sort()
+    p50 = samples[len(samples) // 2]
+    p99 = samples[min(len(samples) - 1, int(len(samples) * 0.99))]
+    return p50 / 1e6, p99 / 1e6
+
+
+def _package_version(*names):
+    """Installed version of the first of the given distributions that is present."""
+    for name in names:
+        try:
+            return metadata.version(name)
+        except metadata.PackageNotFoundError:
+            continue
+    return None
+
+
+def machine_info():
+    """Describe the machine and software versions a run was measured on."""
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True, cwd=SRC_DIR
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+
+    return {
+        "hostname": platform.node(),
+        "platform": platform.platform(),
+        "machine": platform.machine(),
+        "processor": platform.processor(),
+        "cpu_count": os.cpu_count(),
+        "python": platform.python_version(),
+        "numpy": _package_version("numpy"),
+        "pygame": _package_version("pygame"),
+        "tensorflow": _package_version("tensorflow", "tensorflow-cpu", "tensorflow-macos"),
+        "git_commit": commit,
+    }
@@ -0,0 +1,89 @@
+#!/usr/bin/env python
+"""
+Snake Game Agent - Benchmark Comparison
+Compares a benchmark run against a stored baseline and flags regressions
+"""
+import argparse
+import json
+import sys
+
+
+def parse_args():
+    """Parse command line arguments."""
+    parser = argparse.ArgumentParser(description="Compare Snake Game benchmark results against a baseline")
+    parser.add_argument("--baseline", type=str, default="benchmarks/baseline.json", help="Baseline results JSON")
+    parser.add_argument(
+        "--current", type=str, default="benchmarks/results/latest.json", help="Results JSON to check"
+    )
+    parser.add_argument(
+        "--threshold", type=float, default=0.10, help="Relative slowdown flagged as a regression (default: 0.10)"
+    )
+    return parser.parse_args()
+
+
+def load_results(path):
+    with open(path, encoding="utf-8") as f:
+        report = json.load(f)
+    return report, {measurement["name"]: measurement for measurement in report["results"]}
+
+
+def compare(baseline, current, threshold):
+    """
+    Compare measurements present in both runs.
+    Returns rows of (name, baseline value, current value, relative change, status), where a
+    positive change always means better and status is "REGRESSION", "improved" or "ok".
+    """
+    rows = []
+    for name, base in baseline.items():
+        if name not in current:
+            continue
+        base_value, value = base["value"], current[name]["value"]
+        if not base_value:
+            continue
+        change = (value - base_value) / base_value
+        if not base["higher_is_better"]:
+            change = -change
+
+        if change < -threshold:
+            status = "REGRESSION"
+        elif change > threshold:
+            status = "improved"
+        else:
+            status = "ok"
+        rows.append((name, base_value, value, change, status))
+    return rows
+
+
+def main():
+    """Main function to compare benchmark results."""
+    args = parse_args()
+    baseline_report, baseline = load_results(args.baseline)
+    current_report, current = load_results(args.current)
+
+    for label, report in (("Baseline", baseline_report), ("Current", current_report)):
+        machine = report["machine"]
+        print(
+            f"{label}: {report['timestamp']} | {machine['hostname']} | {machine['processor'] or machine['machine']} "
+            f"| {machine['cpu_count']} CPUs | commit {machine['git_commit']}"
+        )
+    if baseline_report["machine"]["hostname"] != current_report["machine"]["hostname"]:
+        print("Warning: results come from different machines")
+
+    rows = compare(baseline, current, args.threshold)
+    print(f"{'Benchmark':<40} {'Baseline':>14} {'Current':>14} {'Change':>8}  Status")
+    for name, base_value, value, change, status in rows:
+        print(f"{name:<40} {base_value:>14.3f} {value:>14.3f} {change:>+7.1%}  {status}")
+
+    missing = sorted(set(baseline) - set(current))
+    if missing:
+        print(f"Not measured in the current run: {', '.join(missing)}")
+
+    regressions = [row for row in rows if row[4] == "REGRESSION"]
+    if regressions:
+        print(f"{len(regressions)} regression(s) beyond {args.threshold:.0%}")
+        sys.exit(1)
+    print(f"No regressions beyond {args.threshold:.0%}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,509 @@
+#!/usr/bin/env python
+"""
+Snake Game Agent - Web Server Load Test
+Starts main_web.py locally and simulates players and spectators against it
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import socket
+import subprocess
+import sys
+import time
+
+from common import SRC_DIR, machine_info, result
+
+# Keys players send while their game runs
+TURN_KEYS = ["up", "down", "left", "right"]
+
+# Seconds to wait for the server to answer after starting it (loading TensorFlow takes a while)
+STARTUP_TIMEOUT = 120.0
+
+
+def parse_args():
+    """Parse command line arguments."""
+    parser = argparse.ArgumentParser(description="Load test the Snake Game web server with simulated clients")
+    parser.add_argument("--players", type=int, default=50, help="Simulated players, each with their own game")
+    parser.add_argument(
+        "--spectators", type=int, default=0, help="Simulated spectators of the showcase game (needs --model)"
+    )
+    parser.add_argument(
+        "--client",
+        type=str,
+        default="stream",
+        choices=["stream", "poll"],
+        help="Players follow /state_stream like the browser client, or poll /get_game_state",
+    )
+    parser.add_argument(
+        "--poll-frames", action="store_true", help="Polling players also fetch the base64 frame of each state"
+    )
+    parser.add_argument(
+        "--command-rate", type=float, default=2.0, help="Key presses per second of each player (on average)"
+    )
+    parser.add_argument("--duration", type=float, default=30.0, help="Seconds measured after the ramp-up")
+    parser.add_argument("--ramp", type=float, default=5.0, help="Seconds over which clients connect")
+    parser.add_argument(
+        "--server",
+        type=str,
+        default="threaded",
+        choices=["threaded", "asyncio"],
+        help="Server mode of the started main_web.py",
+    )
+    parser.add_argument("--fps", type=int, default=10, help="Game ticks per second of the server")
+    parser.add_argument(
+        "--frame-format", type=str, default="png", choices=["png", "jpeg", "webp"], help="Frame encoding"
+    )
+    parser.add_argument("--model", type=str, default=None, help="Model of the showcase game watched by spectators")
+    parser.add_argument("--port", type=int, default=0, help="Server port (default: a free port)")
+    parser.add_argument(
+        "--output", type=str, default="benchmarks/results/load_latest.json", help="JSON file to save the report to"
+    )
+    return parser.parse_args()
+
+
+class LoadStats:
+    """
+    What the simulated clients measured, counted only once every client has
+    connected (except the time to a stream's first event, measured while connecting).
+    """
+
+    def __init__(self):
+        self.recording = False
+        self.latencies = {}  # Request kind -> [ms]
+        self.staleness = []  # ms between consecutive updates of a running game, as a client saw them
+        self.requests = 0
+        self.not_modified = 0
+        self.events = 0
+        self.bytes = 0
+        self.errors = 0
+        self.error_kinds = {}
+
+    def latency(self, kind, started):
+        if self.recording:
+            self.latencies.setdefault(kind, []).append((time.perf_counter() - started) * 1000)
+            self.requests += 1
+
+    def first_event(self, started):
+        self.latencies.setdefault("stream first event", []).append((time.perf_counter() - started) * 1000)
+
+    def update(self, last_update, now):
+        if self.recording and last_update is not None:
+            self.staleness.append((now - last_update) * 1000)
+
+    def error(self, kind):
+        self.error_kinds[kind] = self.error_kinds.get(kind, 0) + 1
+        if self.recording:
+            self.errors += 1
+
+
+def percentile(samples, q):
+    if not samples:
+        return 0.0
+    samples = sorted(samples)
+    return samples[min(len(samples) - 1, int(len(samples) * q / 100))]
+
+
+async def read_head(reader):
+    """Status code and (lower-cased) headers of an HTTP response."""
+    head = await reader.readuntil(b"\r\n\r\n")
+    lines = head.decode("latin-1").split("\r\n")
+    headers = {}
+    for line in lines[1:]:
+        name, _, value = line.partition(":")
+        if name:
+            headers.setdefault(name.strip().lower(), value.strip())
+    return int(lines[0].split(" ", 2)[1]), headers
+
+
+async def read_chunks(reader, headers):
+    """The body of a response as it arrives, whether sized, chunked or ended by closing the connection."""
+    if "content-length" in headers:
+        yield await reader.readexactly(int(headers["content-length"]))
+    elif headers.get("transfer-encoding") == "chunked":
+        while True:
+            size = int((await reader.readline()).split(b";")[0], 16)
+            if not size:
+                return
+            yield await reader.readexactly(size)
+            await reader.readline()
+    else:
+        while True:
+            chunk = await reader.read(65536)
+            if not chunk:
+                return
+            yield chunk
+
+
+async def request(address, method, path, headers=(), body=None):
+    """One request on its own connection: (status, headers, body)."""
+    reader, writer = await asyncio.open_connection(*address)
+    try:
+        lines = [f"{method} {path} HTTP/1.1", f"Host: {address[0]}", "Connection: close", *headers]
+        if body is not None:
+            lines += ["Content-Type: application/json", f"Content-Length: {len(body)}"]
+        writer.write(("\r\n".join(lines) + "\r\n\r\n").encode("latin-1") + (body or b""))
+        status, response_headers = await read_head(reader)
+        content = b"".join([chunk async for chunk in read_chunks(reader, response_headers)])
+        return status, response_headers, content
+    finally:
+        writer.close()
+
+
+class Client:
+    """A simulated browser: a player with its own game (and key presses), or a spectator."""
+
+    def __init__(self, address, stats, stop, args):
+        self.address = address
+        self.stats = stats
+        self.stop = stop
+        self.args = args
+        self.cookie = None
+        self.status = None
+        self.last_update = None
+
+    def saw_update(self, status):
+        """Record the time since the previous update, if the game was running through both."""
+        now = time.perf_counter()
+        if status == "running" and self.status == "running":
+            self.stats.update(self.last_update, now)
+        self.status = status
+        self.last_update = now
+
+    def cookie_headers(self):
+        return [f"Cookie: {self.cookie}"] if self.cookie else []
+
+    async def open_game(self):
+        """Load the game page, like a browser, for the cookie of a new session; False if the server refused."""
+        try:
+            status, headers, _ = await request(self.address, "GET", "/")
+        except OSError:
+            self.stats.error("page connection")
+            return False
+        if status != 200 or "set-cookie" not in headers:
+            self.stats.error(f"page {status}")
+            return False
+        self.cookie = headers["set-cookie"].split(";")[0]
+        return True
+
+    async def send_commands(self):
+        """Press keys at random intervals: start the game, turn, and restart it after a game over."""
+        while not self.stop.is_set():
+            await asyncio.sleep(random.expovariate(self.args.command_rate))
+            if self.status == "game_over":
+                key = "r"
+            elif self.status == "waiting":
+                key = "space"
+            else:
+                key = random.choice(TURN_KEYS)
+            body = json.dumps({"key": key}).encode()
+            started = time.perf_counter()
+            try:
+                status, _, _ = await request(self.address, "POST", "/send_command", self.cookie_headers(), body)
+            except OSError:
+                self.stats.error("command connection")
+                continue
+            if status == 200:
+                self.stats.latency("command", started)
+            else:
+                self.stats.error(f"command {status}")
+
+    async def poll(self):
+        """Poll /get_game_state once per tick, revalidating with the ETag of the last answer."""
+        path = "/get_game_state" if self.args.poll_frames else "/get_game_state?frame=0"
+        period = 1.0 / self.args.fps
+        etag = None
+        if not await self.open_game():
+            return
+        commands = asyncio.ensure_future(self.send_commands())
+        try:
+            while not self.stop.is_set():
+                started = time.perf_counter()
+                headers = self.cookie_headers() + ([f"If-None-Match: {etag}"] if etag else [])
+                try:
+                    status, response_headers, body = await request(self.address, "GET", path, headers)
+                except OSError:
+                    self.stats.error("poll connection")
+                    await asyncio.sleep(period)
+                    continue
+                if status == 200:
+                    self.stats.latency("poll", started)
+                    self.stats.bytes += len(body)
+                    etag = response_headers.get("etag")
+                    self.saw_update(json.loads(body)["status"])
+                elif status == 304:
+                    self.stats.latency("poll", started)
+                    self.stats.not_modified += 1
+                else:
+                    self.stats.error(f"poll {status}")
+                await asyncio.sleep(max(0.0, period - (time.perf_counter() - started)))
+        finally:
+            commands.cancel()
+
+    async def follow(self, path, player):
+        """Follow a server-sent event stream until the run ends; players open a game first and press keys."""
+        if player and not await self.open_game():
+            return
+        started = time.perf_counter()
+        commands = stop = None
+        try:
+            reader, writer = await asyncio.open_connection(*self.address)
+        except OSError:
+            self.stats.error("stream connection")
+            return
+        try:
+            lines = [f"GET {path} HTTP/1.1", f"Host: {self.address[0]}", *self.cookie_headers()]
+            writer.write(("\r\n".join(lines) + "\r\n\r\n").encode("latin-1"))
+            status, headers = await read_head(reader)
+            if status != 200:
+                self.stats.error(f"stream {status}")
+                return
+            if player:
+                commands = asyncio.ensure_future(self.send_commands())
+
+            pending = b""
+            chunks = read_chunks(reader, headers)
+            stop = asyncio.ensure_future(self.stop.wait())
+            while True:
+                chunk = asyncio.ensure_future(chunks.__anext__())
+                done, _ = await asyncio.wait([chunk, stop], return_when=asyncio.FIRST_COMPLETED)
+                if stop in done:
+                    chunk.cancel()
+                    return
+                try:
+                    data = chunk.result()
+                except StopAsyncIteration:
+                    self.stats.error("stream ended")
+                    return
+                self.stats.bytes += len(data)
+                pending += data
+                *events, pending = pending.split(b"\n\n")
+                for event in events:
+                    if not event.startswith(b"data: "):
+                        continue  # Keep-alive comment
+                    if self.last_update is None:
+                        self.stats.first_event(started)
+                    if self.stats.recording:
+                        self.stats.events += 1
+                    self.saw_update(json.loads(event[6:]).get("status", self.status))
+        except (OSError, asyncio.IncompleteReadError):
+            self.stats.error("stream connection")
+        finally:
+            for task in (commands, stop):
+                if task:
+                    task.cancel()
+            writer.close()
+
+
+class ServerMonitor:
+    """Samples the server process's CPU time and RSS from /proc (Linux only; None elsewhere)."""
+
+    def __init__(self, pid):
+        self.pid = pid
+        self.page_size = os.sysconf("SC_PAGE_SIZE") if hasattr(os, "sysconf") else 4096
+        self.clock_ticks = os.sysconf("SC_CLK_TCK") if hasattr(os, "sysconf") else 100
+        self.max_rss = 0
+
+    def cpu_seconds(self):
+        try:
+            with open(f"/proc/{self.pid}/stat", encoding="ascii") as f:
+                fields = f.read().rsplit(")", 1)[1].split()
+        except OSError:
+            return None
+        return (int(fields[11]) + int(fields[12])) / self.clock_ticks  # utime + stime
+
+    def sample_rss(self):
+        try:
+            with open(f"/proc/{self.pid}/statm", encoding="ascii") as f:
+                rss = int(f.read().split()[1]) * self.page_size
+        except OSError:
+            return
+        self.max_rss = max(self.max_rss, rss)
+
+    async def run(self, stop):
+        while not stop.is_set():
+            self.sample_rss()
+            await asyncio.sleep(0.5)
+
+
+def free_port():
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def raise_file_limit():
+    """Allow a connection per simulated client (and the server, which inherits the limit, one per request)."""
+    try:
+        import resource
+    except ImportError:
+        return
+    soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+    if hard == resource.RLIM_INFINITY or soft < hard:
+        resource.setrlimit(resource.RLIMIT_NOFILE, (hard if hard != resource.RLIM_INFINITY else 65536, hard))
+
+
+def start_server(args, port, log):
+    command = [
+        sys.executable,
+        os.path.join(SRC_DIR, "main_web.py"),
+        "--port",
+        str(port),
+        "--server",
+        args.server,
+        "--fps",
+        str(args.fps),
+        "--max-sessions",
+        str(max(500, 2 * args.players)),
+        "--frame-format",
+        args.frame_format,
+    ]
+    if args.model:
+        command += ["--model", args.model, "--showcase"]
+    return subprocess.Popen(command, stdout=log, stderr=subprocess.STDOUT, cwd=os.path.dirname(SRC_DIR))
+
+
+async def wait_until_ready(address, process):
+    deadline = time.monotonic() + STARTUP_TIMEOUT
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise SystemExit(f"The server exited with code {process.returncode}, see its log")
+        try:
+            status, _, _ = await request(address, "GET", "/metrics")
+            if status == 200:
+                return
+        except OSError:
+            pass
+        await asyncio.sleep(0.5)
+    raise SystemExit(f"The server did not answer within {STARTUP_TIMEOUT:.0f}s")
+
+
+async def run_load(args, address, monitor):
+    """Connect every client over the ramp-up, then measure for the duration; returns the stats and window."""
+    stats = LoadStats()
+    stop = asyncio.Event()
+    tasks = [asyncio.ensure_future(monitor.run(stop))]
+    clients = args.players + args.spectators
+    for i in range(clients):
+        client = Client(address, stats, stop, args)
+        if i >= args.players:
+            tasks.append(asyncio.ensure_future(client.follow("/watch/stream", player=False)))
+        elif args.client == "poll":
+            tasks.append(asyncio.ensure_future(client.poll()))
+        else:
+            tasks.append(asyncio.ensure_future(client.follow("/state_stream", player=True)))
+        await asyncio.sleep(args.ramp / max(clients, 1))
+
+    await asyncio.sleep(1.0)  # Let the last clients settle
+    stats.recording = True
+    cpu_start, client_cpu_start, start = monitor.cpu_seconds(), time.process_time(), time.perf_counter()
+    await asyncio.sleep(args.duration)
+    stats.recording = False
+    window = time.perf_counter() - start
+    cpu_end, client_cpu = monitor.cpu_seconds(), (time.process_time() - client_cpu_start) / window
+
+    sessions = None
+    try:
+        status, _, body = await request(address, "GET", "/sessions")
+        if status == 200:
+            sessions = json.loads(body)
+    except OSError:
+        pass
+
+    stop.set()
+    await asyncio.gather(*tasks, return_exceptions=True)
+    server_cpu = (cpu_end - cpu_start) / window if cpu_start is not None and cpu_end is not None else None
+    return stats, window, server_cpu, client_cpu, sessions
+
+
+def report_results(args, stats, window, server_cpu, monitor, sessions):
+    """The measurements as benchmark results (see compare.py), named after the load they were measured under."""
+    label = f"{args.client},{args.players}p+{args.spectators}s,{args.server}"
+    params = {
+        "client": args.client,
+        "players": args.players,
+        "spectators": args.spectators,
+        "server": args.server,
+        "fps": args.fps,
+    }
+    results = [
+        result(f"load.throughput[{label}]", stats.requests / window, "requests/s", **params),
+        result(f"load.errors[{label}]", stats.errors, "errors", higher_is_better=False, **params),
+    ]
+    if stats.events:
+        results.append(result(f"load.events[{label}]", stats.events / window, "events/s", **params))
+    for kind, samples in sorted(stats.latencies.items()):
+        name = kind.replace(" ", "_")
+        for q in (50, 99):
+            results.append(
+                result(f"load.{name}_p{q}[{label}]", percentile(samples, q), "ms", higher_is_better=False, **params)
+            )
+    for q in (50, 99):
+        staleness = percentile(stats.staleness, q)
+        results.append(result(f"load.staleness_p{q}[{label}]", staleness, "ms", higher_is_better=False, **params))
+    if server_cpu is not None:
+        results.append(result(f"load.server_cpu[{label}]", server_cpu, "cores", higher_is_better=False, **params))
+        results.append(
+            result(f"load.server_rss[{label}]", monitor.max_rss / 2**20, "MB", higher_is_better=False, **params)
+        )
+    if sessions:
+        lag = sessions["worst_tick_lag_p99_ms"]
+        results.append(result(f"load.tick_lag_p99[{label}]", lag, "ms", higher_is_better=False, **params))
+    return results
+
+
+def main():
+    """Main function to run the load test."""
+    args = parse_args()
+    if args.spectators and not args.model:
+        raise SystemExit("Spectators watch the showcase game, which needs --model")
+    raise_file_limit()
+
+    port = args.port or free_port()
+    address = ("127.0.0.1", port)
+    os.makedirs(os.path.dirname(args.output) or ".", exist_ok=True)
+    log_path = os.path.splitext(args.output)[0] + ".server.log"
+
+    print(f"Starting the {args.server} server on port {port} (log: {log_path})")
+    with open(log_path, "w", encoding="utf-8") as log:
+        process = start_server(args, port, log)
+        try:
+            asyncio.run(wait_until_ready(address, process))
+            print(
+                f"Connecting {args.players} {args.client} players and {args.spectators} spectators "
+                f"over {args.ramp:.0f}s, then measuring for {args.duration:.0f}s..."
+            )
+            monitor = ServerMonitor(process.pid)
+            stats, window, server_cpu, client_cpu, sessions = asyncio.run(run_load(args, address, monitor))
+        finally:
+            process.terminate()
+            try:
+                process.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                process.kill()
+
+    results = report_results(args, stats, window, server_cpu, monitor, sessions)
+    for measurement in results:
+        print(f"  {measurement['name']:<60} {measurement['value']:>12.3f} {measurement['unit']}")
+    if stats.not_modified:
+        print(f"  {stats.not_modified} polls answered 304 Not Modified")
+    if stats.error_kinds:
+        print(f"  Errors (including ramp-up): {stats.error_kinds}")
+    if client_cpu > 0.9:
+        print(f"Warning: the load generator used {client_cpu:.2f} cores and may itself limit the results")
+
+    report = {
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "quick": False,
+        "machine": machine_info(),
+        "load": {**vars(args), "client_cpu": client_cpu},
+        "results": [{"suite": "load", **measurement} for measurement in results],
+    }
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    print(f"Report saved to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,60 @@
+#!/usr/bin/env python
+"""
+Snake Game Agent - Benchmark Runner
+Runs the benchmark suites and saves the results with machine information
+"""
+import argparse
+import importlib
+import json
+import os
+import time
+
+from common import machine_info
+
+SUITES = ["env", "agent", "training", "web"]
+
+
+def parse_args():
+    """Parse command line arguments."""
+    parser = argparse.ArgumentParser(description="Run the Snake Game benchmarks")
+    parser.add_argument(
+        "--suites",
+        type=str,
+        default=",".join(SUITES),
+        help=f"Comma-separated suites to run (default: {','.join(SUITES)})",
+    )
+    parser.add_argument("--quick", action="store_true", help="Fewer iterations, for a fast smoke run")
+    parser.add_argument(
+        "--output", type=str, default="benchmarks/results/latest.json", help="JSON file to save the results to"
+    )
+    return parser.parse_args()
+
+
+def main():
+    """Main function to run the benchmarks."""
+    args = parse_args()
+    suites = [suite.strip() for suite in args.suites.split(",") if suite.strip()]
+    unknown = sorted(set(suites) - set(SUITES))
+    if unknown:
+        raise SystemExit(f"Unknown suites: {', '.join(unknown)} (choose from {', '.join(SUITES)})")
+
+    report = {"timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"), "quick": args.quick, "machine": machine_info()}
+    results = []
+    for suite in suites:
+        print(f"Running {suite} benchmarks...")
+        start = time.perf_counter()
+        module = importlib.import_module(f"bench_{suite}")
+        for measurement in module.run(quick=args.quick):
+            print(f"  {measurement['name']:<40} {measurement['value']:>14.3f} {measurement['unit']}")
+            results.append({"suite": suite, **measurement})
+        print(f"  ({time.perf_counter() - start:.1f}s)")
+    report["results"] = results
+
+    os.makedirs(os.path.dirname(args.output) or ".", exist_ok=True)
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    print(f"Results saved to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,106 @@
+"""
+Background checkpoint writing for the Snake Game agent
+"""
+
+import os
+import queue
+import threading
+
+import tensorflow as tf
+
+from agent.dqn_agent import save_weights_atomic
+
+
+class CheckpointWriter:
+    """
+    Persists checkpoints on a background thread so the training loop never
+    waits on disk I/O. The caller only takes an in-memory copy of the
+    weights; the writer loads it into a shadow model and saves it with
+    write-to-temp-then-rename.
+
+    Retention: when keep_last is set, only the last keep_last checkpoints
+    plus the best one by score are kept on disk.
+    """
+
+    def __init__(self, agent, keep_last=None):
+        self.keep_last = keep_last
+
+        # Separate model with the same architecture, only touched by the writer thread
+        self.shadow_model = tf.keras.models.clone_model(agent.model)
+
+        # Checkpoints currently on disk: dicts with path, score and associated files
+        self.checkpoints = []
+
+        self.queue = queue.Queue()
+        self.thread = threading.Thread(target=self._run, name="checkpoint-writer", daemon=True)
+        self.thread.start()
+
+    def save(self, agent, path, score=None, files=()):
+        """
+        Snapshot the agent's weights and queue them to be written to path.
+        Extra files belonging to this checkpoint (e.g. metric plots) are
+        deleted along with it by the retention policy.
+        """
+        weights = agent.model.get_weights()
+        self.queue.put((self._write_checkpoint, (weights, path, score, tuple(files))))
+
+    def submit(self, fn, *args):
+        """Run any other slow write (e.g. metric plots) on the writer thread, in order."""
+        self.queue.put((fn, args))
+
+    def flush(self):
+        """Block until every queued write has finished."""
+        self.queue.join()
+
+    def close(self):
+        """Finish pending writes and stop the writer thread."""
+        self.queue.put(None)
+        self.thread.join()
+
+    def _run(self):
+        """Writer thread: execute queued jobs one at a time."""
+        while True:
+            job = self.queue.get()
+            try:
+                if job is None:
+                    return
+                fn, args = job
+                fn(*args)
+            except Exception as e:
+                print(f"Error writing checkpoint: {e}")
+            finally:
+                self.queue.task_done()
+
+    def _write_checkpoint(self, weights, path, score, files):
+        """Write a weight snapshot to disk, then apply the retention policy."""
+        self.shadow_model.set_weights(weights)
+        save_weights_atomic(self.shadow_model, path)
+
+        # A checkpoint saved again under the same path replaces the old record
+        self.checkpoints = [checkpoint for checkpoint in self.checkpoints if checkpoint["path"] != path]
+        self.checkpoints.append({"path": path, "score": score, "files": files})
+        self._apply_retention()
+
+    def _apply_retention(self):
+        """Delete checkpoints that are neither among the last keep_last nor the best by score."""
+        if not self.keep_last or len(self.checkpoints) <= self.keep_last:
+            return
+
+        keep = self.checkpoints[-self.keep_last :]
+        scored = [checkpoint for checkpoint in self.checkpoints if checkpoint["score"] is not None]
+        if scored:
+            # Prefer the most recent checkpoint among equal best scores
+            best = max(reversed(scored), key=lambda checkpoint: checkpoint["score"])
+            if best not in keep:
+                keep = [best] + keep
+
+        for checkpoint in self.checkpoints:
+            if checkpoint in keep:
+                continue
+            for path in (checkpoint["path"], *checkpoint["files"]):
+                try:
+                    os.remove(path)
+                except FileNotFoundError:
+                    pass
+
+        self.checkpoints = [checkpoint for checkpoint in self.checkpoints if checkpoint in keep]
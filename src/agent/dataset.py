@@ -0,0 +1,330 @@
+"""
+Offline transition datasets for the Snake Game agent
+"""
+
+import json
+import math
+import multiprocessing
+import os
+import random
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+
+import numpy as np
+
+INDEX_FILE = "index.json"
+
+# Stored fields and their dtypes; states are (transitions, state_size), the rest (transitions,).
+# States are binary features, so they are stored as uint8.
+DATASET_FIELDS = {
+    "states": np.uint8,
+    "actions": np.uint8,
+    "rewards": np.float32,
+    "next_states": np.uint8,
+    "dones": np.bool_,
+    "episode_ends": np.bool_,  # Last transition of an episode (terminal or truncated)
+}
+
+# Built-in rollout policies; anything else is taken as a model checkpoint path
+HEURISTIC_POLICIES = ["random", "greedy", "planner"]
+
+
+def greedy_action(state):
+    """
+    One-step heuristic on the 11-feature agent state: turn towards the food
+    when that move is safe, otherwise take any safe move.
+    """
+    danger = state[0:3]  # straight, right, left
+    direction_left, direction_right, direction_up, direction_down = state[3:7]
+    food_left, food_right, food_up, food_down = state[7:11]
+
+    # Absolute food directions expressed relative to the current heading
+    if direction_up:
+        towards = [food_up, food_right, food_left]
+    elif direction_right:
+        towards = [food_right, food_down, food_up]
+    elif direction_down:
+        towards = [food_down, food_left, food_right]
+    else:
+        towards = [food_left, food_up, food_down]
+
+    safe = [action for action in range(3) if not danger[action]]
+    for action in safe:
+        if towards[action]:
+            return action
+    return safe[0] if safe else 0
+
+
+def _make_policy(policy, epsilon, game):
+    """Build act(state) for a policy name or checkpoint path (runs inside a worker)."""
+    if policy == "random":
+        return lambda state: random.randrange(3)
+
+    if policy == "greedy":
+        base = greedy_action
+    elif policy == "planner":
+        from agent.planner_agent import PlannerAgent
+
+        base = PlannerAgent(game).act
+    else:
+        from agent.dqn_agent import DQNAgent
+
+        agent = DQNAgent(state_size=11, action_size=3)
+        agent.load(policy)
+        base = partial(agent.act, explore=False)
+
+    if epsilon <= 0:
+        return base
+
+    # Epsilon-greedy around the policy, for more varied data
+    def act(state):
+        return random.randrange(3) if random.random() < epsilon else base(state)
+
+    return act
+
+
+def _shard_name(shard_id):
+    return f"shard_{shard_id:05d}"
+
+
+def _generate_shard(directory, shard_id, transitions, policy, seed, epsilon, max_steps, timeout_multiplier):
+    """
+    Worker task: roll out episodes until `transitions` transitions are collected and
+    save them as one .npy file per field. Returns the shard's index entry.
+    """
+    from game.snake import SnakeGame
+
+    random.seed(seed)
+    np.random.seed(seed)
+
+    game = SnakeGame(max_steps_without_food=timeout_multiplier)
+    act = _make_policy(policy, epsilon, game)
+    state_size = len(game.get_state_for_agent())
+    arrays = {
+        name: np.zeros((transitions, state_size) if name.endswith("states") else transitions, dtype=dtype)
+        for name, dtype in DATASET_FIELDS.items()
+    }
+
+    scores = []
+    i = 0
+    while i < transitions:
+        game.reset()
+        state = game.get_state_for_agent()
+        for step in range(max_steps):
+            action = act(state)
+            _, reward, done, info = game.step(action)
+            next_state = game.get_state_for_agent()
+
+            arrays["states"][i] = state
+            arrays["actions"][i] = action
+            arrays["rewards"][i] = reward
+            arrays["next_states"][i] = next_state
+            arrays["dones"][i] = done
+            i += 1
+
+            state = next_state
+            if done or step == max_steps - 1 or i == transitions:
+                # A shard ending mid-episode truncates that episode
+                arrays["episode_ends"][i - 1] = True
+                break
+        scores.append(info["score"])
+
+    name = _shard_name(shard_id)
+    for field, array in arrays.items():
+        path = os.path.join(directory, f"{name}_{field}.npy")
+        np.save(f"{path}.tmp.npy", array)
+        os.replace(f"{path}.tmp.npy", path)
+
+    return {
+        "name": name,
+        "transitions": transitions,
+        "episodes": len(scores),
+        "mean_score": float(np.mean(scores)),
+        "max_score": int(max(scores)),
+    }
+
+
+def generate_dataset(
+    directory,
+    transitions,
+    policy="greedy",
+    shard_size=100_000,
+    workers=None,
+    seed=0,
+    epsilon=0.0,
+    max_steps=2000,
+    timeout_multiplier=100,
+    tf_threads=1,
+):
+    """
+    Generate a transition dataset with parallel SnakeGame rollouts.
+    Each worker task writes one shard of up to shard_size transitions; an
+    index.json describing the fields and shards is written last, so a
+    dataset without an index is incomplete. Returns the index.
+    """
+    from agent.evaluator import init_worker_process
+
+    os.makedirs(directory, exist_ok=True)
+    workers = workers or os.cpu_count() or 1
+    shard_count = math.ceil(transitions / shard_size)
+    sizes = [min(shard_size, transitions - shard_id * shard_size) for shard_id in range(shard_count)]
+
+    # TensorFlow is not fork-safe, so always start fresh interpreters; only checkpoint
+    # policies need TensorFlow configured in the workers
+    context = multiprocessing.get_context("spawn")
+    initializer = None if policy in HEURISTIC_POLICIES else init_worker_process
+    with ProcessPoolExecutor(
+        max_workers=workers, mp_context=context, initializer=initializer, initargs=(tf_threads,)
+    ) as executor:
+        futures = [
+            executor.submit(
+                _generate_shard,
+                directory,
+                shard_id,
+                size,
+                policy,
+                seed + shard_id,
+                epsilon,
+                max_steps,
+                timeout_multiplier,
+            )
+            for shard_id, size in enumerate(sizes)
+        ]
+        shards = []
+        for future in futures:
+            shard = future.result()
+            shards.append(shard)
+            print(
+                f"Wrote {shard['name']}: {shard['transitions']} transitions, {shard['episodes']} episodes, "
+                f"mean score {shard['mean_score']:.2f}"
+            )
+
+    index = {
+        "version": 1,
+        "policy": policy,
+        "epsilon": epsilon,
+        "seed": seed,
+        "state_size": 11,
+        "fields": {name: np.dtype(dtype).name for name, dtype in DATASET_FIELDS.items()},
+        "transitions": transitions,
+        "episodes": sum(shard["episodes"] for shard in shards),
+        "mean_score": float(np.average([s["mean_score"] for s in shards], weights=[s["episodes"] for s in shards])),
+        "shards": shards,
+    }
+    tmp_path = os.path.join(directory, f"{INDEX_FILE}.tmp")
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(index, f, indent=2)
+    os.replace(tmp_path, os.path.join(directory, INDEX_FILE))
+    return index
+
+
+class TransitionDataset:
+    """
+    Read-only view of a generated dataset. Shard arrays are memory-mapped,
+    so opening a dataset is instant and reads go straight to the page cache.
+    """
+
+    def __init__(self, directory):
+        with open(os.path.join(directory, INDEX_FILE), encoding="utf-8") as f:
+            self.index = json.load(f)
+        self.directory = directory
+        self.shards = [
+            {
+                name: np.load(os.path.join(directory, f"{shard['name']}_{name}.npy"), mmap_mode="r")
+                for name in DATASET_FIELDS
+            }
+            for shard in self.index["shards"]
+        ]
+
+    def __len__(self):
+        return self.index["transitions"]
+
+    @property
+    def state_size(self):
+        return self.index["state_size"]
+
+    def iter_batches(self, batch_size, gamma, shuffle=True, seed=None, block_size=4096, blocks_per_chunk=16):
+        """
+        Yield (states, actions, rewards, next_states, dones, discounts) batches
+        in the layout of ReplayBuffer.sample, as 1-step transitions.
+
+        With shuffle, the data is split into blocks of block_size transitions;
+        blocks from all shards are visited in random order, blocks_per_chunk at
+        a time, and each chunk is shuffled in memory. Every read is a sequential
+        block, so this streams at disk speed while mixing shards and episodes.
+        """
+        rng = np.random.default_rng(seed)
+        blocks = [
+            (shard_id, start, min(start + block_size, len(shard["actions"])))
+            for shard_id, shard in enumerate(self.shards)
+            for start in range(0, len(shard["actions"]), block_size)
+        ]
+        if shuffle:
+            rng.shuffle(blocks)
+
+        leftover = None
+        for chunk_start in range(0, len(blocks), blocks_per_chunk):
+            chunk = blocks[chunk_start : chunk_start + blocks_per_chunk]
+            arrays = {
+                name: np.concatenate([self.shards[shard_id][name][start:stop] for shard_id, start, stop in chunk])
+                for name in ("states", "actions", "rewards", "next_states", "dones")
+            }
+            if leftover is not None:
+                arrays = {name: np.concatenate([leftover[name], arrays[name]]) for name in arrays}
+            if shuffle:
+                order = rng.permutation(len(arrays["actions"]))
+                arrays = {name: values[order] for name, values in arrays.items()}
+
+            count = len(arrays["actions"])
+            full = count - count % batch_size
+            for i in range(0, full, batch_size):
+                yield self._batch(arrays, i, i + batch_size, gamma)
+            leftover = {name: values[full:] for name, values in arrays.items()}
+
+        if leftover is not None and len(leftover["actions"]):
+            yield self._batch(leftover, 0, len(leftover["actions"]), gamma)
+
+    @staticmethod
+    def _batch(arrays, start, stop, gamma):
+        count = stop - start
+        return (
+            arrays["states"][start:stop].astype(np.float32),
+            arrays["actions"][start:stop].astype(np.int64),
+            arrays["rewards"][start:stop],
+            arrays["next_states"][start:stop].astype(np.float32),
+            arrays["dones"][start:stop],
+            np.full(count, gamma, dtype=np.float32),
+        )
+
+    def fill_replay_memory(self, agent, limit=None, seed=None):
+        """
+        Pre-fill an agent's replay memory from the dataset; returns the number of transitions stored.
+        For 1-step agents a shuffled sample is copied in bulk. For n-step agents,
+        transitions are replayed in episode order through remember(), so the
+        agent aggregates the same n-step returns it would during training.
+        """
+        if agent.state_size != self.state_size:
+            raise ValueError(f"Dataset state size {self.state_size} does not match the agent's {agent.state_size}")
+        limit = min(limit or agent.memory.capacity, agent.memory.capacity, len(self))
+
+        if agent.n_step == 1:
+            batch = next(self.iter_batches(limit, agent.gamma, shuffle=True, seed=seed))
+            agent.memory.extend(*batch)
+            return len(batch[1])
+
+        stored = 0
+        for shard in self.shards:
+            for i in range(len(shard["actions"])):
+                end = bool(shard["episode_ends"][i])
+                agent.remember(
+                    shard["states"][i].astype(np.float32),
+                    int(shard["actions"][i]),
+                    float(shard["rewards"][i]),
+                    shard["next_states"][i].astype(np.float32),
+                    bool(shard["dones"][i]),
+                    truncated=end,
+                )
+                stored += 1
+                if stored >= limit and end:
+                    return stored
+        return stored
@@ -0,0 +1,167 @@
+"""
+Multi-resolution downsampling of long training series for charts
+"""
+
+from bisect import bisect_left
+
+# Points of a level per point of the level above it
+LEVEL_FACTOR = 4
+
+# Newest points each level keeps; older ranges are served from coarser levels
+LEVEL_POINTS = 1024
+
+
+def _area(xa, ya, xb, yb, xc, yc):
+    """Twice the area of the triangle abc (only compared, so not halved)."""
+    return abs((xa - xc) * (yb - ya) - (xa - xb) * (yc - ya))
+
+
+def lttb(values, points, xs=None):
+    """
+    Positions of `points` values (at xs, by default their index) chosen by
+    largest-triangle-three-buckets: the first and last, and from each bucket
+    in between the one making the largest triangle with the point chosen
+    before it and the average of the next bucket. All positions if there are
+    no more values than points.
+    """
+    length = len(values)
+    if xs is None:
+        xs = range(length)
+    if length <= points:
+        return list(range(length))
+    if points < 3:
+        return [0, length - 1][:points]
+
+    every = (length - 2) / (points - 2)
+    selected = [0]
+    for bucket in range(points - 2):
+        start = int(bucket * every) + 1
+        end = int((bucket + 1) * every) + 1
+        next_end = min(int((bucket + 2) * every) + 1, length)
+        cx = sum(xs[end:next_end]) / (next_end - end)
+        cy = sum(values[end:next_end]) / (next_end - end)
+        a = selected[-1]
+        xa, ya = xs[a], values[a]
+        selected.append(max(range(start, end), key=lambda i: _area(xa, ya, xs[i], values[i], cx, cy)))
+    selected.append(length - 1)
+    return selected
+
+
+class _Level:
+    """
+    The newest points of one resolution, (series index, value) in order. The
+    list is replaced, never trimmed in place, so readers can keep using the
+    one they got while the training thread appends.
+    """
+
+    def __init__(self, bucket):
+        self.bucket = bucket  # Series values per point
+        self.points = []
+        self.count = 0  # Points ever added
+        self.done = 0  # Buckets of LEVEL_FACTOR points chosen into the level above
+
+    def add(self, index, value):
+        self.points.append((index, value))
+        self.count += 1
+        if len(self.points) >= 2 * LEVEL_POINTS:
+            self.points = self.points[-LEVEL_POINTS:]
+
+    def point(self, position):
+        """The point at a position among all points ever added (it must still be kept)."""
+        return self.points[position - (self.count - len(self.points))]
+
+    def between(self, start, end):
+        points = self.points
+        return points[bisect_left(points, (start,)) : bisect_left(points, (end,))]
+
+
+class SeriesTail:
+    """
+    A growing series (one value per episode) of which only the newest
+    LEVEL_POINTS to 2 * LEVEL_POINTS values are kept in memory, so its
+    memory doesn't grow with the run.
+    """
+
+    def __init__(self):
+        self.raw = _Level(1)
+
+    def __len__(self):
+        return self.raw.count
+
+    @property
+    def first(self):
+        """Index of the oldest value still kept."""
+        return self.raw.count - len(self.raw.points)
+
+    def append(self, value):
+        self.raw.add(self.raw.count, value)
+
+    def values(self, start, end):
+        """Values from index start (at least first) to end."""
+        return [value for _, value in self.raw.between(max(start, self.first), end)]
+
+
+class DownsampledSeries(SeriesTail):
+    """
+    A SeriesTail that also keeps the whole series downsampled with LTTB at
+    several resolutions: each level picks one of every LEVEL_FACTOR points of
+    the level below, once the bucket after them is complete, so appending a
+    value costs O(levels) amortized. Every level keeps only its newest
+    LEVEL_POINTS or so points, and a new level is added when the top one has
+    enough, so memory grows with the log of the run's length.
+
+    window() serves any range with the requested number of points from the
+    finest level that still covers the start of the range with at most
+    LEVEL_FACTOR times as many points, plus the few newer points of the finer
+    levels not yet chosen into it, LTTB'd once more on the spot: O(points)
+    work whatever the length of the series or the range. Only the training
+    thread appends; server threads can call window() meanwhile.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self.levels = [self.raw]
+
+    def append(self, value):
+        super().append(value)
+        for below_level in range(len(self.levels)):
+            below = self.levels[below_level]
+            if (below.done + 2) * LEVEL_FACTOR > below.count:
+                return
+            if below_level + 1 == len(self.levels):
+                above = _Level(below.bucket * LEVEL_FACTOR)
+                above.add(*below.point(0))  # LTTB keeps the first point
+                self.levels.append(above)
+            above = self.levels[below_level + 1]
+
+            # Bucket `done` of the level below (its first point is the one kept above), and the next bucket's average
+            start = max(1, below.done * LEVEL_FACTOR)
+            end = (below.done + 1) * LEVEL_FACTOR
+            following = [below.point(position) for position in range(end, end + LEVEL_FACTOR)]
+            cx = sum(x for x, _ in following) / LEVEL_FACTOR
+            cy = sum(y for _, y in following) / LEVEL_FACTOR
+            xa, ya = above.points[-1]
+            candidates = [below.point(position) for position in range(start, end)]
+            above.add(*max(candidates, key=lambda point: _area(xa, ya, point[0], point[1], cx, cy)))
+            below.done += 1
+
+    def window(self, start, end, points):
+        """At most `points` (index, value) points representing the values from index start to end, in order."""
+        end = min(end, len(self))
+        if end <= start:
+            return []
+        levels = self.levels
+        chosen = len(levels) - 1
+        for i, level in enumerate(levels):
+            if level.points and level.points[0][0] <= start and (end - start) / level.bucket <= LEVEL_FACTOR * points:
+                chosen = i
+                break
+
+        # The chosen level's points, then each finer level's points after the last one so far
+        candidates = levels[chosen].between(start, end)
+        for level in reversed(levels[:chosen]):
+            after = candidates[-1][0] + 1 if candidates else start
+            candidates += level.between(after, end)
+        xs = [x for x, _ in candidates]
+        ys = [y for _, y in candidates]
+        return [candidates[i] for i in lttb(ys, points, xs)]
@@ -13,6 +13,9 @@ from tensorflow.keras.layers import Dense, Dropout
 from tensorflow.keras.models import Sequential
 from tensorflow.keras.optimizers import Adam
 
+from agent.profiler import PhaseProfiler
+from agent.replay_buffer import ReplayBuffer
+
 # Optimize TensorFlow for Apple Silicon if available
 if hasattr(tf.config, "experimental"):
     try:
@@ -56,10 +59,12 @@ class DQNAgent:
         learning_rate=0.001,
         batch_size=64,
         update_target_freq=5,
+        n_step=1,  # number of steps aggregated into each stored transition
+        profiler=None,  # PhaseProfiler timing the parts of replay() (disabled by default)
     ):
         self.state_size = state_size
         self.action_size = action_size
-        self.memory = deque(maxlen=memory_size)
+        self.memory = ReplayBuffer(memory_size, state_size)
         self.gamma = gamma
         self.epsilon = epsilon
         self.epsilon_min = epsilon_min
@@ -67,6 +72,12 @@ class DQNAgent:
         self.learning_rate = learning_rate
         self.batch_size = batch_size
         self.update_target_freq = update_target_freq
+        self.n_step = n_step
+        self.profiler = profiler or PhaseProfiler()
+
+        # Rolling accumulator of the current episode's last n transitions
+        self.n_step_buffer = deque(maxlen=n_step)
+        self.discounts = self.gamma ** np.arange(n_step + 1)
 
         # Main Q-network
         self.model = self._build_model()
@@ -75,9 +86,9 @@ class DQNAgent:
         self.target_model = self._build_model()
         self.update_target_model()
 
-        # Training metrics
+        # Training metrics (only recent losses; full histories go to the trainer's metrics log)
         self.train_count = 0
-        self.losses = []
+        self.losses = deque(maxlen=1000)
 
         # Add timestamp for unique model naming
         self.start_time = int(time.time())
@@ -107,9 +118,33 @@ class DQNAgent:
         """Copy weights from main model to target model."""
         self.target_model.set_weights(self.model.get_weights())
 
-    def remember(self, state, action, reward, next_state, done):
-        """Add experience to memory."""
-        self.memory.append((state, action, reward, next_state, done))
+    def remember(self, state, action, reward, next_state, done, truncated=False):
+        """
+        Add experience to memory.
+        Transitions are aggregated over n steps as they arrive: once n of them
+        are pending, the oldest is stored with its discounted n-step return.
+        At the end of an episode (done, or truncated by the step limit) every
+        pending transition is flushed with a shortened return.
+        """
+        self.n_step_buffer.append((state, action, reward, next_state, done))
+
+        if done or truncated:
+            while self.n_step_buffer:
+                self._store_n_step()
+                self.n_step_buffer.popleft()
+        elif len(self.n_step_buffer) == self.n_step:
+            self._store_n_step()
+
+    def _store_n_step(self):
+        """Store the oldest pending transition with its n-step return."""
+        state, action = self.n_step_buffer[0][:2]
+        rewards = [transition[2] for transition in self.n_step_buffer]
+        steps = len(rewards)
+        n_return = float(np.dot(self.discounts[:steps], rewards))
+        _, _, _, next_state, done = self.n_step_buffer[-1]
+
+        # Bootstrap discount for the state reached after `steps` steps
+        self.memory.append(state, action, n_return, next_state, done, self.discounts[steps])
 
     def act(self, state, explore=True):
         """Choose an action based on the current state."""
@@ -135,9 +170,15 @@ class DQNAgent:
             return random.randrange(self.action_size)
 
         # Exploitation: choose best action from Q-values
-        # Use a batched prediction for better performance on M3
-        act_values = self.model.predict(state.reshape(1, -1), verbose=0)
-        return np.argmax(act_values[0])
+        # Call the model directly: predict() sets up a full input pipeline per call,
+        # which dominates the cost for a single state
+        act_values = self.model(state.reshape(1, -1), training=False)
+        return int(np.argmax(act_values[0]))
+
+    def act_batch(self, states):
+        """Greedy actions for a batch of states (one per row) in a single forward pass."""
+        act_values = self.model(np.asarray(states, dtype=np.float32), training=False)
+        return np.argmax(np.asarray(act_values), axis=1)
 
     def replay(self):
         """Train the agent on random samples from memory."""
@@ -145,32 +186,8 @@ class DQNAgent:
             return 0  # Not enough samples for training
 
         # Sample a batch from memory
-        minibatch = random.sample(self.memory, self.batch_size)
-
-        # Prepare batches for more efficient training on M3
-        states = np.zeros((self.batch_size, self.state_size))
-        targets = np.zeros((self.batch_size, self.action_size))
-
-        for i, (state, action, reward, next_state, done) in enumerate(minibatch):
-            # Current Q-value from main model
-            target = self.model.predict(state.reshape(1, -1), verbose=0)[0]
-
-            if done:
-                # For terminal states, the target is just the reward
-                target[action] = reward
-            else:
-                # For non-terminal states, target is reward + gamma * max future Q-value
-                # Using the target model for stability
-                next_q_values = self.target_model.predict(next_state.reshape(1, -1), verbose=0)[0]
-                target[action] = reward + self.gamma * np.amax(next_q_values)
-
-            states[i] = state
-            targets[i] = target
-
-        # Train the model in a single batch for better performance
-        history = self.model.fit(states, targets, epochs=1, verbose=0, batch_size=self.batch_size)
-        loss = history.history["loss"][0]
-        self.losses.append(loss)
+        with self.profiler.phase("replay.sample"):
+            batch = self.memory.sample(self.batch_size)
 
         # Decay epsilon for less exploration over time
         if self.epsilon > self.epsilon_min:
@@ -182,6 +199,32 @@ class DQNAgent:
                 # Normal decay after that
                 self.epsilon *= self.epsilon_decay
 
+        return self.train_batch(*batch)
+
+    def train_batch(self, states, actions, rewards, next_states, dones, discounts):
+        """
+        Take one gradient step on a batch of transitions, from replay memory
+        or an offline dataset. Returns the loss.
+        """
+        phase = self.profiler.phase
+        batch_size = len(actions)
+
+        # Current Q-values from main model and future Q-values from the target model (for stability),
+        # each in one forward pass over the whole batch
+        with phase("replay.predict"):
+            targets = np.array(self.model(states, training=False))
+            next_q_values = np.array(self.target_model(next_states, training=False))
+
+        # For terminal states, the target is just the reward; otherwise it is
+        # the n-step return + gamma^n * max future Q-value
+        bootstrap = np.where(dones, 0.0, discounts * np.amax(next_q_values, axis=1))
+        targets[np.arange(batch_size), actions] = rewards + bootstrap
+
+        # Train the model in a single gradient step on the batch
+        with phase("replay.fit"):
+            loss = float(self.model.train_on_batch(states, targets))
+        self.losses.append(loss)
+
         # Update target model periodically
         self.train_count += 1
         if self.train_count % self.update_target_freq == 0:
@@ -196,6 +239,52 @@ class DQNAgent:
 
     def save(self, name):
         """Save model weights to disk."""
-        # Create directory if it doesn't exist
-        os.makedirs(os.path.dirname(name), exist_ok=True)
-        self.model.save_weights(name)
+        save_weights_atomic(self.model, name)
+
+    def get_training_state(self):
+        """
+        Copy everything needed to resume training exactly: both networks,
+        the optimizer slots, exploration state and the replay memory.
+        """
+        return {
+            "epsilon": self.epsilon,
+            "train_count": self.train_count,
+            "weights": self.model.get_weights(),
+            "target_weights": self.target_model.get_weights(),
+            "optimizer": [variable.numpy() for variable in self.model.optimizer.variables],
+            "memory": self.memory.snapshot(),
+        }
+
+    def set_training_state(self, state, memory_dir=None):
+        """Restore a state from get_training_state; the replay memory is loaded from memory_dir."""
+        self.epsilon = state["epsilon"]
+        self.train_count = state["train_count"]
+        self.model.set_weights(state["weights"])
+        self.target_model.set_weights(state["target_weights"])
+
+        # Optimizer slots only exist after the first training step, so create them first
+        optimizer = self.model.optimizer
+        if len(optimizer.variables) != len(state["optimizer"]):
+            optimizer.build(self.model.trainable_variables)
+        for variable, value in zip(optimizer.variables, state["optimizer"]):
+            variable.assign(value)
+
+        if memory_dir:
+            self.memory.load(memory_dir)
+
+
+def save_weights_atomic(model, name):
+    """
+    Save model weights via a temporary file and a rename, so a crash
+    mid-write never leaves a truncated weights file behind.
+    """
+    # Create directory if it doesn't exist
+    os.makedirs(os.path.dirname(name) or ".", exist_ok=True)
+
+    # Keep the extension so Keras still picks the HDF5 format
+    root, ext = os.path.splitext(name)
+    tmp_name = f"{root}.tmp{ext}"
+    model.save_weights(tmp_name)
+    with open(tmp_name, "rb") as f:
+        os.fsync(f.fileno())
+    os.replace(tmp_name, name)
@@ -0,0 +1,215 @@
+"""
+Parallel headless evaluation of trained Snake Game agents
+"""
+
+import glob
+import math
+import multiprocessing
+import os
+import random
+import re
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+# Checkpoints are saved by the trainer as <model>_<episode>.h5
+CHECKPOINT_PATTERN = re.compile(r"_(\d+)\.h5$")
+
+# Name evaluated with the heuristic PlannerAgent instead of a checkpoint
+PLANNER_BASELINE = "planner"
+
+# z-value for 95% confidence intervals
+Z_95 = 1.96
+
+# Agents loaded by this worker process, keyed by model path
+_worker_agents = {}
+
+
+def find_checkpoints(model_name):
+    """
+    Find every checkpoint saved for a model during training.
+    Returns the `<model>_<N>.h5` files ordered by episode, followed by the
+    final model itself if it exists.
+    """
+    base = model_name[: -len(".h5")] if model_name.endswith(".h5") else model_name
+    checkpoints = []
+    for path in glob.glob(f"{glob.escape(base)}_*.h5"):
+        match = CHECKPOINT_PATTERN.search(path)
+        if match and path[: match.start()] == base:
+            checkpoints.append((int(match.group(1)), path))
+
+    paths = [path for _, path in sorted(checkpoints)]
+    if os.path.exists(model_name):
+        paths.append(model_name)
+    return paths
+
+
+def init_worker_process(tf_threads):
+    """
+    Configure a worker process: no display, and a fixed number of TF threads
+    so that parallel workers don't oversubscribe the CPU cores.
+    """
+    os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+    os.environ.setdefault("TF_CPP_MIN_LOG_LEVEL", "2")
+    os.environ["OMP_NUM_THREADS"] = str(tf_threads)
+
+    import tensorflow as tf
+
+    try:
+        tf.config.threading.set_intra_op_parallelism_threads(tf_threads)
+        tf.config.threading.set_inter_op_parallelism_threads(1)
+    except RuntimeError:
+        # TensorFlow was already initialized in this process
+        pass
+
+
+def _get_agent(model_path):
+    """Load an agent once per worker process and reuse it for later chunks."""
+    from agent.dqn_agent import DQNAgent
+
+    agent = _worker_agents.get(model_path)
+    if agent is None:
+        agent = DQNAgent(state_size=11, action_size=3)
+        agent.load(model_path)
+        _worker_agents[model_path] = agent
+    return agent
+
+
+def play_episode(game, agent, seed, max_steps):
+    """Play one greedy episode with seeded food placement, without rendering or frame limiting."""
+    random.seed(seed)
+    np.random.seed(seed)
+
+    game.reset()
+    state = game.get_state_for_agent()
+
+    done = False
+    info = {"score": 0}
+    steps = 0
+    while not done and steps < max_steps:
+        action = agent.act(state, explore=False)
+        _, _, done, info = game.step(action)
+        state = game.get_state_for_agent()
+        steps += 1
+
+    return {
+        "seed": seed,
+        "score": info["score"],
+        "length": steps,
+        "timeout": bool(info.get("timeout", False)),
+        "truncated": not done,
+    }
+
+
+def _evaluate_chunk(model_path, seeds, max_steps, timeout_multiplier):
+    """Worker task: play one episode per seed with the given model (or the planner baseline)."""
+    from game.snake import SnakeGame
+
+    game = SnakeGame(max_steps_without_food=timeout_multiplier)
+    if model_path == PLANNER_BASELINE:
+        from agent.planner_agent import PlannerAgent
+
+        agent = PlannerAgent(game)
+    else:
+        agent = _get_agent(model_path)
+    return [play_episode(game, agent, seed, max_steps) for seed in seeds]
+
+
+def _mean_ci(values):
+    """Mean of the values with a normal-approximation 95% confidence interval."""
+    mean = float(np.mean(values))
+    if len(values) < 2:
+        return mean, (mean, mean)
+    half_width = Z_95 * float(np.std(values, ddof=1)) / math.sqrt(len(values))
+    return mean, (mean - half_width, mean + half_width)
+
+
+def _rate_ci(successes, total):
+    """Proportion with a Wilson score 95% confidence interval."""
+    if total == 0:
+        return 0.0, (0.0, 0.0)
+    rate = successes / total
+    denom = 1 + Z_95**2 / total
+    center = (rate + Z_95**2 / (2 * total)) / denom
+    half_width = Z_95 * math.sqrt(rate * (1 - rate) / total + Z_95**2 / (4 * total**2)) / denom
+    return rate, (max(0.0, center - half_width), min(1.0, center + half_width))
+
+
+def summarize(episodes):
+    """Aggregate per-episode results into score, length and timeout statistics."""
+    summary = {"episodes": len(episodes)}
+
+    for key in ("score", "length"):
+        values = np.array([episode[key] for episode in episodes], dtype=float)
+        mean, ci = _mean_ci(values)
+        summary[key] = {
+            "mean": mean,
+            "ci95": list(ci),
+            "median": float(np.median(values)),
+            "p95": float(np.percentile(values, 95)),
+            "min": float(values.min()),
+            "max": float(values.max()),
+        }
+
+    rate, ci = _rate_ci(sum(episode["timeout"] for episode in episodes), len(episodes))
+    summary["timeout_rate"] = {"rate": rate, "ci95": list(ci)}
+    summary["truncated"] = sum(episode["truncated"] for episode in episodes)
+    return summary
+
+
+def evaluate_models(
+    model_paths,
+    episodes=100,
+    workers=None,
+    seed=0,
+    max_steps=2000,
+    timeout_multiplier=100,
+    tf_threads=1,
+):
+    """
+    Evaluate each model over the same seeded episodes using a process pool.
+    Episodes are split into one chunk per worker and model, so each worker
+    loads a model at most once. Returns {model_path: summary}.
+    """
+    workers = workers or os.cpu_count() or 1
+    seeds = list(range(seed, seed + episodes))
+    chunk_size = max(1, math.ceil(episodes / workers))
+    chunks = [seeds[i : i + chunk_size] for i in range(0, episodes, chunk_size)]
+
+    # TensorFlow is not fork-safe, so always start fresh interpreters
+    context = multiprocessing.get_context("spawn")
+    results = {path: [] for path in model_paths}
+
+    with ProcessPoolExecutor(
+        max_workers=workers, mp_context=context, initializer=init_worker_process, initargs=(tf_threads,)
+    ) as executor:
+        futures = {
+            executor.submit(_evaluate_chunk, path, chunk, max_steps, timeout_multiplier): path
+            for path in model_paths
+            for chunk in chunks
+        }
+        for future, path in futures.items():
+            results[path].extend(future.result())
+
+    return {path: summarize(sorted(results[path], key=lambda r: r["seed"])) for path in model_paths}
+
+
+def format_report(summaries):
+    """Format evaluation summaries as a text table."""
+    header = (
+        f"{'Model':<40} {'Score mean (95% CI)':>23} {'Median':>7} {'P95':>6} "
+        f"{'Length mean':>12} {'Len P95':>8} {'Timeouts (95% CI)':>19}"
+    )
+    lines = [header, "-" * len(header)]
+    for path, summary in summaries.items():
+        score = summary["score"]
+        length = summary["length"]
+        timeouts = summary["timeout_rate"]
+        lines.append(
+            f"{os.path.basename(path):<40} "
+            f"{score['mean']:>7.2f} ({score['ci95'][0]:6.2f}-{score['ci95'][1]:6.2f}) "
+            f"{score['median']:>7.1f} {score['p95']:>6.1f} "
+            f"{length['mean']:>12.1f} {length['p95']:>8.1f} "
+            f"{timeouts['rate'] * 100:>5.1f}% ({timeouts['ci95'][0] * 100:4.1f}-{timeouts['ci95'][1] * 100:4.1f}%)"
+        )
+    return "\n".join(lines)
@@ -0,0 +1,186 @@
+"""
+Streaming training metrics log for the Snake Game agent
+"""
+
+import json
+import os
+import time
+from collections import deque
+
+import numpy as np
+
+
+def metrics_log_path(log_dir, model_name):
+    """Per-model log file, e.g. data/snake_dqn_metrics.jsonl."""
+    base = os.path.splitext(os.path.basename(model_name))[0]
+    return os.path.join(log_dir, f"{base}_metrics.jsonl")
+
+
+class RollingWindow:
+    """Fixed-size window of recent values with an O(1) running mean."""
+
+    def __init__(self, size, values=()):
+        self.values = deque(maxlen=size)
+        self.total = 0.0
+        self.appends = 0
+        for value in values:
+            self.append(value)
+
+    def __len__(self):
+        return len(self.values)
+
+    def append(self, value):
+        """Add a value, dropping the oldest one once the window is full."""
+        if len(self.values) == self.values.maxlen:
+            self.total -= self.values[0]
+        self.values.append(value)
+        self.total += value
+
+        # Recompute the sum once per window length so float error can't build up
+        self.appends += 1
+        if self.appends % self.values.maxlen == 0:
+            self.total = float(sum(self.values))
+
+    @property
+    def mean(self):
+        return self.total / len(self.values) if self.values else 0.0
+
+
+class MetricsLog:
+    """
+    Append-only per-episode metrics log in JSON Lines format.
+    Each episode becomes one line on disk; in memory only a rolling score
+    window and a few running summaries are kept, so memory use does not
+    grow with the length of the run. Full histories are read back from the
+    file when plotting (see read_metrics_log).
+    """
+
+    def __init__(self, path, window=100):
+        self.path = path
+        self.window = window
+        self.file = None
+
+        # Bounded in-memory summaries
+        self.scores = RollingWindow(window)
+        self.episodes = 0
+        self.best_score = None
+        self.avg_score = 0.0
+        self.best_avg_score = None
+
+    def open(self, state=None):
+        """
+        Open the log for appending. When resuming from a saved state, records
+        written after that state (e.g. before a crash) are cut off so the log
+        matches the restored run; otherwise any previous log is replaced.
+        """
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        offset = 0
+        if state is not None:
+            self.restore(state)
+            offset = state["offset"]
+            if not os.path.exists(self.path) or os.path.getsize(self.path) < offset:
+                print(f"Warning: metrics log {self.path} is missing records before episode {self.episodes}")
+                offset = os.path.getsize(self.path) if os.path.exists(self.path) else 0
+
+        self.file = open(self.path, "a+b")
+        self.file.truncate(offset)
+        self.file.seek(offset)
+
+    def append(self, score, epsilon, loss=None, duration=None, timeout=False):
+        """Record one finished episode and return its record (including the rolling average score)."""
+        self.episodes += 1
+        self.scores.append(score)
+        self.avg_score = self.scores.mean
+        self.best_score = score if self.best_score is None else max(self.best_score, score)
+        if self.best_avg_score is None or self.avg_score > self.best_avg_score:
+            self.best_avg_score = self.avg_score
+
+        record = {
+            "episode": self.episodes,
+            "score": score,
+            "avg_score": round(self.avg_score, 6),
+            "epsilon": round(float(epsilon), 6),
+            "loss": None if loss is None else float(loss),
+            "duration": None if duration is None else round(duration, 6),
+            "timeout": bool(timeout),
+            "time": round(time.time(), 3),
+        }
+        if self.file is not None:
+            self.file.write(json.dumps(record).encode("utf-8") + b"\n")
+        return record
+
+    def flush(self, sync=False):
+        """Push buffered records to the OS (and to disk with sync=True)."""
+        if self.file is None:
+            return
+        self.file.flush()
+        if sync:
+            os.fsync(self.file.fileno())
+
+    def close(self):
+        if self.file is not None:
+            self.file.close()
+            self.file = None
+
+    def state(self):
+        """
+        Summaries and file offset needed to continue the log after a resume.
+        The log is synced first so the offset never points past durable data.
+        """
+        self.flush(sync=True)
+        return {
+            "offset": self.file.tell() if self.file is not None else 0,
+            "episodes": self.episodes,
+            "window": list(self.scores.values),
+            "best_score": self.best_score,
+            "best_avg_score": self.best_avg_score,
+        }
+
+    def restore(self, state):
+        """Restore the in-memory summaries from state()."""
+        self.episodes = state["episodes"]
+        self.scores = RollingWindow(self.window, state["window"])
+        self.avg_score = self.scores.mean
+        self.best_score = state["best_score"]
+        self.best_avg_score = state["best_avg_score"]
+
+
+def iter_metrics_log(path, last_episode=None):
+    """
+    The records of a metrics log one at a time, optionally stopping at
+    last_episode. A partially written final line is ignored, so this is safe
+    while training is still appending.
+    """
+    with open(path, "rb") as f:
+        for line in f:
+            if not line.endswith(b"\n"):
+                return
+            record = json.loads(line)
+            if last_episode is not None and record["episode"] > last_episode:
+                return
+            yield record
+
+
+def read_metrics_log(path, last_episode=None):
+    """
+    Read a metrics log back into arrays for plotting (see iter_metrics_log).
+    Returns a dict with scores, avg_scores, epsilons, losses and episode_durations.
+    """
+    scores, avg_scores, epsilons, losses, durations = [], [], [], [], []
+
+    for record in iter_metrics_log(path, last_episode):
+        scores.append(record["score"])
+        avg_scores.append(record["avg_score"])
+        epsilons.append(record["epsilon"])
+        if record["loss"] is not None:
+            losses.append(record["loss"])
+        if record["duration"] is not None:
+            durations.append(record["duration"])
+
+    return {
+        "scores": np.array(scores),
+        "avg_scores": np.array(avg_scores),
+        "epsilons": np.array(epsilons),
+        "losses": np.array(losses),
+        "episode_durations": np.array(durations),
+    }
@@ -0,0 +1,156 @@
+"""
+Process-wide cache of loaded agents, with background hot reloading
+"""
+
+import os
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+from agent.evaluator import find_checkpoints
+
+# Forward passes run on a blank state after loading, so the first real action isn't slow
+WARMUP_STEPS = 3
+
+# Most agents kept loaded (each holds two Keras models); a server following a training run sees a new
+# checkpoint file every save, so the least recently used ones are dropped
+MAX_CACHED_AGENTS = 4
+
+
+def model_key(path):
+    """Identify a version of a model file by its absolute path and modification time."""
+    return os.path.abspath(path), os.stat(path).st_mtime_ns
+
+
+def latest_model(model_path):
+    """
+    Newest file among a model and its <model>_<N>.h5 checkpoints, by
+    modification time, or None if none exist yet.
+    """
+    paths = find_checkpoints(model_path)
+    if not paths:
+        return None
+    return max(paths, key=lambda path: os.stat(path).st_mtime_ns)
+
+
+class ModelCache:
+    """
+    Loaded DQNAgents keyed by (path, mtime). Each file version is loaded
+    and warmed up once per process; loading a newer version of a path drops
+    the older ones, and at most max_agents are kept, least recently used
+    first out. A reloader keeps playing its agent after it is dropped here.
+    Loads are serialized, lookups only take a short lock.
+    """
+
+    def __init__(self, max_agents=MAX_CACHED_AGENTS):
+        self.max_agents = max_agents
+        self.agents = OrderedDict()
+        self.lock = threading.Lock()
+        self.load_lock = threading.Lock()
+
+    def get(self, path):
+        """Return the agent for the current version of path, loading it if needed."""
+        key = model_key(path)
+        with self.lock:
+            agent = self.agents.get(key)
+            if agent is not None:
+                self.agents.move_to_end(key)
+        if agent is not None:
+            return agent
+
+        with self.load_lock:
+            # Another thread may have loaded it while we waited
+            with self.lock:
+                agent = self.agents.get(key)
+            if agent is None:
+                agent = self._load(path)
+                with self.lock:
+                    for old in [old for old in self.agents if old[0] == key[0]]:
+                        del self.agents[old]
+                    self.agents[key] = agent
+                    while len(self.agents) > self.max_agents:
+                        self.agents.popitem(last=False)
+        return agent
+
+    @staticmethod
+    def _load(path):
+        from agent.dqn_agent import DQNAgent
+
+        agent = DQNAgent(state_size=11, action_size=3, epsilon=0.0)
+        agent.load(path)
+        state = np.zeros(agent.state_size, dtype=np.float32)
+        for _ in range(WARMUP_STEPS):
+            agent.act(state, explore=False)
+        return agent
+
+
+# Shared by every server and thread in the process
+model_cache = ModelCache()
+
+
+class AgentReloader:
+    """
+    Holds the agent for a model and swaps in new versions from a background
+    thread, whenever a newer checkpoint appears or another model is requested.
+    The game loop only reads `agent`, so it never waits on a load.
+    """
+
+    def __init__(self, cache=model_cache, interval=2.0):
+        self.cache = cache
+        self.interval = interval
+        self.agent = None
+        self.model_path = None  # Requested model (its checkpoints count as newer versions)
+        self.source = None  # File the current agent was loaded from
+        self.key = None
+        self.error = None
+
+        self.wake = threading.Event()
+        self.running = True
+        self.thread = threading.Thread(target=self._run, name="agent-reloader", daemon=True)
+        self.thread.start()
+
+    def load(self, model_path):
+        """Load a model synchronously (e.g. at startup, before the first frame)."""
+        self.model_path = model_path
+        self._reload()
+        return self.agent
+
+    def request(self, model_path):
+        """Switch to another model in the background; the current agent keeps playing meanwhile."""
+        self.model_path = model_path
+        self.wake.set()
+
+    def stop(self):
+        self.running = False
+        self.wake.set()
+
+    def _run(self):
+        while self.running:
+            self.wake.wait(self.interval)
+            self.wake.clear()
+            if self.running and self.model_path:
+                self._reload()
+
+    def _reload(self):
+        model_path = self.model_path
+        try:
+            source = latest_model(model_path)
+            if source is None:
+                self.error = f"Model file '{model_path}' does not exist"
+                return
+            key = model_key(source)
+            if key == self.key:
+                return
+            agent = self.cache.get(source)
+        except Exception as e:
+            # Keep the current agent; a partially written file is retried on the next poll
+            self.error = f"Failed to load {model_path}: {e}"
+            print(self.error)
+            return
+
+        if model_path != self.model_path:
+            # Another model was requested while loading; pick it up on the next pass
+            self.wake.set()
+        self.agent, self.source, self.key, self.error = agent, source, key, None
+        print(f"Agent loaded from {source}")
@@ -0,0 +1,214 @@
+"""
+Heuristic path-planning agent for Snake Game
+"""
+
+from game.snake import DOWN, LEFT, RIGHT, UP
+
+# Grid offset of each absolute direction
+MOVES = {UP: (0, -1), RIGHT: (1, 0), DOWN: (0, 1), LEFT: (-1, 0)}
+
+
+class PlannerAgent:
+    """
+    Deterministic planner that reads the game directly instead of the
+    11-feature state:
+    1. Shortest path to the food (BFS), taken only if the tail is still
+       reachable after eating, so the snake can't trap itself.
+    2. Otherwise, chase the tail along the move that keeps it farthest away.
+    3. Otherwise, move into the largest reachable area.
+
+    BFS is time-aware: a body segment blocks a cell only until the tail has
+    moved past it. The cell behind the head can't be the first step (the
+    snake can't reverse); for a snake of length 1 or 2 it is otherwise open. All search buffers are preallocated flat lists over the
+    grid (plain lists index faster than array/numpy from Python) and reused
+    between decisions: visited cells are invalidated by a generation counter
+    and body cells are reset individually, so nothing is cleared per search.
+
+    A food path that passed the safety check stays safe while it is followed
+    (the game is deterministic and the food doesn't move until eaten), so it
+    is kept as a plan and replayed without searching until the food is reached.
+    """
+
+    def __init__(self, game):
+        self.game = game
+        self._allocate(game.grid_width, game.grid_height)
+
+    def _allocate(self, width, height):
+        """(Re)build the per-grid buffers."""
+        self.width = width
+        self.height = height
+        cells = width * height
+
+        # (direction, neighbor cell) pairs of each cell inside the walls, and just the cells for BFS
+        self.neighbors = []
+        for cell in range(cells):
+            x, y = cell % width, cell // width
+            self.neighbors.append(
+                [
+                    (direction, (y + dy) * width + (x + dx))
+                    for direction, (dx, dy) in MOVES.items()
+                    if 0 <= x + dx < width and 0 <= y + dy < height
+                ]
+            )
+        self.adjacent = [[neighbor for _, neighbor in pairs] for pairs in self.neighbors]
+
+        # Move at which each cell is free: 0 for empty cells, len - i for body segment i
+        self.free_at = [0] * cells
+        self.body = []
+
+        # BFS state
+        self.seen = [0] * cells
+        self.parent = [0] * cells
+        self.depth = [0] * cells
+        self.queue = [0] * cells
+        self.search_generation = 0
+
+        # Remaining cells of the current safe food path, the cell the snake should be in and the food it leads to
+        self.plan = []
+        self.plan_from = -1
+        self.plan_food = None
+
+    def act(self, state=None, explore=False):
+        """Choose a relative action (0=straight, 1=right, 2=left); the state vector is not needed."""
+        game = self.game
+        if game.grid_width != self.width or game.grid_height != self.height:
+            self._allocate(game.grid_width, game.grid_height)
+
+        width = self.width
+        snake = [x + y * width for x, y in game.snake]
+        head = snake[0]
+        direction = game.direction
+
+        # Keep following the planned path while the snake is where the plan expects it
+        if self.plan and head == self.plan_from and game.food == self.plan_food:
+            return self._follow(direction, head)
+        self.plan = []
+
+        # 1. Shortest path to the food, if it is safe
+        reverse = (direction + 2) % 4
+        if game.food is not None:
+            food = game.food[0] + game.food[1] * width
+            behind = next((cell for move, cell in self.neighbors[head] if move == reverse), -1)
+            self._mark_body(snake)
+            if self._search(head, food, behind):
+                path = self._path(head, food)
+                if len(snake) < 3 or self._tail_reachable((path[::-1] + snake)[: len(snake) + 1]):
+                    self.plan = path[::-1]
+                    self.plan_food = game.food
+                    return self._follow(direction, head)
+
+        # Candidate first moves: any move into a cell that is free next step
+        self._mark_body(snake)
+        moves = [
+            (move, cell) for move, cell in self.neighbors[head] if move != reverse and not self._blocked(cell, 1)
+        ]
+        if not moves:
+            return 0
+
+        # 2. Follow the tail, keeping as much distance to it as possible
+        best, best_distance = None, -1
+        for move, cell in moves:
+            moved = [cell] + (snake if game.food is not None and cell == food else snake[:-1])
+            self._mark_body(moved)
+            if self._search(cell, moved[-1]) and self.depth[moved[-1]] > best_distance:
+                best, best_distance = move, self.depth[moved[-1]]
+        if best is not None:
+            return self._turn(direction, best)
+
+        # 3. Survive as long as possible: move into the largest open area
+        best, best_area = moves[0][0], -1
+        for move, cell in moves:
+            self._mark_body([cell] + snake[:-1])
+            area = self._search(cell)
+            if area > best_area:
+                best, best_area = move, area
+        return self._turn(direction, best)
+
+    def _mark_body(self, snake):
+        """Occupy the body cells; segment i (0 = head) is gone after len - i moves."""
+        free_at = self.free_at
+        for cell in self.body:
+            free_at[cell] = 0
+        length = len(snake)
+        for i, cell in enumerate(snake):
+            free_at[cell] = length - i
+        self.body = snake
+
+    def _blocked(self, cell, move):
+        return self.free_at[cell] > move
+
+    def _search(self, start, goal=-1, behind=-1):
+        """
+        Time-aware BFS from start. Returns True when goal is reached, otherwise
+        (no goal, or unreachable) the number of cells reached. Fills parent/depth.
+        The cell `behind` is not a first step (it can still be reached later).
+        """
+        self.search_generation += 1
+        generation = self.search_generation
+        seen, parent, depth, queue, adjacent, free_at = (
+            self.seen,
+            self.parent,
+            self.depth,
+            self.queue,
+            self.adjacent,
+            self.free_at,
+        )
+
+        seen[start] = generation
+        if behind >= 0:
+            seen[behind] = generation
+        depth[start] = 0
+        queue[0] = start
+        read, write = 0, 1
+        while read < write:
+            cell = queue[read]
+            read += 1
+            next_depth = depth[cell] + 1
+            for neighbor in adjacent[cell]:
+                if seen[neighbor] == generation or free_at[neighbor] > next_depth:
+                    continue
+                seen[neighbor] = generation
+                parent[neighbor] = cell
+                depth[neighbor] = next_depth
+                if neighbor == goal:
+                    return True
+                queue[write] = neighbor
+                write += 1
+            if cell == start and behind >= 0:
+                seen[behind] = 0  # Open again after the first step
+        return False if goal >= 0 else write
+
+    def _path(self, start, goal):
+        """Cells from the first move to goal, from the last search."""
+        path = []
+        cell = goal
+        while cell != start:
+            path.append(cell)
+            cell = self.parent[cell]
+        return path[::-1]
+
+    def _tail_reachable(self, snake):
+        """Whether the head of a (virtual) snake can still reach its tail."""
+        self._mark_body(snake)
+        return self._search(snake[0], snake[-1]) is True
+
+    def _follow(self, direction, head):
+        """Take the next step of the plan."""
+        cell = self.plan.pop()
+        self.plan_from = cell
+        return self._action_to(direction, head, cell)
+
+    def _action_to(self, direction, head, cell):
+        for move, neighbor in self.neighbors[head]:
+            if neighbor == cell:
+                return self._turn(direction, move)
+        return 0
+
+    @staticmethod
+    def _turn(direction, move):
+        """Relative action that turns the current direction into move."""
+        if move == (direction + 1) % 4:
+            return 1
+        if move == (direction - 1) % 4:
+            return 2
+        return 0
@@ -0,0 +1,272 @@
+"""
+Per-phase profiling of the Snake Game training loop
+"""
+
+import contextlib
+import cProfile
+import json
+import os
+import pstats
+import threading
+import time
+
+# Histogram buckets are powers of two starting at 1.024us (2^10 ns); the last bucket is open-ended
+FIRST_BUCKET_SHIFT = 10
+NUM_BUCKETS = 32
+
+# Shared no-op context returned by a disabled profiler
+_NULL_PHASE = contextlib.nullcontext()
+
+
+class PhaseStats:
+    """Call count, total/min/max and a log2 histogram of durations for one phase."""
+
+    def __init__(self):
+        self.count = 0
+        self.total_ns = 0
+        self.min_ns = None
+        self.max_ns = 0
+        self.buckets = [0] * NUM_BUCKETS
+
+    def add(self, duration_ns):
+        self.count += 1
+        self.total_ns += duration_ns
+        if self.min_ns is None or duration_ns < self.min_ns:
+            self.min_ns = duration_ns
+        if duration_ns > self.max_ns:
+            self.max_ns = duration_ns
+        bucket = min((duration_ns >> FIRST_BUCKET_SHIFT).bit_length(), NUM_BUCKETS - 1)
+        self.buckets[bucket] += 1
+
+    def percentile(self, q):
+        """Upper bound of the histogram bucket holding the q-th percentile, in ns (capped at the max)."""
+        if not self.count:
+            return 0
+        rank = q / 100 * self.count
+        seen = 0
+        for bucket, count in enumerate(self.buckets):
+            seen += count
+            if seen >= rank and count:
+                return min(1 << (bucket + FIRST_BUCKET_SHIFT), self.max_ns)
+        return self.max_ns
+
+    def summary_ms(self):
+        """Mean, p99 and max in ms, for compact stats such as /sessions."""
+        return {
+            "mean": self.total_ns / self.count / 1e6 if self.count else 0.0,
+            "p99": self.percentile(99) / 1e6,
+            "max": self.max_ns / 1e6,
+        }
+
+    def to_dict(self):
+        return {
+            "count": self.count,
+            "total_s": self.total_ns / 1e9,
+            "mean_ms": self.total_ns / self.count / 1e6 if self.count else 0.0,
+            "min_ms": (self.min_ns or 0) / 1e6,
+            "p50_ms": self.percentile(50) / 1e6,
+            "p99_ms": self.percentile(99) / 1e6,
+            "max_ms": self.max_ns / 1e6,
+            "histogram_ns": {f"<{1 << (i + FIRST_BUCKET_SHIFT)}": n for i, n in enumerate(self.buckets) if n},
+        }
+
+
+class _PhaseTimer:
+    """Reusable context manager timing one phase (phases of the same name never nest)."""
+
+    __slots__ = ("profiler", "name", "stats", "start")
+
+    def __init__(self, profiler, name):
+        self.profiler = profiler
+        self.name = name
+        self.stats = PhaseStats()
+        self.start = 0
+
+    def __enter__(self):
+        self.start = time.perf_counter_ns()
+        return self
+
+    def __exit__(self, *exc):
+        end = time.perf_counter_ns()
+        self.stats.add(end - self.start)
+        if self.profiler.tracing:
+            self.profiler.trace_events.append(
+                {
+                    "name": self.name,
+                    "ph": "X",
+                    "ts": (self.start - self.profiler.origin_ns) / 1000,
+                    "dur": (end - self.start) / 1000,
+                    "pid": os.getpid(),
+                    "tid": threading.get_ident(),
+                }
+            )
+        return False
+
+
+class PhaseProfiler:
+    """
+    Low-overhead timers for the phases of a training step (act, step,
+    get_state, remember, replay, render, ...), using the monotonic
+    perf_counter clock and a fixed-size histogram per phase.
+
+    When disabled, phase() returns a shared no-op context, so instrumented
+    code costs one method call per phase. When enabled, a summary table is
+    printed every report_every episodes and at the end of training.
+
+    trace_path additionally records trace_episodes episodes from trace_start
+    (default: the first episode profiled), either as a Chrome trace (trace_format="chrome", open in chrome://tracing
+    or Perfetto) or as cProfile stats (trace_format="cprofile", read with pstats).
+    """
+
+    def __init__(
+        self,
+        enabled=False,
+        report_every=0,  # Print a summary every N episodes (0 = only at the end)
+        trace_path=None,
+        trace_format="chrome",  # "chrome" or "cprofile"
+        trace_start=None,  # First episode (0-based) of the trace window
+        trace_episodes=5,  # Number of episodes traced
+    ):
+        self.enabled = enabled or trace_path is not None
+        self.report_every = report_every
+        self.trace_path = trace_path
+        self.trace_format = trace_format
+        self.trace_start = trace_start
+        self.trace_episodes = trace_episodes
+
+        self.timers = {}
+        self.wall_ns = 0
+        self.episodes = 0
+        self.episode_start = 0
+
+        # Trace window state
+        self.origin_ns = time.perf_counter_ns()
+        self.tracing = False
+        self.trace_events = []
+        self.cprofile = None
+
+    @classmethod
+    def from_args(cls, args):
+        """Build a profiler from the options added by add_profiler_arguments."""
+        start = max(0, args.trace_start - 1) if args.trace_start else None
+        return cls(
+            enabled=args.profile,
+            report_every=args.profile_every,
+            trace_path=args.trace,
+            trace_format=args.trace_format,
+            trace_start=start,
+            trace_episodes=args.trace_episodes,
+        )
+
+    def phase(self, name):
+        """Context manager timing one phase of the current step."""
+        if not self.enabled:
+            return _NULL_PHASE
+        timer = self.timers.get(name)
+        if timer is None:
+            timer = self.timers[name] = _PhaseTimer(self, name)
+        return timer
+
+    def start_episode(self, episode):
+        """Mark the start of an episode; opens the trace window when it is reached."""
+        if not self.enabled:
+            return
+        if self.trace_path and not self.tracing:
+            if self.trace_start is None:
+                self.trace_start = episode
+            if episode == self.trace_start:
+                self._start_trace()
+        self.episode_start = time.perf_counter_ns()
+
+    def end_episode(self, episode):
+        """Mark the end of an episode; prints periodic summaries and closes the trace window."""
+        if not self.enabled:
+            return
+        self.wall_ns += time.perf_counter_ns() - self.episode_start
+        self.episodes += 1
+
+        if self.tracing and episode + 1 >= self.trace_start + self.trace_episodes:
+            self._stop_trace()
+        if self.report_every and self.episodes % self.report_every == 0:
+            print(self.format_summary(f"Profile after {self.episodes} episodes"))
+
+    def finish(self):
+        """Close an unfinished trace window and print the final summary."""
+        if not self.enabled:
+            return
+        if self.tracing:
+            self._stop_trace()
+        print(self.format_summary("Training profile"))
+
+    def summary(self):
+        """Per-phase statistics plus the profiled wall time, as a JSON-friendly dict."""
+        return {
+            "episodes": self.episodes,
+            "wall_s": self.wall_ns / 1e9,
+            "phases": {name: timer.stats.to_dict() for name, timer in self.timers.items()},
+        }
+
+    def format_summary(self, title="Training profile"):
+        """Format the per-phase statistics as a table, slowest phase first."""
+        wall_ns = max(1, self.wall_ns)
+        lines = [
+            f"{title} ({self.episodes} episodes, {self.wall_ns / 1e9:.2f}s):",
+            f"{'Phase':<16} {'Calls':>9} {'Total s':>9} {'% wall':>7} {'Mean ms':>9} "
+            f"{'p50 ms':>9} {'p99 ms':>9} {'Max ms':>9}",
+        ]
+        timers = sorted(self.timers.values(), key=lambda timer: timer.stats.total_ns, reverse=True)
+        for timer in timers:
+            stats = timer.stats
+            lines.append(
+                f"{timer.name:<16} {stats.count:>9d} {stats.total_ns / 1e9:>9.2f} "
+                f"{100 * stats.total_ns / wall_ns:>6.1f}% {stats.total_ns / max(1, stats.count) / 1e6:>9.3f} "
+                f"{stats.percentile(50) / 1e6:>9.3f} {stats.percentile(99) / 1e6:>9.3f} {stats.max_ns / 1e6:>9.3f}"
+            )
+        lines.append("Nested phases (e.g. replay.fit inside replay) are included in their parent's time.")
+        return "\n".join(lines)
+
+    def _start_trace(self):
+        print(f"Tracing {self.trace_episodes} episodes from episode {self.trace_start + 1} to {self.trace_path}")
+        if self.trace_format == "cprofile":
+            self.cprofile = cProfile.Profile()
+            self.cprofile.enable()
+        else:
+            self.trace_events = []
+        self.tracing = True
+
+    def _stop_trace(self):
+        self.tracing = False
+        os.makedirs(os.path.dirname(self.trace_path) or ".", exist_ok=True)
+
+        if self.cprofile is not None:
+            self.cprofile.disable()
+            self.cprofile.dump_stats(self.trace_path)
+            pstats.Stats(self.cprofile).sort_stats("cumulative").print_stats(20)
+            self.cprofile = None
+        else:
+            with open(self.trace_path, "w", encoding="utf-8") as f:
+                json.dump({"traceEvents": self.trace_events, "displayTimeUnit": "ms"}, f)
+            self.trace_events = []
+        print(f"Trace saved to {self.trace_path}")
+
+
+def add_profiler_arguments(parser):
+    """Add the profiling options shared by the training entry points."""
+    parser.add_argument("--profile", action="store_true", help="Time each phase of the training loop")
+    parser.add_argument(
+        "--profile-every", type=int, default=0, help="Print the phase timings every N episodes (0 = only at the end)"
+    )
+    parser.add_argument(
+        "--trace", type=str, default=None, help="Record a window of episodes to this file (implies --profile)"
+    )
+    parser.add_argument(
+        "--trace-format",
+        type=str,
+        default="chrome",
+        choices=["chrome", "cprofile"],
+        help="Chrome trace JSON (chrome://tracing, Perfetto) or cProfile stats",
+    )
+    parser.add_argument(
+        "--trace-start", type=int, default=None, help="First episode (1-based) to trace (default: first of the run)"
+    )
+    parser.add_argument("--trace-episodes", type=int, default=5, help="Number of episodes to trace")
@@ -0,0 +1,127 @@
+"""
+Experience replay memory for the DQN agent
+"""
+
+import json
+import os
+import random
+
+import numpy as np
+
+# Stored fields and their dtypes; states are (capacity, state_size), the rest (capacity,)
+FIELDS = {
+    "states": np.float32,
+    "actions": np.int64,
+    "rewards": np.float32,
+    "next_states": np.float32,
+    "dones": np.bool_,
+    "discounts": np.float32,
+}
+
+
+class ReplayBuffer:
+    """
+    Fixed-size ring buffer of transitions kept in preallocated numpy arrays.
+    Sampling gathers a batch with one fancy-index per field, and the buffer
+    can be saved as one .npy file per field and reloaded memory-mapped.
+    """
+
+    def __init__(self, capacity, state_size):
+        self.capacity = capacity
+        self.state_size = state_size
+        self.arrays = {
+            name: np.zeros((capacity, state_size) if name.endswith("states") else capacity, dtype=dtype)
+            for name, dtype in FIELDS.items()
+        }
+        self.size = 0
+        self.position = 0  # Next slot to write
+
+    def __len__(self):
+        return self.size
+
+    def append(self, state, action, reward, next_state, done, discount):
+        """Store a transition, overwriting the oldest one when full."""
+        i = self.position
+        self.arrays["states"][i] = state
+        self.arrays["actions"][i] = action
+        self.arrays["rewards"][i] = reward
+        self.arrays["next_states"][i] = next_state
+        self.arrays["dones"][i] = done
+        self.arrays["discounts"][i] = discount
+
+        self.position = (self.position + 1) % self.capacity
+        self.size = min(self.size + 1, self.capacity)
+
+    def extend(self, states, actions, rewards, next_states, dones, discounts):
+        """Store a block of transitions at once (e.g. from an offline dataset), oldest first."""
+        count = len(actions)
+        if count > self.capacity:
+            # Only the newest transitions would survive anyway
+            skip = count - self.capacity
+            states, actions, rewards = states[skip:], actions[skip:], rewards[skip:]
+            next_states, dones, discounts = next_states[skip:], dones[skip:], discounts[skip:]
+            count = self.capacity
+
+        indices = (self.position + np.arange(count)) % self.capacity
+        for name, values in zip(FIELDS, (states, actions, rewards, next_states, dones, discounts)):
+            self.arrays[name][indices] = values
+
+        self.position = (self.position + count) % self.capacity
+        self.size = min(self.size + count, self.capacity)
+
+    def sample(self, batch_size):
+        """
+        Sample a batch without replacement.
+        Returns (states, actions, rewards, next_states, dones, discounts) arrays.
+        """
+        indices = np.array(random.sample(range(self.size), batch_size))
+        return tuple(self.arrays[name][indices] for name in FIELDS)
+
+    def snapshot(self):
+        """Copy the buffer contents so they can be saved while training continues."""
+        return {
+            "capacity": self.capacity,
+            "size": self.size,
+            "position": self.position,
+            "arrays": {name: array.copy() for name, array in self.arrays.items()},
+        }
+
+    @staticmethod
+    def save_snapshot(snapshot, directory):
+        """Write a snapshot as one .npy file per field plus a small JSON header."""
+        os.makedirs(directory, exist_ok=True)
+        for name, array in snapshot["arrays"].items():
+            np.save(os.path.join(directory, f"{name}.npy"), array)
+        with open(os.path.join(directory, "buffer.json"), "w", encoding="utf-8") as f:
+            json.dump({key: snapshot[key] for key in ("capacity", "size", "position")}, f)
+
+    def load(self, directory):
+        """
+        Restore the buffer from a saved directory.
+        With the same capacity the saved arrays are memory-mapped copy-on-write,
+        so even large buffers reload instantly; otherwise the most recent
+        transitions are copied in.
+        """
+        with open(os.path.join(directory, "buffer.json"), encoding="utf-8") as f:
+            header = json.load(f)
+
+        mode = "c" if header["capacity"] == self.capacity else "r"
+        saved = {name: np.load(os.path.join(directory, f"{name}.npy"), mmap_mode=mode) for name in FIELDS}
+        if saved["states"].shape[1:] != (self.state_size,):
+            raise ValueError(f"Saved replay buffer has state shape {saved['states'].shape[1:]}")
+
+        if mode == "c":
+            self.arrays = saved
+            self.size = header["size"]
+            self.position = header["position"]
+            return
+
+        # Different capacity: copy the newest transitions, oldest first
+        size = header["size"]
+        oldest = (header["position"] - size) % header["capacity"]
+        order = (oldest + np.arange(size)) % header["capacity"]
+        order = order[-self.capacity :]
+        for name in FIELDS:
+            self.arrays[name][: len(order)] = saved[name][order]
+        self.size = len(order)
+        self.position = self.size % self.capacity
@@ -0,0 +1,248 @@
+"""
+Parallel hyperparameter sweeps for the Snake Game agent
+"""
+
+import contextlib
+import csv
+import itertools
+import json
+import math
+import multiprocessing
+import os
+import random
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
+
+from agent.evaluator import init_worker_process
+
+# SnakeTrainer arguments that can be swept
+SWEEP_PARAMS = (
+    "gamma",
+    "epsilon_decay",
+    "learning_rate",
+    "batch_size",
+    "target_update_freq",
+    "max_steps",
+    "timeout_multiplier",
+    "n_step",
+)
+
+# Accept the DQNAgent name for the target network update frequency
+PARAM_ALIASES = {"update_target_freq": "target_update_freq"}
+
+# Parameters that must be integers when sampled from a range
+INT_PARAMS = ("batch_size", "target_update_freq", "max_steps", "timeout_multiplier", "n_step")
+
+
+def load_search_space(path):
+    """
+    Load a search space from JSON.
+    Each parameter maps to a list of values, or (random search only) to a
+    range: {"uniform": [low, high]}, {"log_uniform": [low, high]} or
+    {"int": [low, high]}.
+    """
+    with open(path, encoding="utf-8") as f:
+        raw_space = json.load(f)
+
+    space = {}
+    for name, values in raw_space.items():
+        name = PARAM_ALIASES.get(name, name)
+        if name not in SWEEP_PARAMS:
+            raise ValueError(f"Unknown sweep parameter: {name}")
+        space[name] = values
+    return space
+
+
+def grid_trials(space):
+    """Every combination of the listed parameter values; ranges can't be enumerated, so they are rejected."""
+    ranges = [name for name, values in space.items() if not isinstance(values, list)]
+    if ranges:
+        raise ValueError(
+            f"Grid search can't enumerate ranges ({', '.join(ranges)}); "
+            "use random search, or a space that lists the values of every parameter"
+        )
+
+    names = list(space)
+    return [dict(zip(names, combination)) for combination in itertools.product(*space.values())]
+
+
+def _sample(name, values, rng):
+    """Sample one parameter value from a list or a range."""
+    if isinstance(values, list):
+        return rng.choice(values)
+
+    kind, (low, high) = next(iter(values.items()))
+    if kind == "uniform":
+        value = rng.uniform(low, high)
+    elif kind == "log_uniform":
+        value = math.exp(rng.uniform(math.log(low), math.log(high)))
+    elif kind == "int":
+        return rng.randint(low, high)
+    else:
+        raise ValueError(f"Unknown range type for {name}: {kind}")
+    return int(round(value)) if name in INT_PARAMS else value
+
+
+def random_trials(space, num_trials, seed=0):
+    """Independently sampled parameter sets."""
+    rng = random.Random(seed)
+    return [{name: _sample(name, values, rng) for name, values in space.items()} for _ in range(num_trials)]
+
+
+def rung_milestones(min_episodes, max_episodes, eta):
+    """Episode counts at which trials are compared: min_episodes * eta^k below max_episodes."""
+    milestones = []
+    episodes = min_episodes
+    while episodes < max_episodes:
+        milestones.append(episodes)
+        episodes *= eta
+    return milestones
+
+
+class SuccessiveHalving:
+    """
+    Asynchronous successive halving.
+    When a trial reaches a rung, its average score is recorded in a store
+    shared by all workers and it continues only if it ranks in the top 1/eta
+    of the trials that have reached that rung so far.
+    """
+
+    def __init__(self, store, lock, milestones, eta=3):
+        self.store = store
+        self.lock = lock
+        self.milestones = set(milestones)
+        self.eta = eta
+
+    def should_stop(self, episodes_run, score):
+        """Record a score at a rung and decide whether the trial should stop."""
+        if episodes_run not in self.milestones:
+            return False
+
+        with self.lock:
+            # Manager proxies don't see in-place changes to nested lists, so reassign
+            scores = self.store.get(episodes_run, []) + [score]
+            self.store[episodes_run] = scores
+
+        keep = max(1, math.ceil(len(scores) / self.eta))
+        cutoff = sorted(scores, reverse=True)[keep - 1]
+        return score < cutoff
+
+
+def run_trial(trial_id, params, output_dir, episodes, seed, halving):
+    """Worker task: train one configuration, stopping early if successive halving says so."""
+    from agent.trainer import SnakeTrainer
+
+    trial_dir = os.path.join(output_dir, f"trial_{trial_id:03d}")
+    os.makedirs(trial_dir, exist_ok=True)
+
+    random.seed(seed + trial_id)
+    np.random.seed(seed + trial_id)
+
+    def on_episode_end(trainer, episode):
+        return halving.should_stop(episode + 1, trainer.metrics.avg_score)
+
+    result = {"trial": trial_id, **params}
+    start_time = time.time()
+
+    # Keep each trial's console output (including the progress bar) in its own log
+    with open(os.path.join(trial_dir, "train.log"), "w", encoding="utf-8") as log_file:
+        with contextlib.redirect_stdout(log_file), contextlib.redirect_stderr(log_file):
+            try:
+                import tensorflow as tf
+
+                tf.random.set_seed(seed + trial_id)
+                trainer = SnakeTrainer(
+                    model_name=os.path.join(trial_dir, "model.h5"),
+                    log_dir=trial_dir,
+                    episodes=episodes,
+                    save_freq=0,
+                    continue_training=False,
+                    on_episode_end=on_episode_end,
+                    **params,
+                )
+                trainer.train()
+            except Exception as e:
+                print(f"Trial failed: {e}")
+                result.update({"episodes": 0, "stopped_early": False, "error": str(e)})
+                return result
+
+    result.update(
+        {
+            "episodes": trainer.metrics.episodes,
+            "stopped_early": trainer.metrics.episodes < episodes,
+            "final_avg_score": float(trainer.metrics.avg_score),
+            "best_avg_score": float(trainer.metrics.best_avg_score),
+            "max_score": int(trainer.metrics.best_score),
+            "duration": time.time() - start_time,
+            "error": "",
+        }
+    )
+    return result
+
+
+def run_sweep(trials, output_dir, episodes, workers=None, tf_threads=1, min_episodes=None, eta=3, seed=0):
+    """
+    Run trials in parallel worker processes and write a results table.
+    Returns the per-trial results, best final average score first.
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    workers = workers or max(1, (os.cpu_count() or 1) // tf_threads)
+    min_episodes = min_episodes or max(1, episodes // eta**2)
+    milestones = rung_milestones(min_episodes, episodes, eta)
+
+    print(f"Running {len(trials)} trials on {workers} workers ({tf_threads} TF thread(s) each)")
+    print(f"Successive halving rungs at episodes: {milestones or 'none'} (eta={eta})")
+
+    # TensorFlow is not fork-safe, so always start fresh interpreters
+    context = multiprocessing.get_context("spawn")
+    results = []
+
+    with context.Manager() as manager:
+        halving = SuccessiveHalving(manager.dict(), manager.Lock(), milestones, eta)
+        with ProcessPoolExecutor(
+            max_workers=workers, mp_context=context, initializer=init_worker_process, initargs=(tf_threads,)
+        ) as executor:
+            futures = [
+                executor.submit(run_trial, trial_id, params, output_dir, episodes, seed, halving)
+                for trial_id, params in enumerate(trials)
+            ]
+            for future in as_completed(futures):
+                result = future.result()
+                results.append(result)
+                status = "stopped early" if result["stopped_early"] else "completed"
+                if result["error"]:
+                    status = f"failed: {result['error']}"
+                print(f"Trial {result['trial']} {status} after {result['episodes']} episodes ({len(results)}/{len(trials)})")
+
+    results.sort(key=lambda r: r.get("final_avg_score", float("-inf")), reverse=True)
+    write_results(results, os.path.join(output_dir, "results.csv"))
+    return results
+
+
+def write_results(results, path):
+    """Write trial results to CSV."""
+    param_names = [name for name in SWEEP_PARAMS if any(name in result for result in results)]
+    fieldnames = ["trial", *param_names, "episodes", "stopped_early", "final_avg_score", "best_avg_score"]
+    fieldnames += ["max_score", "duration", "error"]
+
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.DictWriter(f, fieldnames=fieldnames)
+        writer.writeheader()
+        writer.writerows(results)
+
+
+def format_results(results, limit=10):
+    """Format the best trials as a text table."""
+    lines = [f"{'Trial':>5} {'Episodes':>8} {'Final avg':>9} {'Best avg':>8}  Parameters"]
+    for result in results[:limit]:
+        params = ", ".join(f"{name}={result[name]:.4g}" for name in SWEEP_PARAMS if name in result)
+        if result["error"]:
+            lines.append(f"{result['trial']:>5} {'-':>8} {'-':>9} {'-':>8}  {params} (failed)")
+            continue
+        lines.append(
+            f"{result['trial']:>5} {result['episodes']:>8} {result['final_avg_score']:>9.2f} "
+            f"{result['best_avg_score']:>8.2f}  {params}"
+        )
+    return "\n".join(lines)
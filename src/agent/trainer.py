@@ -7,12 +7,84 @@ import time
 
 import matplotlib.pyplot as plt
 import numpy as np
+from matplotlib.figure import Figure
 from tqdm import tqdm
 
+from agent.checkpoint import CheckpointWriter
+from agent.dataset import TransitionDataset
 from agent.dqn_agent import DQNAgent
+from agent.metrics_log import MetricsLog, metrics_log_path, read_metrics_log
+from agent.profiler import PhaseProfiler
+from agent.training_state import load_training_state, state_dir_for, write_training_state
 from game.snake import SnakeGame
 
 
+def draw_metrics(fig, scores, avg_scores, epsilons, losses, episode_durations):
+    """Draw the training metric charts onto a figure."""
+    ax1, ax2, ax3, ax4 = fig.subplots(4, 1)
+
+    # Plot scores
+    ax1.plot(scores, label="Score", alpha=0.6)
+    ax1.plot(avg_scores, label="Avg Score (100 episodes)", linewidth=2)
+    ax1.set_xlabel("Episode")
+    ax1.set_ylabel("Score")
+    ax1.set_title("Score over Episodes")
+    ax1.legend()
+    ax1.grid(True, linestyle="--", alpha=0.7)
+
+    # Plot epsilon
+    ax2.plot(epsilons)
+    ax2.set_xlabel("Episode")
+    ax2.set_ylabel("Epsilon")
+    ax2.set_title("Exploration Rate (Epsilon) over Episodes")
+    ax2.grid(True, linestyle="--", alpha=0.7)
+
+    # Plot loss
+    if len(losses):
+        ax3.plot(losses)
+        ax3.set_xlabel("Episode")
+        ax3.set_ylabel("Loss")
+        ax3.set_title("Average Loss per Episode")
+        ax3.grid(True, linestyle="--", alpha=0.7)
+
+    # Plot episode duration
+    if len(episode_durations):
+        ax4.plot(episode_durations)
+        ax4.set_xlabel("Episode")
+        ax4.set_ylabel("Duration (s)")
+        ax4.set_title("Episode Duration over Episodes")
+        ax4.grid(True, linestyle="--", alpha=0.7)
+
+    fig.tight_layout()
+
+
+def metric_files(log_dir, episode=None):
+    """Paths of the files written for a metrics plot."""
+    suffix = f"_ep{episode}" if episode else ""
+    return [os.path.join(log_dir, f"training_metrics{suffix}.png")]
+
+
+def _write_atomic(path, write):
+    """Write a file through a temporary file and a rename, so readers never see a partial file."""
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "wb") as f:
+        write(f)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+
+def write_metrics(plot_path, log_path, episode=None):
+    """
+    Save the metrics plot, read from the metrics log up to the given episode.
+    Uses a standalone Figure rather than pyplot so it can run on the
+    checkpoint writer thread.
+    """
+    fig = Figure(figsize=(10, 15))
+    draw_metrics(fig, **read_metrics_log(log_path, last_episode=episode))
+    _write_atomic(plot_path, lambda f: fig.savefig(f, format="png"))
+
+
 class SnakeTrainer:
     """
     Trainer for the Snake Game agent
@@ -26,10 +98,20 @@ class SnakeTrainer:
         max_steps=2000,
         batch_size=64,
         target_update_freq=5,
+        gamma=0.95,
+        epsilon_decay=0.99,
+        learning_rate=0.001,
         save_freq=100,
         render_freq=0,  # 0 means no rendering during training
         timeout_multiplier=100,  # Default timeout multiplier
         continue_training=True,  # Whether to load existing model if available
+        n_step=1,  # Number of steps per replay transition (1 = classic DQN targets)
+        target_score=None,  # Average score whose first episode is recorded, for comparing setups
+        on_episode_end=None,  # Called as on_episode_end(trainer, episode); returning True stops training
+        keep_checkpoints=None,  # Keep only the last N checkpoints plus the best one (None keeps all)
+        profiler=None,  # PhaseProfiler for per-phase timings of the training loop (disabled by default)
+        dataset=None,  # Offline transition dataset directory used to pre-fill replay memory
+        pretrain_epochs=0,  # Passes of offline training over the dataset before the first episode
     ):
         self.model_name = model_name
         self.log_dir = log_dir
@@ -41,6 +123,13 @@ class SnakeTrainer:
         self.render_freq = render_freq
         self.timeout_multiplier = timeout_multiplier
         self.continue_training = continue_training
+        self.n_step = n_step
+        self.target_score = target_score
+        self.on_episode_end = on_episode_end
+        self.keep_checkpoints = keep_checkpoints
+        self.profiler = profiler or PhaseProfiler()
+        self.dataset = dataset
+        self.pretrain_epochs = pretrain_epochs
 
         # Create directories
         os.makedirs(os.path.dirname(model_name), exist_ok=True)
@@ -49,42 +138,75 @@ class SnakeTrainer:
         # Training stats
         self.start_time = time.time()
         self.timeout_count = 0
+        self.target_reached_episode = None
 
         # Initialize game and agent
         self.game = SnakeGame(max_steps_without_food=timeout_multiplier)
         self.agent = DQNAgent(
-            state_size=11, action_size=3, batch_size=batch_size, update_target_freq=target_update_freq
+            state_size=11,
+            action_size=3,
+            gamma=gamma,
+            epsilon_decay=epsilon_decay,
+            learning_rate=learning_rate,
+            batch_size=batch_size,
+            update_target_freq=target_update_freq,
+            n_step=n_step,
+            profiler=self.profiler,
         )
 
-        # Attempt to load existing model if continuing training
-        if continue_training and os.path.exists(model_name):
+        # Training metrics, streamed to an append-only log; only rolling summaries stay in memory
+        self.metrics = MetricsLog(metrics_log_path(log_dir, model_name))
+
+        # Resumable run state (weights, optimizer, epsilon, replay memory, metrics)
+        self.state_dir = state_dir_for(model_name)
+        self.start_episode = 0
+        metrics_state = None
+
+        # Attempt to resume the run, or at least load the existing model, if continuing training
+        if continue_training:
             try:
-                print(f"Loading existing model from {model_name}")
-                self.agent.load(model_name)
-                print("Model loaded successfully. Continuing training.")
+                metrics_state = self.resume()
+                if metrics_state is None:
+                    if os.path.exists(model_name):
+                        print(f"Loading existing model from {model_name}")
+                        self.agent.load(model_name)
+                        print("Model loaded successfully. Continuing training.")
             except Exception as e:
                 print(f"Error loading model: {e}")
                 print("Starting with a fresh model.")
 
-        # Training metrics
-        self.scores = []
-        self.avg_scores = []
-        self.epsilons = []
-        self.losses = []
-        self.episode_durations = []  # Track episode times
+        # Continue the log of a resumed run; otherwise start a new one
+        self.metrics.open(metrics_state)
+
+        # Checkpoints are written in the background so they don't stall training
+        self.checkpoint_writer = CheckpointWriter(self.agent, keep_last=keep_checkpoints)
 
     def train(self):
         """Train the agent."""
         print("Starting training...")
         print(f"Timeout multiplier: {self.timeout_multiplier}")
+        print(f"N-step returns: {self.n_step}")
+
+        if self.start_episode >= self.episodes:
+            print(f"Run already completed {self.start_episode} episodes; increase --episodes to train further")
 
-        progress_bar = tqdm(range(self.episodes), desc="Training")
+        # A resumed run already has its replay memory
+        if self.dataset and self.start_episode == 0:
+            self.load_dataset()
+
+        progress_bar = tqdm(
+            range(self.start_episode, self.episodes), desc="Training", initial=self.start_episode, total=self.episodes
+        )
 
         # Calculate how often to print progress - handling small episode counts
         print_freq = max(1, self.episodes // 10) if self.episodes > 1 else 1
 
+        profiler = self.profiler
+        phase = profiler.phase
+
         for e in progress_bar:
             episode_start = time.time()
+            profiler.start_episode(e)
 
             # Reset environment and agent metrics
             state = self.game.reset()
@@ -93,16 +215,21 @@ class SnakeTrainer:
             score = 0
             episode_loss = []
 
-            for _ in range(self.max_steps):
+            for step in range(self.max_steps):
                 # Decide action
-                action = self.agent.act(state)
+                with phase("act"):
+                    action = self.agent.act(state)
 
                 # Take action
-                _, reward, done, info = self.game.step(action)
-                next_state = self.game.get_state_for_agent()
+                with phase("step"):
+                    _, reward, done, info = self.game.step(action)
+                with phase("get_state"):
+                    next_state = self.game.get_state_for_agent()
 
-                # Remember experience
-                self.agent.remember(state, action, reward, next_state, done)
+                # Remember experience (the step limit truncates the episode without making it terminal)
+                truncated = step == self.max_steps - 1
+                with phase("remember"):
+                    self.agent.remember(state, action, reward, next_state, done, truncated)
 
                 # Set current state to next state
                 state = next_state
@@ -112,12 +239,14 @@ class SnakeTrainer:
 
                 # Train the model (experience replay)
                 if len(self.agent.memory) > self.batch_size:
-                    loss = self.agent.replay()
+                    with phase("replay"):
+                        loss = self.agent.replay()
                     episode_loss.append(loss)
 
                 # Render if required
                 if self.render_freq > 0 and e % self.render_freq == 0:
-                    self.game.render()
+                    with phase("render"):
+                        self.game.render()
                     self.game.tick(5)  # Small delay for visualization
 
                 if done:
@@ -126,16 +255,11 @@ class SnakeTrainer:
                         self.timeout_count += 1
                     break
 
-            # Store metrics
+            # Store metrics (avg_score is the moving average of the last 100 episodes)
             episode_duration = time.time() - episode_start
-            self.episode_durations.append(episode_duration)
-            self.scores.append(info["score"])
-            avg_score = np.mean(self.scores[-100:])  # Moving average of last 100 episodes
-            self.avg_scores.append(avg_score)
-            self.epsilons.append(self.agent.epsilon)
+            avg_score = self.record_episode(info, episode_loss, episode_duration)
 
-            if episode_loss:
-                self.losses.append(np.mean(episode_loss))
+            self.check_target_score(e, avg_score)
 
             # Update progress bar with key metrics
             progress_bar.set_postfix(
@@ -159,16 +283,13 @@ class SnakeTrainer:
 
             # Save the model periodically
             if self.save_freq > 0 and (e + 1) % self.save_freq == 0:
-                model_path = f"{self.model_name.replace('.h5', '')}_{e + 1}.h5"
-                self.agent.save(model_path)
-                print(f"Model checkpoint saved to {model_path}")
-
-                # Plot and save metrics
-                self.plot_metrics(save=True, episode=e + 1)
+                with phase("checkpoint"):
+                    model_path = self.save_checkpoint(e + 1, avg_score)
+                print(f"Saving model checkpoint to {model_path}")
 
                 # Print performance stats
                 elapsed = time.time() - self.start_time
-                avg_time_per_episode = elapsed / (e + 1)
+                avg_time_per_episode = elapsed / (e + 1 - self.start_episode)
                 estimated_time_left = avg_time_per_episode * (self.episodes - (e + 1))
                 hours, remainder = divmod(estimated_time_left, 3600)
                 minutes, seconds = divmod(remainder, 60)
@@ -179,8 +300,18 @@ class SnakeTrainer:
                     f"Timeout events: {self.timeout_count}/{e + 1} episodes ({(self.timeout_count / (e + 1)) * 100:.1f}%)"
                 )
 
-        # Save the final model
+            profiler.end_episode(e)
+
+            # Let the caller stop training early (e.g. hyperparameter sweeps)
+            if self.on_episode_end and self.on_episode_end(self, e):
+                print(f"Training stopped early after {e + 1} episodes")
+                break
+
+        # Finish pending checkpoint writes, then save the final model and run state
+        self.checkpoint_writer.close()
         self.agent.save(self.model_name)
+        write_training_state(self.state_dir, self.training_state_snapshot())
+        self.metrics.close()
         print(f"Final model saved to {self.model_name}")
 
         # Plot final metrics
@@ -191,65 +322,130 @@ class SnakeTrainer:
         hours, remainder = divmod(total_time, 3600)
         minutes, seconds = divmod(remainder, 60)
 
+        episodes_run = max(1, self.metrics.episodes)
+        session_episodes = max(1, self.metrics.episodes - self.start_episode)
+
         print(f"Total training time: {int(hours)}h {int(minutes)}m {int(seconds)}s")
-        print(f"Average time per episode: {total_time / self.episodes:.2f}s")
+        print(f"Average time per episode: {total_time / session_episodes:.2f}s")
         print(
-            f"Timeout events: {self.timeout_count}/{self.episodes} episodes ({(self.timeout_count / self.episodes) * 100:.1f}%)"
+            f"Timeout events: {self.timeout_count}/{episodes_run} episodes ({(self.timeout_count / episodes_run) * 100:.1f}%)"
         )
+        self.print_target_summary()
+        self.profiler.finish()
 
         return self.agent
 
-    def plot_metrics(self, save=False, episode=None):
-        """Plot training metrics."""
-        _, (ax1, ax2, ax3, ax4) = plt.subplots(4, 1, figsize=(10, 15))
-
-        # Plot scores
-        ax1.plot(self.scores, label="Score", alpha=0.6)
-        ax1.plot(self.avg_scores, label="Avg Score (100 episodes)", linewidth=2)
-        ax1.set_xlabel("Episode")
-        ax1.set_ylabel("Score")
-        ax1.set_title("Score over Episodes")
-        ax1.legend()
-        ax1.grid(True, linestyle="--", alpha=0.7)
-
-        # Plot epsilon
-        ax2.plot(self.epsilons)
-        ax2.set_xlabel("Episode")
-        ax2.set_ylabel("Epsilon")
-        ax2.set_title("Exploration Rate (Epsilon) over Episodes")
-        ax2.grid(True, linestyle="--", alpha=0.7)
-
-        # Plot loss
-        if self.losses:
-            ax3.plot(self.losses)
-            ax3.set_xlabel("Episode")
-            ax3.set_ylabel("Loss")
-            ax3.set_title("Average Loss per Episode")
-            ax3.grid(True, linestyle="--", alpha=0.7)
-
-        # Plot episode duration
-        if self.episode_durations:
-            ax4.plot(self.episode_durations)
-            ax4.set_xlabel("Episode")
-            ax4.set_ylabel("Duration (s)")
-            ax4.set_title("Episode Duration over Episodes")
-            ax4.grid(True, linestyle="--", alpha=0.7)
-
-        plt.tight_layout()
+    def load_dataset(self):
+        """Pre-fill replay memory from the offline dataset and optionally pretrain on it."""
+        dataset = TransitionDataset(self.dataset)
+        stored = dataset.fill_replay_memory(self.agent)
+        print(f"Pre-filled replay memory with {stored} transitions from {self.dataset}")
+
+        for epoch in range(self.pretrain_epochs):
+            start = time.time()
+            losses = [
+                self.agent.train_batch(*batch)
+                for batch in dataset.iter_batches(self.batch_size, self.agent.gamma, seed=epoch)
+            ]
+            elapsed = time.time() - start
+            print(
+                f"Pretraining epoch {epoch + 1}/{self.pretrain_epochs} | Loss: {np.mean(losses):.4f} | "
+                f"{len(losses) / elapsed:.0f} batches/s"
+            )
 
-        if save:
-            suffix = f"_ep{episode}" if episode else ""
-            plt.savefig(f"{self.log_dir}/training_metrics{suffix}.png")
-
-            # Save data to CSV
-            np.savetxt(f"{self.log_dir}/scores{suffix}.csv", np.array(self.scores), delimiter=",")
-            np.savetxt(f"{self.log_dir}/avg_scores{suffix}.csv", np.array(self.avg_scores), delimiter=",")
-            if self.losses:
-                np.savetxt(f"{self.log_dir}/losses{suffix}.csv", np.array(self.losses), delimiter=",")
-            if self.episode_durations:
-                np.savetxt(f"{self.log_dir}/durations{suffix}.csv", np.array(self.episode_durations), delimiter=",")
+    def check_target_score(self, episode, avg_score):
+        """Record the first episode at which the average score reaches the target."""
+        if self.target_score is None or self.target_reached_episode is not None:
+            return False
+        if avg_score >= self.target_score:
+            self.target_reached_episode = episode + 1
+            print(f"Target average score {self.target_score} reached at episode {self.target_reached_episode}")
+            return True
+        return False
+
+    def print_target_summary(self):
+        """Print episodes-to-target-score, used to compare training setups."""
+        if self.target_score is None:
+            return
+        if self.target_reached_episode is not None:
+            print(
+                f"Episodes to target score {self.target_score} (n_step={self.n_step}): {self.target_reached_episode}"
+            )
         else:
-            plt.show()
+            episodes = self.metrics.episodes
+            print(f"Target score {self.target_score} not reached in {episodes} episodes (n_step={self.n_step})")
+
+    def record_episode(self, info, episode_loss, episode_duration):
+        """Append a finished episode to the metrics log and return the rolling average score."""
+        record = self.metrics.append(
+            info["score"],
+            self.agent.epsilon,
+            loss=np.mean(episode_loss) if episode_loss else None,
+            duration=episode_duration,
+            timeout=info.get("timeout", False),
+        )
+        return record["avg_score"]
+
+    def training_state_snapshot(self):
+        """Copy the full run state (agent, counters and metrics log position) for writing to the run directory."""
+        return {
+            "agent": self.agent.get_training_state(),
+            "trainer": {
+                "episode": self.metrics.episodes,
+                "timeout_count": self.timeout_count,
+                "target_reached_episode": self.target_reached_episode,
+            },
+            "metrics": self.metrics.state(),
+        }
+
+    def resume(self):
+        """
+        Restore the latest run state from the state directory.
+        Returns the saved metrics log state, or None if there is nothing to resume from.
+        """
+        state = load_training_state(self.state_dir)
+        if state is None:
+            return None
+
+        print(f"Resuming training state from {self.state_dir}")
+        self.agent.set_training_state(state["agent"], memory_dir=state["memory_dir"])
+
+        trainer_state = state["trainer"]
+        self.start_episode = trainer_state["episode"]
+        self.timeout_count = trainer_state["timeout_count"]
+        self.target_reached_episode = trainer_state["target_reached_episode"]
+
+        print(
+            f"Resumed at episode {self.start_episode} | Epsilon: {self.agent.epsilon:.4f} | "
+            f"Replay memory: {len(self.agent.memory)} transitions"
+        )
+        return state["metrics"]
+
+    def save_checkpoint(self, episode, avg_score):
+        """
+        Queue a checkpoint (model weights plus metric plot) for the
+        background writer. Returns the checkpoint path.
+        """
+        model_path = f"{self.model_name.replace('.h5', '')}_{episode}.h5"
+        plot_files = metric_files(self.log_dir, episode)
+        self.checkpoint_writer.save(self.agent, model_path, score=avg_score, files=plot_files)
+
+        # The state snapshot syncs the metrics log, so the plot below reads complete records
+        state = self.training_state_snapshot()
+        self.checkpoint_writer.submit(write_metrics, plot_files[0], self.metrics.path, episode)
+        self.checkpoint_writer.submit(write_training_state, self.state_dir, state)
+        return model_path
+
+    def plot_metrics(self, save=False, episode=None):
+        """Plot training metrics from the metrics log."""
+        self.metrics.flush()
+        if save:
+            write_metrics(metric_files(self.log_dir, episode)[0], self.metrics.path, episode)
+            return
+
+        fig = plt.figure(figsize=(10, 15))
+        draw_metrics(fig, **read_metrics_log(self.metrics.path, last_episode=episode))
+        plt.show()
 
     def test(self, model_path=None, episodes=10, render=True, fps=5):
         """Test a trained agent."""
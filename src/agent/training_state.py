@@ -0,0 +1,110 @@
+"""
+Resumable training state for the Snake Game agent
+"""
+
+import json
+import os
+import shutil
+
+import numpy as np
+
+from agent.replay_buffer import ReplayBuffer
+
+# File in the state directory naming the most recent complete snapshot
+LATEST_FILE = "latest"
+
+
+def state_dir_for(model_name):
+    """Run directory holding the resumable state for a model, e.g. models/snake_dqn_state."""
+    base = model_name[: -len(".h5")] if model_name.endswith(".h5") else model_name
+    return f"{base}_state"
+
+
+def _fsync_tree(directory):
+    """Flush every file under a directory to disk."""
+    for root, _, files in os.walk(directory):
+        for name in files:
+            with open(os.path.join(root, name), "rb") as f:
+                os.fsync(f.fileno())
+
+
+def write_training_state(state_dir, state):
+    """
+    Write a full training snapshot to state_dir/episode_<N>.
+    The snapshot is built in a temporary directory and renamed into place,
+    then the `latest` pointer is swapped atomically, so a crash at any point
+    leaves the previous snapshot intact. Older snapshots are removed.
+    """
+    agent_state = state["agent"]
+    episode = state["trainer"]["episode"]
+    snapshot_name = f"episode_{episode}"
+    snapshot_dir = os.path.join(state_dir, snapshot_name)
+    tmp_dir = f"{snapshot_dir}.tmp"
+
+    shutil.rmtree(tmp_dir, ignore_errors=True)
+    os.makedirs(tmp_dir)
+
+    header = {
+        "trainer": state["trainer"],
+        "metrics": state["metrics"],
+        "epsilon": float(agent_state["epsilon"]),
+        "train_count": int(agent_state["train_count"]),
+    }
+    with open(os.path.join(tmp_dir, "state.json"), "w", encoding="utf-8") as f:
+        json.dump(header, f, indent=2)
+
+    # Network weights and optimizer slots, in their original order
+    arrays = {}
+    for group in ("weights", "target_weights", "optimizer"):
+        for i, value in enumerate(agent_state[group]):
+            arrays[f"{group}_{i:04d}"] = value
+    np.savez(os.path.join(tmp_dir, "networks.npz"), **arrays)
+
+    ReplayBuffer.save_snapshot(agent_state["memory"], os.path.join(tmp_dir, "memory"))
+    _fsync_tree(tmp_dir)
+
+    shutil.rmtree(snapshot_dir, ignore_errors=True)
+    os.replace(tmp_dir, snapshot_dir)
+
+    # Point at the new snapshot
+    latest_path = os.path.join(state_dir, LATEST_FILE)
+    with open(f"{latest_path}.tmp", "w", encoding="utf-8") as f:
+        f.write(snapshot_name)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(f"{latest_path}.tmp", latest_path)
+
+    # Remove older snapshots (memory-mapped files stay valid until unmapped)
+    for name in os.listdir(state_dir):
+        if name.startswith("episode_") and name != snapshot_name:
+            shutil.rmtree(os.path.join(state_dir, name), ignore_errors=True)
+
+
+def load_training_state(state_dir):
+    """
+    Load the latest snapshot from state_dir, or return None if there is none.
+    The replay memory is not read here; its directory is returned as
+    memory_dir so it can be memory-mapped by the agent.
+    """
+    latest_path = os.path.join(state_dir, LATEST_FILE)
+    if not os.path.exists(latest_path):
+        return None
+
+    with open(latest_path, encoding="utf-8") as f:
+        snapshot_dir = os.path.join(state_dir, f.read().strip())
+
+    with open(os.path.join(snapshot_dir, "state.json"), encoding="utf-8") as f:
+        header = json.load(f)
+
+    with np.load(os.path.join(snapshot_dir, "networks.npz")) as networks:
+        groups = {group: [] for group in ("weights", "target_weights", "optimizer")}
+        for key in sorted(networks.files):
+            group = key.rsplit("_", 1)[0]
+            groups[group].append(networks[key])
+
+    return {
+        "agent": {"epsilon": header["epsilon"], "train_count": header["train_count"], **groups},
+        "trainer": header["trainer"],
+        "metrics": header["metrics"],
+        "memory_dir": os.path.join(snapshot_dir, "memory"),
+    }
@@ -0,0 +1,236 @@
+"""
+Asyncio (ASGI) serving mode for the Flask apps, with native streaming routes
+"""
+
+import asyncio
+import io
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import parse_qs
+
+# Threads running the regular (non-streaming) Flask routes
+WSGI_THREADS = 32
+
+
+class LoopSignal:
+    """
+    Wakes coroutines on an event loop from other threads. A game or training
+    thread calls notify() after publishing; that is a single
+    call_soon_threadsafe (the loop's thread-safe queue), however many
+    coroutines wait, and the waiters are woken on the loop itself. Instead
+    of a timer per wait, one repeating timer wakes every waiter with False
+    each `timeout` seconds, so streams can send keep-alives.
+    """
+
+    def __init__(self, loop, timeout):
+        self.loop = loop
+        self.timeout = timeout
+        self.waiters = set()
+        self.timer = None  # Started by the first wait()
+
+    def notify(self):
+        """Wake every current waiter; safe to call from any thread."""
+        try:
+            self.loop.call_soon_threadsafe(self._wake)
+        except RuntimeError:
+            pass  # The loop was closed (server shutting down)
+
+    def _wake(self, result=True):
+        waiters, self.waiters = self.waiters, set()
+        for waiter in waiters:
+            if not waiter.done():
+                waiter.set_result(result)
+
+    def _expire(self):
+        self._wake(False)
+        self.timer = self.loop.call_later(self.timeout, self._expire)
+
+    async def wait(self):
+        """
+        Wait for the next notify(); returns False when the keep-alive timer fired
+        first (after at most `timeout` seconds). Check the condition before calling.
+        """
+        # A bare future: asyncio.wait_for would wrap every wait in a task and a timer
+        if self.timer is None:
+            self.timer = self.loop.call_later(self.timeout, self._expire)
+        waiter = self.loop.create_future()
+        self.waiters.add(waiter)
+        try:
+            return await waiter
+        finally:
+            self.waiters.discard(waiter)
+
+
+class AsyncRequest:
+    """What an async route needs from the ASGI scope: path, query arguments and cookies."""
+
+    def __init__(self, scope):
+        self.scope = scope
+        self.path = scope["path"]
+        self.args = {key: values[0] for key, values in parse_qs(scope.get("query_string", b"").decode()).items()}
+        self.cookies = {}
+        for name, value in scope.get("headers", []):
+            if name == b"cookie":
+                for cookie in value.decode("latin-1").split(";"):
+                    key, _, cookie_value = cookie.strip().partition("=")
+                    self.cookies[key] = cookie_value
+
+
+class AsgiApp:
+    """
+    ASGI application serving a Flask app. Routes registered with route() are
+    coroutines that stream their response from the event loop, so an idle
+    stream costs a suspended coroutine instead of a thread. Every other
+    request runs the Flask app on a thread pool, with its response buffered
+    (those routes return small JSON documents or pages).
+
+    request_metrics (a RequestMetrics) times the async routes up to the
+    start of their response; the Flask routes time themselves.
+    """
+
+    def __init__(self, flask_app, threads=WSGI_THREADS, request_metrics=None):
+        self.flask_app = flask_app
+        self.request_metrics = request_metrics
+        self.routes = {}
+        self.executor = ThreadPoolExecutor(max_workers=threads, thread_name_prefix="wsgi")
+
+    def route(self, path):
+        """Register an async route: handler(request) returns (status, headers, async iterator of bytes)."""
+
+        def register(handler):
+            self.routes[path] = handler
+            return handler
+
+        return register
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "lifespan":
+            await self._lifespan(receive, send)
+            return
+        if scope["type"] != "http":
+            return
+
+        handler = self.routes.get(scope["path"])
+        if handler is None:
+            await self._call_wsgi(scope, receive, send)
+            return
+
+        started = time.perf_counter_ns()
+        status, headers, chunks = await handler(AsyncRequest(scope))
+        await send({"type": "http.response.start", "status": status, "headers": _encode_headers(headers)})
+        if self.request_metrics:
+            self.request_metrics.add(scope["path"], time.perf_counter_ns() - started)
+        await stream_until_disconnect(chunks, receive, send)
+
+    async def _lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message["type"] == "lifespan.startup":
+                await send({"type": "lifespan.startup.complete"})
+            elif message["type"] == "lifespan.shutdown":
+                self.executor.shutdown(wait=False)
+                await send({"type": "lifespan.shutdown.complete"})
+                return
+
+    async def _call_wsgi(self, scope, receive, send):
+        body = b""
+        while True:
+            message = await receive()
+            body += message.get("body", b"")
+            if not message.get("more_body"):
+                break
+
+        loop = asyncio.get_running_loop()
+        status, headers, content = await loop.run_in_executor(self.executor, self._run_wsgi, scope, body)
+        await send({"type": "http.response.start", "status": status, "headers": headers})
+        await send({"type": "http.response.body", "body": content})
+
+    def _run_wsgi(self, scope, body):
+        response = {}
+
+        def start_response(status, response_headers, exc_info=None):
+            response["status"] = int(status.split(" ", 1)[0])
+            response["headers"] = _encode_headers(response_headers)
+
+        result = self.flask_app(_wsgi_environ(scope, body), start_response)
+        try:
+            content = b"".join(result)
+        finally:
+            if hasattr(result, "close"):
+                result.close()
+        return response["status"], response["headers"], content
+
+
+async def stream_until_disconnect(chunks, receive, send):
+    """
+    Send an async iterator of body chunks until it ends or the client goes
+    away; each send() returns once the chunk is handed to the transport, so
+    a slow client makes the stream fall behind instead of buffering.
+    """
+
+    async def watch_disconnect():
+        while (await receive())["type"] != "http.disconnect":
+            pass
+
+    disconnected = asyncio.ensure_future(watch_disconnect())
+    try:
+        async for chunk in chunks:
+            if disconnected.done():
+                break
+            await send({"type": "http.response.body", "body": chunk, "more_body": True})
+        if not disconnected.done():
+            await send({"type": "http.response.body", "body": b""})
+    except OSError:
+        pass  # Connection lost mid-write
+    finally:
+        disconnected.cancel()
+        await chunks.aclose()
+
+
+def _encode_headers(headers):
+    return [(name.lower().encode("latin-1"), str(value).encode("latin-1")) for name, value in headers]
+
+
+def _wsgi_environ(scope, body):
+    """WSGI environ for an ASGI HTTP scope."""
+    server = scope.get("server") or ("localhost", 80)
+    client = scope.get("client") or ("", 0)
+    environ = {
+        "REQUEST_METHOD": scope["method"],
+        "SCRIPT_NAME": scope.get("root_path", ""),
+        "PATH_INFO": scope["path"],
+        "QUERY_STRING": scope.get("query_string", b"").decode("latin-1"),
+        "SERVER_NAME": server[0],
+        "SERVER_PORT": str(server[1]),
+        "REMOTE_ADDR": client[0],
+        "SERVER_PROTOCOL": f"HTTP/{scope.get('http_version', '1.1')}",
+        "wsgi.version": (1, 0),
+        "wsgi.url_scheme": scope.get("scheme", "http"),
+        "wsgi.input": io.BytesIO(body),
+        "wsgi.errors": sys.stderr,
+        "wsgi.multithread": True,
+        "wsgi.multiprocess": False,
+        "wsgi.run_once": False,
+    }
+    for name, value in scope.get("headers", []):
+        name = name.decode("latin-1").upper().replace("-", "_")
+        value = value.decode("latin-1")
+        if name == "CONTENT_TYPE":
+            environ["CONTENT_TYPE"] = value
+        elif name == "CONTENT_LENGTH":
+            environ["CONTENT_LENGTH"] = value
+        else:
+            key = f"HTTP_{name}"
+            environ[key] = f"{environ[key]},{value}" if key in environ else value
+    return environ
+
+
+def serve(app, host, port):
+    """Serve an AsgiApp with uvicorn (an optional dependency, only needed for this mode) until it stops."""
+    try:
+        import uvicorn
+    except ImportError as e:
+        raise RuntimeError("The asyncio server needs uvicorn: pip install uvicorn") from e
+
+    uvicorn.Server(uvicorn.Config(app, host=host, port=port, log_level="warning", backlog=4096)).run()
@@ -0,0 +1,76 @@
+"""
+Compact state-delta protocol for streaming the Snake Game to browser clients
+"""
+
+# Ticks between periodic keyframes, so a client that missed something resynchronizes
+KEYFRAME_INTERVAL = 50
+
+
+class StateDeltaEncoder:
+    """
+    Turns successive game ticks into small messages instead of rendered frames.
+
+    A keyframe carries the full state: {"key": true, "seq", "grid": [w, h],
+    "cell", "snake": [[x, y], ...] (head first), "food", ...status}. A delta
+    only carries what changed since the previous tick: "head" (the new head
+    cell), "tail" (how many cells to drop from the end), "food" and any
+    changed status fields, e.g. {"seq": 812, "head": [14, 9], "tail": 1}.
+    Every message has a sequence number; a delta applies only on top of the
+    message with the previous one. Anything that isn't a single step of the
+    snake (a reset, a new game) is sent as a keyframe.
+    """
+
+    def __init__(self, keyframe_interval=KEYFRAME_INTERVAL):
+        self.keyframe_interval = keyframe_interval
+        self.seq = 0
+        self.last_keyframe = None
+        self.snake = None
+        self.food = None
+        self.status = None
+
+    def encode(self, game, status):
+        """Message for the current tick, plus the full state (a keyframe) at this tick."""
+        self.seq += 1
+        snake = list(game.snake)
+        food = list(game.food) if game.food else None
+        keyframe = {
+            "key": True,
+            "seq": self.seq,
+            "grid": [game.grid_width, game.grid_height],
+            "cell": game.grid_size,
+            "snake": [list(cell) for cell in snake],
+            "food": food,
+            **status,
+        }
+
+        delta = self._delta(snake, food, status)
+        if delta is None or self.seq - self.last_keyframe >= self.keyframe_interval:
+            self.last_keyframe = self.seq
+            message = keyframe
+        else:
+            message = delta
+
+        self.snake, self.food, self.status = snake, food, status
+        return message, keyframe
+
+    def _delta(self, snake, food, status):
+        """Delta from the previous tick, or None if it can't be expressed as one."""
+        previous = self.snake
+        if previous is None or self.status.keys() != status.keys():
+            return None
+
+        delta = {"seq": self.seq}
+        if snake != previous:
+            # One step: a new head, and the old body minus 0 (grew) or 1 dropped tail cells
+            dropped = len(previous) + 1 - len(snake)
+            if dropped not in (0, 1) or snake[1:] != previous[: len(snake) - 1]:
+                return None
+            delta["head"] = list(snake[0])
+            if dropped:
+                delta["tail"] = dropped
+        if food != self.food:
+            delta["food"] = food
+        for name, value in status.items():
+            if self.status[name] != value:
+                delta[name] = value
+        return delta
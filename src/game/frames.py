@@ -0,0 +1,56 @@
+"""
+Frame encoding for streaming the Snake Game to browsers
+"""
+
+import base64
+import io
+
+import pygame
+from PIL import Image, features
+
+# Formats frames can be encoded in, and their MIME types
+FRAME_FORMATS = {"png": "image/png", "jpeg": "image/jpeg", "webp": "image/webp"}
+
+
+def surface_to_png(surface):
+    """Encode a Pygame surface as PNG bytes."""
+    image_data = pygame.image.tostring(surface, "RGB")
+
+    image = Image.frombytes("RGB", surface.get_size(), image_data)
+    buffered = io.BytesIO()
+    image.save(buffered, format="PNG")
+    return buffered.getvalue()
+
+
+def surface_to_base64(surface):
+    """Convert a Pygame surface to base64 string for embedding in HTML."""
+    return base64.b64encode(surface_to_png(surface)).decode("utf-8")
+
+
+class FrameEncoder:
+    """
+    Encodes surfaces in a configurable format, to trade server CPU for
+    bandwidth: PNG is lossless (compress_level 0-9, lower is faster but
+    larger), JPEG and WebP are lossy (quality 1-100). For the game's flat
+    colors JPEG is the fastest to encode, WebP the smallest but slowest.
+    """
+
+    def __init__(self, format="png", quality=80, compress_level=6):
+        if format not in FRAME_FORMATS:
+            raise ValueError(f"Unknown frame format '{format}', expected one of {sorted(FRAME_FORMATS)}")
+        if format == "webp" and not features.check("webp"):
+            raise ValueError("This Pillow build has no WebP support")
+        self.format = format
+        self.quality = quality
+        self.compress_level = compress_level
+        self.mimetype = FRAME_FORMATS[format]
+
+    def encode(self, surface):
+        """Encode a Pygame surface as bytes of the configured format."""
+        image = Image.frombytes("RGB", surface.get_size(), pygame.image.tostring(surface, "RGB"))
+        buffered = io.BytesIO()
+        if self.format == "png":
+            image.save(buffered, format="PNG", compress_level=self.compress_level)
+        else:
+            image.save(buffered, format=self.format.upper(), quality=self.quality)
+        return buffered.getvalue()
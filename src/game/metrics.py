@@ -0,0 +1,131 @@
+"""
+Prometheus text exposition of the web servers' metrics
+"""
+
+import threading
+import time
+
+from flask import Response, g, request
+
+from agent.profiler import FIRST_BUCKET_SHIFT, PhaseStats
+
+# Content type of the Prometheus text format
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# Scale of PhaseStats values into the exported unit
+NS_TO_SECONDS = 1e-9
+
+
+def _format(value):
+    return f"{value:.9g}" if isinstance(value, float) else str(value)
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(labels):
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in labels.items()) + "}"
+
+
+class MetricsWriter:
+    """
+    Builds one scrape in the Prometheus text format. Samples of a metric can
+    be added in any order (e.g. one per session or route) and are written
+    grouped under its HELP and TYPE lines.
+
+    Histograms are exported straight from PhaseStats: its log2 buckets become
+    cumulative `le` buckets (scaled, by default from ns to seconds), so a
+    scrape never takes the instrumented code's locks. The count is taken from
+    the copied buckets, so it always matches the +Inf bucket even while the
+    owning thread keeps adding samples.
+    """
+
+    def __init__(self):
+        self.metrics = {}  # Name -> (type, help, sample lines), in first-added order
+
+    def _samples(self, name, kind, help_text):
+        metric = self.metrics.get(name)
+        if metric is None:
+            metric = self.metrics[name] = (kind, help_text, [])
+        return metric[2]
+
+    def counter(self, name, help_text, value, **labels):
+        self._samples(name, "counter", help_text).append(f"{name}{_labels(labels)} {_format(value)}")
+
+    def gauge(self, name, help_text, value, **labels):
+        self._samples(name, "gauge", help_text).append(f"{name}{_labels(labels)} {_format(value)}")
+
+    def histogram(self, name, help_text, stats, scale=NS_TO_SECONDS, **labels):
+        """A PhaseStats as a histogram; scale=1 exports raw values (e.g. bytes)."""
+        samples = self._samples(name, "histogram", help_text)
+        buckets = list(stats.buckets)
+        cumulative = 0
+        for bucket, count in enumerate(buckets[:-1]):
+            cumulative += count
+            bound = (1 << (bucket + FIRST_BUCKET_SHIFT)) * scale
+            samples.append(f"{name}_bucket{_labels({**labels, 'le': _format(bound)})} {cumulative}")
+        cumulative += buckets[-1]
+        samples.append(f"{name}_bucket{_labels({**labels, 'le': '+Inf'})} {cumulative}")
+        samples.append(f"{name}_sum{_labels(labels)} {_format(stats.total_ns * scale)}")
+        samples.append(f"{name}_count{_labels(labels)} {cumulative}")
+
+    def render(self):
+        lines = []
+        for name, (kind, help_text, samples) in self.metrics.items():
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {kind}")
+            lines.extend(samples)
+        return "\n".join(lines) + "\n"
+
+
+class RequestMetrics:
+    """
+    Latency of every request by route (the URL rule, not the path, so
+    session ids don't multiply the series), from the request arriving to its
+    response (for streams: to the response starting). Each route's PhaseStats
+    is guarded by its own lock, held for the few integer updates of add().
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()  # Only taken to add a route
+        self.routes = {}  # Route -> (lock, PhaseStats)
+
+    def add(self, route, duration_ns):
+        entry = self.routes.get(route)
+        if entry is None:
+            with self.lock:
+                entry = self.routes.setdefault(route, (threading.Lock(), PhaseStats()))
+        with entry[0]:
+            entry[1].add(duration_ns)
+
+    def install(self, app):
+        """Time every request of a Flask app."""
+
+        @app.before_request
+        def start_request_timer():
+            g.request_started = time.perf_counter_ns()
+
+        @app.after_request
+        def record_request_latency(response):
+            started = g.get("request_started")
+            if started is not None:
+                route = request.url_rule.rule if request.url_rule else "unmatched"
+                self.add(route, time.perf_counter_ns() - started)
+            return response
+
+    def write(self, metrics):
+        with self.lock:
+            routes = sorted(self.routes.items())
+        for route, (_, stats) in routes:
+            metrics.histogram("snake_http_request_duration_seconds", "Request latency by route", stats, route=route)
+
+
+def metrics_response(write, request_metrics):
+    """A /metrics response: write(metrics) adds the app's metrics, then the request latencies."""
+    metrics = MetricsWriter()
+    write(metrics)
+    request_metrics.write(metrics)
+    return Response(metrics.render(), content_type=CONTENT_TYPE)
@@ -0,0 +1,954 @@
+"""
+Per-browser game sessions for the Snake Game web server, ticked by one scheduler thread
+and rendered by a separate render+encode worker
+"""
+
+import base64
+import json
+import math
+import threading
+import time
+import uuid
+from collections import defaultdict, deque
+
+import numpy as np
+import pygame
+
+from agent.model_cache import AgentReloader
+from agent.profiler import PhaseStats
+from game.asgi import LoopSignal
+from game.delta import StateDeltaEncoder
+from game.frames import FrameEncoder
+from game.snake import DOWN, LEFT, RIGHT, UP, SnakeGame, draw_game
+
+# Seconds a stream waits for a new tick before sending a keep-alive
+STREAM_KEEPALIVE = 15.0
+
+# Id of the pinned agent game anyone can watch at /watch
+SHOWCASE_SESSION = "showcase"
+
+# Frames keep being rendered for this many seconds after the last /get_frame or /get_game_state poll
+FRAME_POLL_WINDOW = 2.0
+
+# Ticks an agent game waits after game over before restarting (2 seconds at 10 FPS)
+AUTO_RESTART_TICKS = 20
+
+# Pending key presses per game; beyond this, commands are refused rather than dropped
+INPUT_QUEUE_SIZE = 64
+
+# Keys that turn the snake, and the direction they turn it to
+TURN_KEYS = {"up": UP, "right": RIGHT, "down": DOWN, "left": LEFT}
+
+# Largest agent batch size histogram bucket tracked individually
+BATCH_SIZE_BUCKETS = [1, 2, 4, 8, 16, 32, 64, 128, 256, 512]
+
+
+def _encode_event(message):
+    """A state message as a server-sent event, ready to be written to any number of streams."""
+    return b"data: " + json.dumps(message, separators=(",", ":")).encode() + b"\n\n"
+
+
+class Subscriber:
+    """
+    One open state stream of a channel (the player's page or a spectator):
+    the ticks it was sent, the ticks it skipped because it fell behind, and
+    its lag from a tick being published to the event being written out.
+    """
+
+    def __init__(self, subscriber_id, kind):
+        self.id = subscriber_id
+        self.kind = kind  # 'player' or 'spectator'
+        self.connected_at = time.monotonic()
+        self.tick = 0  # Last tick delivered
+        self.synced = False
+        self.pending = None  # (tick, published_at) of the event being written
+        self.sent = 0
+        self.dropped = 0
+        self.lag = PhaseStats()
+
+    def next_event(self, channel, tick, event, published_at):
+        """
+        Event to send for the channel's latest tick: its delta, or the keyframe
+        when the stream just opened or missed ticks (those count as dropped).
+        """
+        if not self.synced or tick != self.tick + 1:
+            if self.synced:
+                self.dropped += tick - self.tick - 1
+            tick, event, published_at = channel.keyframe_event()
+            self.synced = True
+        self.pending = (tick, published_at)
+        return event
+
+    def delivered(self):
+        """Record the pending event as written; a stream only resumes once the write returned."""
+        tick, published_at = self.pending
+        if self.sent:
+            # The first event is the keyframe of whatever tick was current when the stream opened
+            self.lag.add(time.perf_counter_ns() - published_at)
+        self.tick = tick
+        self.sent += 1
+
+    def stats(self):
+        return {
+            "id": self.id,
+            "kind": self.kind,
+            "connected_s": time.monotonic() - self.connected_at,
+            "sent": self.sent,
+            "dropped": self.dropped,
+            "lag_ms": self.lag.summary_ms(),
+        }
+
+
+class GameChannel:
+    """
+    What a session publishes: once per tick the state-delta message and the
+    full state as a keyframe, and, from the render worker, encoded frames
+    while anyone consumes them. Streaming responses block on the condition
+    until a newer tick or frame is published. Frames are latest-wins; a state
+    stream that missed ticks gets the keyframe instead of the deltas it skipped.
+
+    The channel is also the broadcast hub for spectators: each tick's message
+    is serialized into a server-sent event once (and the keyframe at most
+    once per tick, for streams that resynchronize), and every subscriber
+    writes those same bytes. Nothing is queued per subscriber, so a slow
+    client skips ticks rather than buffering them. Streams served from an
+    event loop wait on a LoopSignal that every publish notifies.
+
+    The state version only advances on ticks that changed something, and
+    each frame carries the version of the game state it shows, so polling
+    clients can be answered 304 Not Modified by ETag.
+    """
+
+    def __init__(self):
+        self.condition = threading.Condition()
+        self.tick = 0
+        self.version = 0  # Ticks that changed the game or its status
+        self.closed = False
+        self.event = None  # This tick's delta (or keyframe) message as a server-sent event
+        self.keyframe = None  # Full state at this tick
+        self.published_at = 0  # perf_counter_ns() of the publish, for subscriber lag
+        self._keyframe_event = (0, None)  # Keyframe as an event, encoded when a stream first needs it
+        self.frame = None  # Encoded frame, only while frames are consumed
+        self.frame_version = 0  # Version of the session's frame snapshots the frame shows
+        self._base64 = (0, None)  # Base64 of the frame for the polling routes, encoded on demand
+
+        # Frame consumers: open /frame_stream responses and the time of the last frame poll
+        self.lock = threading.Lock()
+        self.frame_streams = 0
+        self.frame_polled_at = 0.0
+
+        # Open state streams
+        self.subscribers = {}
+        self.subscriber_ids = 0
+        self.signal = None  # LoopSignal for streams on the asyncio server, created by the first one
+
+    def publish(self, message, keyframe, changed=True):
+        event = _encode_event(message)
+        with self.condition:
+            self.tick += 1
+            if changed:
+                self.version += 1
+            self.event = event
+            self.keyframe = keyframe
+            self.published_at = time.perf_counter_ns()
+            self.condition.notify_all()
+        if self.signal:
+            self.signal.notify()
+
+    def publish_frame(self, frame, version):
+        with self.condition:
+            self.frame = frame
+            self.frame_version = version
+            self.condition.notify_all()
+        if self.signal:
+            self.signal.notify()
+
+    def close(self):
+        """Wake every stream so it can end (the session was evicted)."""
+        with self.condition:
+            self.closed = True
+            self.condition.notify_all()
+        if self.signal:
+            self.signal.notify()
+
+    def loop_signal(self, loop):
+        """The signal async streams on loop wait on (one per channel)."""
+        with self.lock:
+            if self.signal is None:
+                self.signal = LoopSignal(loop, STREAM_KEEPALIVE)
+            return self.signal
+
+    def latest(self):
+        """(tick, event, published_at) of the latest tick, without waiting."""
+        with self.condition:
+            return self.tick, self.event, self.published_at
+
+    def latest_frame(self):
+        """(frame_version, frame) of the latest frame, without waiting."""
+        with self.condition:
+            return self.frame_version, self.frame
+
+    def wait(self, last_tick, timeout=STREAM_KEEPALIVE):
+        """Wait for a tick newer than last_tick; returns (tick, event, published_at), unchanged on timeout."""
+        with self.condition:
+            self.condition.wait_for(lambda: self.tick != last_tick or self.closed, timeout)
+            return self.tick, self.event, self.published_at
+
+    def keyframe_event(self):
+        """(tick, keyframe as an event, published_at) of the latest tick, serialized once per tick."""
+        with self.condition:
+            tick, keyframe, published_at = self.tick, self.keyframe, self.published_at
+        if self._keyframe_event[0] != tick:
+            self._keyframe_event = (tick, _encode_event(keyframe))
+        return tick, self._keyframe_event[1], published_at
+
+    def subscribe(self, kind):
+        with self.lock:
+            self.subscriber_ids += 1
+            subscriber = Subscriber(self.subscriber_ids, kind)
+            self.subscribers[subscriber.id] = subscriber
+        return subscriber
+
+    def unsubscribe(self, subscriber):
+        with self.lock:
+            self.subscribers.pop(subscriber.id, None)
+
+    def subscriber_stats(self, detail=False):
+        """Subscriber counts and lag (the worst p99 and the median of the p99s), with per-subscriber stats on detail."""
+        with self.lock:
+            subscribers = list(self.subscribers.values())
+        lags = sorted(subscriber.lag.percentile(99) / 1e6 for subscriber in subscribers)
+        stats = {
+            "subscribers": len(subscribers),
+            "spectators": sum(1 for subscriber in subscribers if subscriber.kind == "spectator"),
+            "tick": self.tick,
+            "dropped": sum(subscriber.dropped for subscriber in subscribers),
+            "lag_p99_ms": {"median": lags[len(lags) // 2] if lags else 0.0, "max": lags[-1] if lags else 0.0},
+        }
+        if detail:
+            stats["subscriber_stats"] = [subscriber.stats() for subscriber in subscribers]
+        return stats
+
+    def wait_frame(self, last_version, timeout=STREAM_KEEPALIVE):
+        """Wait for a frame newer than last_version; returns (frame_version, frame), unchanged on timeout."""
+        with self.condition:
+            self.condition.wait_for(lambda: self.frame_version != last_version or self.closed, timeout)
+            return self.frame_version, self.frame
+
+    def wants_frames(self):
+        """Whether the session needs to render and encode frames at all."""
+        return self.frame_streams > 0 or time.monotonic() - self.frame_polled_at < FRAME_POLL_WINDOW
+
+    def open_frame_stream(self, delta):
+        with self.lock:
+            self.frame_streams += delta
+
+    def frame_base64(self):
+        """(frame version, base64 of the frame), encoded once per frame version."""
+        self.frame_polled_at = time.monotonic()
+        with self.condition:
+            version, frame = self.frame_version, self.frame
+        if self._base64[0] != version:
+            self._base64 = (version, base64.b64encode(frame).decode("utf-8") if frame else None)
+        return self._base64
+
+
+class InputQueue:
+    """
+    Thread-safe, bounded FIFO of a game's key presses with their arrival
+    times. Request threads put(), the scheduler takes once per tick. A full
+    queue refuses new input (the client is told) instead of losing it.
+    """
+
+    def __init__(self, maxsize=INPUT_QUEUE_SIZE):
+        self.maxsize = maxsize
+        self.items = deque()
+        self.lock = threading.Lock()
+        self.received = 0
+        self.rejected = 0
+        self.latency = PhaseStats()  # From arrival to being applied by a tick
+
+    def put(self, key):
+        with self.lock:
+            if len(self.items) >= self.maxsize:
+                self.rejected += 1
+                return False
+            self.items.append((key, time.monotonic()))
+            self.received += 1
+            return True
+
+    def take(self, direction):
+        """
+        Commands to apply this tick, in order: every command up to and including
+        the first turn that changes the direction. Later turns stay queued for
+        the next ticks, so up+left pressed within one tick become two
+        consecutive turns. Turns into the current or reverse direction are
+        no-ops and are consumed on the way.
+        """
+        taken = []
+        with self.lock:
+            while self.items:
+                key, received = self.items.popleft()
+                taken.append((key, received))
+                turn = TURN_KEYS.get(key)
+                if turn is not None and turn != direction and turn != (direction + 2) % 4:
+                    break
+        if taken:
+            now = time.monotonic()
+            for _, received in taken:
+                self.latency.add(int((now - received) * 1e9))
+        return taken
+
+    def __len__(self):
+        return len(self.items)
+
+    def stats(self):
+        return {
+            "received": self.received,
+            "rejected": self.rejected,
+            "queued": len(self.items),
+            "latency_ms": self.latency.summary_ms(),
+        }
+
+
+class GameSession:
+    """
+    One browser's game: the SnakeGame, its mode and agent, pending input,
+    and the channel its clients stream from. prepare() and finish() are the
+    body of the old single-game loop and only ever run on the scheduler
+    thread; frames are drawn from snapshots by the FrameRenderer.
+    """
+
+    def __init__(self, session_id, manager, mode, model_path, fps, screen):
+        self.id = session_id
+        self.manager = manager
+        self.mode = mode  # 'human' or 'agent'
+        self.model_path = model_path
+        self.game = SnakeGame(screen=screen)
+        self.channel = GameChannel()
+        self.encoder = StateDeltaEncoder()
+
+        self.inputs = InputQueue()
+        self.pinned = False  # Pinned sessions (the showcase) are never evicted
+        self.game_started = False
+        self.restart_requested = False
+        self.auto_restart_delay = 0
+        self.score = 0
+        self.status = "waiting"  # 'waiting', 'running', 'game_over'
+        self.status_text = "Waiting to start"
+        self.last_action = None
+
+        # Change detection: the last published state, and the last snapshot sent to the renderer with its version
+        self.last_state = None
+        self.last_snapshot = None
+        self.frame_version = 0
+        self.frames_skipped = 0
+
+        # Scheduling: ticks are due every period seconds on a grid shared by all sessions with
+        # the same FPS, so their ticks (and agent inference) line up; lag is how late each one ran
+        self.period = 1.0 / fps
+        self.next_tick = math.ceil(time.monotonic() / self.period) * self.period
+        self.pending_step = None  # What finish() does this tick: "agent", "human" or None
+        self.tick_started = None  # perf_counter_ns() of the current tick's prepare(), None before the first one
+        self.created_at = time.time()
+        self.last_seen = time.monotonic()
+        self.tick_lag = PhaseStats()
+        self.tick_duration = PhaseStats()
+
+    @property
+    def agent_source(self):
+        reloader = self.manager.reloaders.get(self.model_path) if self.mode == "agent" else None
+        return reloader.source if reloader else None
+
+    def touch(self):
+        """Mark the session as in use (requests and open streams keep it from being evicted)."""
+        self.last_seen = time.monotonic()
+
+    def status_dict(self):
+        """Game status sent to clients with each tick."""
+        return {
+            "score": self.score,
+            "status": self.status,
+            "status_text": self.status_text,
+            "last_action": self.last_action,
+            "mode": self.mode,
+            "model_path": self.model_path,
+            "model_source": self.agent_source,
+        }
+
+    def set_mode(self, mode, model_path):
+        self.mode = mode
+        self.model_path = model_path
+
+    def prepare(self, now):
+        """
+        First half of a due tick: schedule the next one (missed ticks are skipped
+        rather than run in a burst), then apply input, restarts and status.
+        Returns the agent's observation if the agent has to act this tick, else None.
+        """
+        lag = int((now - self.next_tick) * 1e9)
+        self.tick_lag.add(lag)
+        self.manager.tick_lag.add(lag)
+        missed = int((now - self.next_tick) // self.period)
+        self.next_tick += (missed + 1) * self.period
+        self.tick_started = time.perf_counter_ns()
+
+        game = self.game
+        self.pending_step = None
+
+        # Process the queued commands from the web interface, at most one turn per tick
+        for key, _ in self.inputs.take(game.direction):
+            turn = TURN_KEYS.get(key)
+            if turn is not None:
+                if turn != (game.direction + 2) % 4:
+                    game.direction = turn
+            elif key == "r" and game.game_over:
+                self.restart_requested = True
+            elif key == "space" and not self.game_started:
+                self.game_started = True
+
+        # Reset the game if requested
+        if self.restart_requested:
+            game.reset()
+            self.restart_requested = False
+            self.game_started = True
+            self.status = "running"
+            self.status_text = "Game running"
+            self.score = 0
+
+        # Auto restart for agent mode after game over
+        if self.mode == "agent" and game.game_over:
+            self.auto_restart_delay += 1
+            if self.auto_restart_delay >= AUTO_RESTART_TICKS:
+                game.reset()
+                self.game_started = True
+                self.auto_restart_delay = 0
+                self.status = "running"
+                self.status_text = "Game running - auto restart"
+                self.score = 0
+
+        # Update game state
+        if self.game_started and not game.game_over:
+            self.status = "running"
+            self.status_text = "Game running"
+
+            if self.mode == "agent":
+                if self.manager.agent(self.model_path) is None:
+                    # Switched to agent mode; wait until the model has loaded
+                    reloader = self.manager.reloaders.get(self.model_path)
+                    self.status_text = (reloader and reloader.error) or "Loading model..."
+                else:
+                    # The agent plays the game; its action comes from the (batched) inference
+                    self.pending_step = "agent"
+                    return game.get_state_for_agent()
+            else:
+                # Human plays the game
+                self.pending_step = "human"
+        elif game.game_over:
+            self.status = "game_over"
+            self.status_text = "Game over"
+        else:
+            self.status = "waiting"
+            self.status_text = "Waiting to start"
+        return None
+
+    def agent_failed(self, error):
+        print(f"Error during agent gameplay in session {self.id}: {error}")
+        self.status_text = f"Agent error: {str(error)}"
+        self.game.game_over = True
+        self.pending_step = None
+
+    def finish(self, action=None):
+        """Second half of the tick: step the game (with the agent's action) and publish it."""
+        game = self.game
+        if self.pending_step == "agent" and action is not None:
+            self.last_action = action
+            _, _, _, info = game.step(action)
+            self.score = info["score"]
+        elif self.pending_step == "human":
+            _, _, _, info = game.step()
+            self.score = info["score"]
+
+        # Clients get state deltas; frame consumers get a frame rendered from a snapshot off this thread,
+        # and only when what it shows changed (nothing moves while the game waits or is over)
+        status = self.status_dict()
+        snapshot = self.snapshot()
+        message, keyframe = self.encoder.encode(game, status)
+        self.channel.publish(message, keyframe, changed=(snapshot, status) != self.last_state)
+        self.last_state = (snapshot, status)
+        if self.channel.wants_frames():
+            if snapshot != self.last_snapshot:
+                self.frame_version += 1
+                self.last_snapshot = snapshot
+                self.manager.renderer.submit(self, self.frame_version, snapshot)
+            else:
+                self.frames_skipped += 1
+        if self.tick_started is not None:
+            duration = time.perf_counter_ns() - self.tick_started
+            self.tick_duration.add(duration)
+            self.manager.tick_duration.add(duration)
+
+    def snapshot(self):
+        """Copy of everything a frame shows, so it can be drawn while the game moves on."""
+        game = self.game
+        return {
+            "grid_size": game.grid_size,
+            "snake": list(game.snake),
+            "food": game.food,
+            "score": game.score,
+            "game_over": game.game_over,
+            "started": self.game_started,
+            "mode": self.mode,
+            "model_path": self.model_path,
+        }
+
+    def stats(self):
+        return {
+            "id": self.id,
+            "mode": self.mode,
+            "status": self.status,
+            "score": self.score,
+            "idle_s": time.monotonic() - self.last_seen,
+            "ticks": self.tick_lag.count,
+            "subscribers": len(self.channel.subscribers),
+            "input": self.inputs.stats(),
+            "frames": {"version": self.frame_version, "skipped_unchanged": self.frames_skipped},
+            "tick_lag_ms": self.tick_lag.summary_ms(),
+            "tick_duration_ms": self.tick_duration.summary_ms(),
+        }
+
+
+class InferenceBroker:
+    """
+    Evaluates the observations of every agent session due in a scheduler tick
+    with one forward pass per model, instead of one act() call per game.
+    Tracks batch sizes, how long observations waited between their tick
+    being due and their action being computed, and the forward pass time.
+    """
+
+    def __init__(self, max_batch=256, max_wait=0.005):
+        self.max_batch = max_batch
+        self.max_wait = max_wait  # Seconds the scheduler may hold due agent ticks to grow a batch
+        self.batches = 0
+        self.batch_sizes = [0] * len(BATCH_SIZE_BUCKETS)
+        self.max_batch_seen = 0
+        self.observations = 0
+        self.queue_wait = PhaseStats()
+        self.forward = PhaseStats()
+        self.model_forward = {}  # Model path -> PhaseStats of its forward passes
+
+    def run(self, requests, manager):
+        """
+        Compute actions for [(session, observation, due time)] requests.
+        Returns {session id: action}; sessions whose batch fails are told so instead.
+        """
+        actions = {}
+        by_model = defaultdict(list)
+        for request in requests:
+            by_model[request[0].model_path].append(request)
+
+        for model_path, group in by_model.items():
+            agent = manager.agent(model_path)
+            for start in range(0, len(group), self.max_batch):
+                batch = group[start : start + self.max_batch]
+                now = time.monotonic()
+                for _, _, due in batch:
+                    self.queue_wait.add(int((now - due) * 1e9))
+
+                begin = time.perf_counter_ns()
+                try:
+                    batch_actions = agent.act_batch(np.stack([observation for _, observation, _ in batch]))
+                except Exception as e:
+                    for session, _, _ in batch:
+                        session.agent_failed(e)
+                    continue
+                duration = time.perf_counter_ns() - begin
+                self.forward.add(duration)
+                model_forward = self.model_forward.get(model_path)
+                if model_forward is None:
+                    model_forward = self.model_forward[model_path] = PhaseStats()
+                model_forward.add(duration)
+                self._record_batch(len(batch))
+                for (session, _, _), action in zip(batch, batch_actions):
+                    actions[session.id] = int(action)
+        return actions
+
+    def _record_batch(self, size):
+        self.batches += 1
+        self.observations += size
+        self.max_batch_seen = max(self.max_batch_seen, size)
+        bucket = next((i for i, bound in enumerate(BATCH_SIZE_BUCKETS) if size <= bound), len(BATCH_SIZE_BUCKETS) - 1)
+        self.batch_sizes[bucket] += 1
+
+    def stats(self):
+        return {
+            "batches": self.batches,
+            "mean_batch_size": self.observations / self.batches if self.batches else 0.0,
+            "max_batch_size": self.max_batch_seen,
+            "batch_size_histogram": {f"<={bound}": n for bound, n in zip(BATCH_SIZE_BUCKETS, self.batch_sizes) if n},
+            "queue_wait_ms": self.queue_wait.summary_ms(),
+            "forward_ms": self.forward.summary_ms(),
+        }
+
+
+class FrameRenderer:
+    """
+    Render+encode stage of the web pipeline, on its own thread. The scheduler
+    only submits a snapshot of a session's tick and moves on, so a slow
+    render or PNG encode never delays the simulation. Each session has a
+    single pending slot: if the worker falls behind, a newer snapshot
+    replaces the one still waiting (latest frame wins, the old one is counted
+    as dropped) and the session keeps its place in line.
+    """
+
+    def __init__(self, encoder=None, width=800, height=600):
+        self.encoder = encoder or FrameEncoder()
+        # Sessions are drawn one at a time, so they all share one surface
+        self.screen = pygame.Surface((width, height))
+        self.condition = threading.Condition()
+        self.pending = {}  # Session id -> (session, version, snapshot, submit time), in submission order
+        self.running = False
+        self.thread = None
+
+        self.submitted = 0
+        self.dropped = 0
+        self.rendered = 0
+        self.max_queue_depth = 0
+        self.frame_bytes = 0
+        self.queue_wait = PhaseStats()  # From submission to the worker picking the snapshot up
+        self.render = PhaseStats()
+        self.encode = PhaseStats()
+        self.frame_size = PhaseStats()  # Encoded bytes per frame
+
+    def start(self):
+        self.running = True
+        self.thread = threading.Thread(target=self._run, name="frame-renderer", daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        with self.condition:
+            self.running = False
+            self.condition.notify_all()
+        if self.thread:
+            self.thread.join()
+
+    def submit(self, session, version, snapshot):
+        with self.condition:
+            self.submitted += 1
+            if session.id in self.pending:
+                self.dropped += 1
+            self.pending[session.id] = (session, version, snapshot, time.perf_counter_ns())
+            self.max_queue_depth = max(self.max_queue_depth, len(self.pending))
+            self.condition.notify()
+
+    def _run(self):
+        while True:
+            with self.condition:
+                self.condition.wait_for(lambda: self.pending or not self.running)
+                if not self.running:
+                    return
+                session, version, snapshot, submitted = self.pending.pop(next(iter(self.pending)))
+
+            start = time.perf_counter_ns()
+            self.queue_wait.add(start - submitted)
+            try:
+                screen = self.draw(snapshot)
+                drawn = time.perf_counter_ns()
+                frame = self.encoder.encode(screen)
+            except Exception as e:
+                print(f"Error rendering session {session.id}: {e}")
+                continue
+            self.render.add(drawn - start)
+            self.encode.add(time.perf_counter_ns() - drawn)
+            self.rendered += 1
+            self.frame_bytes += len(frame)
+            self.frame_size.add(len(frame))
+            session.channel.publish_frame(frame, version)
+
+    def draw(self, snapshot):
+        """Draw a session snapshot (with the start screen before the game begins)."""
+        screen = draw_game(
+            self.screen,
+            snapshot["grid_size"],
+            snapshot["snake"],
+            snapshot["food"],
+            snapshot["score"],
+            snapshot["game_over"],
+        )
+        width, height = screen.get_size()
+
+        # Show start screen if not started
+        if not snapshot["started"]:
+            font = pygame.font.SysFont("Arial", 36)
+            text = font.render("Press SPACE to start", True, (255, 255, 255))
+            text_rect = text.get_rect(center=(width // 2, height // 2))
+            screen.blit(text, text_rect)
+
+            font = pygame.font.SysFont("Arial", 24)
+            mode_text = font.render(f"Mode: {snapshot['mode'].upper()}", True, (255, 255, 255))
+            mode_rect = mode_text.get_rect(center=(width // 2, height // 2 + 50))
+            screen.blit(mode_text, mode_rect)
+
+            if snapshot["mode"] == "agent":
+                model_text = font.render(f"Model: {snapshot['model_path'] or 'None'}", True, (255, 255, 255))
+                model_rect = model_text.get_rect(center=(width // 2, height // 2 + 80))
+                screen.blit(model_text, model_rect)
+
+        return screen
+
+    def stats(self):
+        with self.condition:
+            queue_depth = len(self.pending)
+        return {
+            "format": self.encoder.format,
+            "queue_depth": queue_depth,
+            "max_queue_depth": self.max_queue_depth,
+            "submitted": self.submitted,
+            "rendered": self.rendered,
+            "dropped": self.dropped,
+            "mean_frame_bytes": self.frame_bytes / self.rendered if self.rendered else 0.0,
+            "queue_wait_ms": self.queue_wait.summary_ms(),
+            "render_ms": self.render.summary_ms(),
+            "encode_ms": self.encode.summary_ms(),
+        }
+
+
+class SessionManager:
+    """
+    Owns every game session and ticks them all from a single scheduler
+    thread, each at its own target FPS. Sessions that no request or stream
+    has touched for idle_timeout seconds are evicted, and at most
+    max_sessions exist at once. The scheduler thread only simulates: frames
+    are rendered and encoded by the FrameRenderer from snapshots handed over
+    through a latest-wins slot, so tick timing doesn't depend on encoding.
+    Sessions share the renderer's surface, so their memory is a game's state
+    plus a small channel.
+
+    With a showcase model, a pinned agent game (SHOWCASE_SESSION) runs from
+    the start for spectators to watch through its channel.
+
+    Agents are shared: one AgentReloader per model path, fed from the
+    process-wide model cache. The agent sessions due in a scheduler pass act
+    together through the InferenceBroker; when more agent sessions become due
+    within max_wait of the oldest due one, the pass is held for them.
+    """
+
+    def __init__(
+        self,
+        mode="human",
+        model_path=None,
+        fps=10,
+        max_sessions=500,
+        idle_timeout=60.0,
+        reload_interval=2.0,
+        max_batch=256,
+        max_wait=0.005,
+        frame_encoder=None,
+        showcase_model=None,
+    ):
+        self.default_mode = mode
+        self.default_model_path = model_path
+        self.fps = fps
+        self.max_sessions = max_sessions
+        self.idle_timeout = idle_timeout
+        self.reload_interval = reload_interval
+
+        self.sessions = {}
+        self.reloaders = {}
+        self.lock = threading.Lock()
+        self.wake = threading.Event()
+        self.running = False
+        self.thread = None
+        self.evicted = 0
+        self.rejected = 0
+        self.broker = InferenceBroker(max_batch=max_batch, max_wait=max_wait)
+        self.frame_encoder = frame_encoder
+        self.showcase_model = showcase_model
+        self.showcase = None
+        self.renderer = None  # Created on start() or the first session, once pygame is initialized
+        self.simulate = PhaseStats()  # Duration of each scheduler pass that ticked sessions
+        self.tick_lag = PhaseStats()  # Of every session's ticks, kept across evictions
+        self.tick_duration = PhaseStats()
+
+    def start(self):
+        if not pygame.get_init():
+            pygame.init()
+        if self.renderer is None:
+            self.renderer = FrameRenderer(self.frame_encoder)
+        self.renderer.start()
+        if self.showcase_model and self.showcase is None:
+            self.showcase = self._add(SHOWCASE_SESSION, "agent", self.showcase_model, pinned=True)
+            self.showcase.game_started = True
+        self.running = True
+        self.thread = threading.Thread(target=self._run, name="session-scheduler", daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        self.running = False
+        self.wake.set()
+        if self.thread:
+            self.thread.join()
+        if self.renderer:
+            self.renderer.stop()
+        for reloader in self.reloaders.values():
+            reloader.stop()
+
+    def reloader(self, model_path, wait=False):
+        """The shared AgentReloader for a model path; with wait, the model is loaded (and warmed up) now."""
+        with self.lock:
+            reloader = self.reloaders.get(model_path)
+            created = reloader is None
+            if created:
+                reloader = AgentReloader(interval=self.reload_interval)
+                self.reloaders[model_path] = reloader
+        if wait and reloader.agent is None:
+            reloader.load(model_path)
+        elif created:
+            reloader.request(model_path)
+        return reloader
+
+    def agent(self, model_path):
+        reloader = self.reloaders.get(model_path)
+        return reloader.agent if reloader else None
+
+    def get(self, session_id):
+        return self.sessions.get(session_id)
+
+    def create(self):
+        """Start a new session with the server's default mode, or None when the session cap is reached."""
+        return self._add(uuid.uuid4().hex, self.default_mode, self.default_model_path)
+
+    def _add(self, session_id, mode, model_path, pinned=False):
+        if self.renderer is None:
+            if not pygame.get_init():
+                pygame.init()
+            self.renderer = FrameRenderer(self.frame_encoder)
+        with self.lock:
+            if not pinned and len(self.sessions) >= self.max_sessions:
+                self.rejected += 1
+                return None
+            session = GameSession(session_id, self, mode, model_path, self.fps, self.renderer.screen)
+            session.pinned = pinned
+            self.sessions[session.id] = session
+        if session.mode == "agent" and session.model_path:
+            self.reloader(session.model_path)
+        self.wake.set()
+        return session
+
+    def evict_idle(self, now):
+        with self.lock:
+            idle = [s for s in self.sessions.values() if not s.pinned and now - s.last_seen > self.idle_timeout]
+            for session in idle:
+                del self.sessions[session.id]
+        for session in idle:
+            session.channel.close()
+        self.evicted += len(idle)
+
+    def _run(self):
+        next_eviction = time.monotonic() + 1.0
+        while self.running:
+            self.wake.clear()
+            with self.lock:
+                sessions = list(self.sessions.values())
+
+            now = time.monotonic()
+            due = [session for session in sessions if session.next_tick <= now]
+            hold_until = self._hold_until(due, sessions, now)
+            if due and hold_until is None:
+                start = time.perf_counter_ns()
+                self._tick(due)
+                self.simulate.add(time.perf_counter_ns() - start)
+
+            now = time.monotonic()
+            if now >= next_eviction:
+                self.evict_idle(now)
+                next_eviction = now + 1.0
+
+            next_due = hold_until or min((session.next_tick for session in sessions), default=now + 1.0)
+            self.wake.wait(max(0.0, min(next_due, next_eviction) - time.monotonic()))
+
+    def _hold_until(self, due, sessions, now):
+        """When to re-check instead of ticking now, so agent sessions about to become due join the batch."""
+        agent_due = [session for session in due if session.mode == "agent"]
+        if not agent_due or len(agent_due) >= self.broker.max_batch:
+            return None
+        deadline = min(session.next_tick for session in agent_due) + self.broker.max_wait
+        upcoming = [s.next_tick for s in sessions if s.mode == "agent" and now < s.next_tick <= deadline]
+        return min(upcoming) if upcoming else None
+
+    def _tick(self, due):
+        """Tick the due sessions: prepare each, run the agents' inference in batches, then finish each."""
+        requests = []
+        for session in due:
+            due_at = session.next_tick
+            observation = session.prepare(time.monotonic())
+            if observation is not None:
+                requests.append((session, observation, due_at))
+
+        actions = self.broker.run(requests, self) if requests else {}
+        for session in due:
+            session.finish(actions.get(session.id))
+
+    def stats(self):
+        with self.lock:
+            sessions = list(self.sessions.values())
+        lags = [session.tick_lag.percentile(99) / 1e6 for session in sessions]
+        input_latencies = [session.inputs.latency.percentile(99) / 1e6 for session in sessions]
+        return {
+            "active": len(sessions),
+            "max_sessions": self.max_sessions,
+            "evicted": self.evicted,
+            "rejected": self.rejected,
+            "fps": self.fps,
+            "worst_tick_lag_p99_ms": max(lags, default=0.0),
+            "worst_input_latency_p99_ms": max(input_latencies, default=0.0),
+            "showcase": self.showcase.channel.subscriber_stats() if self.showcase else None,
+            "inference": self.broker.stats(),
+            "pipeline": {
+                "simulate_ms": self.simulate.summary_ms(),
+                "skipped_unchanged": sum(session.frames_skipped for session in sessions),
+                "render": self.renderer.stats() if self.renderer else None,
+            },
+            "sessions": [session.stats() for session in sessions],
+        }
+
+    def write_metrics(self, metrics):
+        """
+        Add the scheduler's, inference's and renderer's metrics to a MetricsWriter.
+        Only reads counters and copies histograms, so scraping never holds up a tick.
+        """
+        with self.lock:
+            sessions = list(self.sessions.values())
+        metrics.gauge("snake_web_sessions", "Active game sessions", len(sessions))
+        metrics.gauge("snake_web_max_sessions", "Session cap", self.max_sessions)
+        metrics.counter("snake_web_sessions_evicted_total", "Sessions evicted after being idle", self.evicted)
+        metrics.counter("snake_web_sessions_rejected_total", "Sessions refused at the cap", self.rejected)
+        metrics.gauge(
+            "snake_web_subscribers",
+            "Open state streams",
+            sum(len(session.channel.subscribers) for session in sessions),
+        )
+        metrics.gauge("snake_web_frame_streams", "Open frame streams", sum(s.channel.frame_streams for s in sessions))
+        metrics.histogram("snake_web_tick_duration_seconds", "Time to run one session tick", self.tick_duration)
+        metrics.histogram("snake_web_tick_lag_seconds", "How late session ticks ran", self.tick_lag)
+        metrics.histogram("snake_web_scheduler_pass_seconds", "Time to run one scheduler pass", self.simulate)
+
+        broker = self.broker
+        metrics.counter("snake_web_inference_batches_total", "Batched forward passes", broker.batches)
+        metrics.counter("snake_web_inference_observations_total", "Observations evaluated", broker.observations)
+        metrics.histogram(
+            "snake_web_inference_queue_wait_seconds",
+            "From an agent tick being due to its forward pass",
+            broker.queue_wait,
+        )
+        for model_path, forward in list(broker.model_forward.items()):
+            metrics.histogram("snake_web_inference_seconds", "Forward pass time by model", forward, model=model_path)
+
+        renderer = self.renderer
+        if renderer:
+            metrics.counter("snake_web_frames_rendered_total", "Frames rendered and encoded", renderer.rendered)
+            metrics.counter("snake_web_frames_dropped_total", "Snapshots replaced before rendering", renderer.dropped)
+            metrics.histogram("snake_web_render_seconds", "Time to draw a frame", renderer.render)
+            metrics.histogram("snake_web_encode_seconds", "Time to encode a frame", renderer.encode)
+            metrics.histogram("snake_web_frame_queue_wait_seconds", "From snapshot to render", renderer.queue_wait)
+            metrics.histogram("snake_web_frame_bytes", "Encoded frame size", renderer.frame_size, scale=1)
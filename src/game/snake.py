@@ -22,14 +22,59 @@ DOWN = 2
 LEFT = 3
 
 
+def draw_game(screen, grid_size, snake, food, score, game_over):
+    """
+    Draw a game state onto a surface and return it. Used by SnakeGame.render
+    and to draw snapshots of a game from another thread.
+    """
+    width, height = screen.get_size()
+
+    # Clear the screen
+    screen.fill(BLACK)
+
+    # Draw the snake
+    for i, (x, y) in enumerate(snake):
+        color = GREEN if i == 0 else BLUE  # Head is green, body is blue
+        rect = pygame.Rect(x * grid_size, y * grid_size, grid_size, grid_size)
+        pygame.draw.rect(screen, color, rect)
+        pygame.draw.rect(screen, BLACK, rect, 1)  # Border
+
+    # Draw the food
+    if food:
+        rect = pygame.Rect(food[0] * grid_size, food[1] * grid_size, grid_size, grid_size)
+        pygame.draw.rect(screen, RED, rect)
+
+    # Draw score
+    font = pygame.font.SysFont("Arial", 20)
+    score_text = font.render(f"Score: {score}", True, WHITE)
+    screen.blit(score_text, (10, 10))
+
+    # Draw game over text
+    if game_over:
+        font = pygame.font.SysFont("Arial", 48)
+        game_over_text = font.render("GAME OVER", True, RED)
+        text_rect = game_over_text.get_rect(center=(width // 2, height // 2))
+        screen.blit(game_over_text, text_rect)
+
+        font = pygame.font.SysFont("Arial", 24)
+        restart_text = font.render("Press R to restart", True, WHITE)
+        restart_rect = restart_text.get_rect(center=(width // 2, height // 2 + 50))
+        screen.blit(restart_text, restart_rect)
+
+    return screen
+
+
 class SnakeGame:
     """
     Snake game implementation that can be used for both human play
     and agent training through reinforcement learning.
     """
 
-    def __init__(self, width=800, height=600, grid_size=20, max_steps_without_food=100):
-        """Initialize the snake game."""
+    def __init__(self, width=800, height=600, grid_size=20, max_steps_without_food=100, screen=None):
+        """
+        Initialize the snake game.
+        Games that are rendered one at a time (e.g. many web sessions) can share one screen surface.
+        """
         self.width = width
         self.height = height
         self.grid_size = grid_size
@@ -42,7 +87,7 @@ class SnakeGame:
             pygame.init()
 
         # Surface to draw the game on
-        self.screen = pygame.Surface((width, height))
+        self.screen = screen if screen is not None else pygame.Surface((width, height))
 
         # Game clock
         self.clock = pygame.time.Clock()
@@ -331,41 +376,7 @@ class SnakeGame:
 
     def render(self):
         """Render the game state to the screen surface."""
-        # Clear the screen
-        self.screen.fill(BLACK)
-
-        # Draw the snake
-        for i, (x, y) in enumerate(self.snake):
-            color = GREEN if i == 0 else BLUE  # Head is green, body is blue
-            rect = pygame.Rect(x * self.grid_size, y * self.grid_size, self.grid_size, self.grid_size)
-            pygame.draw.rect(self.screen, color, rect)
-            pygame.draw.rect(self.screen, BLACK, rect, 1)  # Border
-
-        # Draw the food
-        if self.food:
-            rect = pygame.Rect(
-                self.food[0] * self.grid_size, self.food[1] * self.grid_size, self.grid_size, self.grid_size
-            )
-            pygame.draw.rect(self.screen, RED, rect)
-
-        # Draw score
-        font = pygame.font.SysFont("Arial", 20)
-        score_text = font.render(f"Score: {self.score}", True, WHITE)
-        self.screen.blit(score_text, (10, 10))
-
-        # Draw game over text
-        if self.game_over:
-            font = pygame.font.SysFont("Arial", 48)
-            game_over_text = font.render("GAME OVER", True, RED)
-            text_rect = game_over_text.get_rect(center=(self.width // 2, self.height // 2))
-            self.screen.blit(game_over_text, text_rect)
-
-            font = pygame.font.SysFont("Arial", 24)
-            restart_text = font.render("Press R to restart", True, WHITE)
-            restart_rect = restart_text.get_rect(center=(self.width // 2, self.height // 2 + 50))
-            self.screen.blit(restart_text, restart_rect)
-
-        return self.screen
+        return draw_game(self.screen, self.grid_size, self.snake, self.food, self.score, self.game_over)
 
     def tick(self, fps=10):
         """Control the game speed."""
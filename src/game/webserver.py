@@ -2,16 +2,18 @@
 Web server for the Snake Game - displays the game in a browser
 """
 
-import base64
-import io
+import asyncio
+import json
 import os
-from threading import Thread
 
 import pygame
-from flask import Flask, jsonify, render_template, request
+from flask import Flask, Response, g, jsonify, render_template, request
 
-from game.snake import SnakeGame
-from PIL import Image
+from agent.evaluator import find_checkpoints
+from game.asgi import AsgiApp, serve
+from game.frames import FrameEncoder
+from game.metrics import RequestMetrics, metrics_response
+from game.sessions import SessionManager
 
 app = Flask(
     __name__,
@@ -30,19 +32,16 @@ os.makedirs(template_dir, exist_ok=True)
 print(f"Static folder: {static_dir}")
 print(f"Template folder: {template_dir}")
 
-# Game state
-game_state = {
-    "running": False,
-    "frame": None,
-    "command": None,
-    "mode": "human",  # 'human' or 'agent'
-    "agent": None,
-    "model_path": None,
-    "score": 0,
-    "status": "waiting",  # 'waiting', 'running', 'game_over'
-    "status_text": "Waiting to start",
-    "last_action": None,
-}
+# Every browser gets its own game session, identified by this cookie (or a ?session= parameter).
+# Only loading the game page starts one, so clients that don't keep cookies can't fill the session cap
+SESSION_COOKIE = "snake_session"
+
+# Game sessions and their scheduler; replaced with the configured one by run_web_server
+sessions = SessionManager()
+
+# Latency of every request, by route, for /metrics
+request_metrics = RequestMetrics()
+request_metrics.install(app)
 
 # Define colors
 BLACK = (0, 0, 0)
@@ -87,201 +86,127 @@ class Button:
         return self.rect.collidepoint(mouse_pos)
 
 
-def surface_to_base64(surface):
-    """Convert a Pygame surface to base64 string for embedding in HTML."""
-    image_data = pygame.image.tostring(surface, "RGB")
-
-    image = Image.frombytes("RGB", surface.get_size(), image_data)
-    buffered = io.BytesIO()
-    image.save(buffered, format="PNG")
-    image_base64 = base64.b64encode(buffered.getvalue()).decode("utf-8")
-    return image_base64
-
-
-def game_loop():
-    """The main game loop that runs in a separate thread."""
-    global game_state
-
-    # Initialize pygame
-    pygame.init()
-
-    # Create the game
-    game = SnakeGame()
-
-    # Game clock
-    clock = pygame.time.Clock()
-
-    # For agent mode
-    if game_state["mode"] == "agent" and game_state["model_path"]:
-        try:
-            # Simple random agent for testing
-            class SimpleRandomAgent:
-                def __init__(self):
-                    self.epsilon = 0.1
-                    print("Initialized SimpleRandomAgent")
-
-                def act(self, state, explore=True):
-                    import random
-
-                    # Just return a random action (0-3)
-                    return random.randint(0, 3)
-
-                def load(self, path):
-                    print(f"Pretending to load model from {path}")
-
-            agent = SimpleRandomAgent()
-            print("Created simple random agent for testing")
-
-            # Check if model file exists but we're using the simple agent anyway
-            if os.path.exists(game_state["model_path"]):
-                print(f"Found model file: {game_state['model_path']} (using SimpleRandomAgent instead)")
-            else:
-                print(f"Warning: Model file '{game_state['model_path']}' does not exist! Using SimpleRandomAgent.")
-
-            agent.load(game_state["model_path"])
-            game_state["agent"] = agent
-            print(f"Agent ready in mode: {game_state['mode']}")
-        except Exception as e:
-            print(f"Error setting up agent: {e}")
-            print(f"Exception type: {type(e)}")
-            import traceback
-
-            traceback.print_exc()
-            game_state["status_text"] = f"Error: Agent setup failed: {str(e)}"
-            game_state["mode"] = "human"
-
-    # Main game loop
-    game_state["running"] = True
-    game_started = False
-    restart_requested = False
-    auto_restart_delay = 0  # Counter for auto restart delay
-
-    while game_state["running"]:
-        # Process any commands from the web interface
-        if game_state["command"]:
-            command = game_state["command"]
-            key = command.get("key")
-
-            # Handle keyboard input
-            if key:
-                if key == "up" and game.direction != 2:
-                    game.direction = 0  # UP
-                elif key == "right" and game.direction != 3:
-                    game.direction = 1  # RIGHT
-                elif key == "down" and game.direction != 0:
-                    game.direction = 2  # DOWN
-                elif key == "left" and game.direction != 1:
-                    game.direction = 3  # LEFT
-                elif key == "r" and game.game_over:
-                    restart_requested = True
-                elif key == "space" and not game_started:
-                    game_started = True
-
-            # Reset the command
-            game_state["command"] = None
-
-        # Reset the game if requested
-        if restart_requested:
-            game.reset()
-            restart_requested = False
-            game_started = True
-            game_state["status"] = "running"
-            game_state["status_text"] = "Game running"
-            game_state["score"] = 0
-
-        # Auto restart for agent mode after game over
-        if game_state["mode"] == "agent" and game.game_over:
-            auto_restart_delay += 1
-            # Wait about 2 seconds (20 frames at 10 FPS) before auto-restarting
-            if auto_restart_delay >= 20:
-                print(f"Auto-restarting game in agent mode (delay={auto_restart_delay})")
-                game.reset()
-                game_started = True
-                auto_restart_delay = 0
-                game_state["status"] = "running"
-                game_state["status_text"] = "Game running - auto restart"
-                game_state["score"] = 0
-                print("Agent mode: auto-restarting game")
-
-        # Update game state
-        if game_started and not game.game_over:
-            game_state["status"] = "running"
-            game_state["status_text"] = "Game running"
-
-            if game_state["mode"] == "agent" and game_state["agent"]:
-                try:
-                    # Agent plays the game
-                    state = game.get_state_for_agent()
-                    action = game_state["agent"].act(state, explore=False)
-                    game_state["last_action"] = action
-                    _, _, _, info = game.step(action)
-                    game_state["score"] = info["score"]
-                except Exception as e:
-                    print(f"Error during agent gameplay: {e}")
-                    game_state["status_text"] = f"Agent error: {str(e)}"
-                    game.game_over = True
-            else:
-                # Human plays the game
-                _, _, _, info = game.step()
-                game_state["score"] = info["score"]
-        elif game.game_over:
-            game_state["status"] = "game_over"
-            game_state["status_text"] = "Game over"
-        else:
-            game_state["status"] = "waiting"
-            game_state["status_text"] = "Waiting to start"
-
-        # Render the game
-        screen = game.render()
-
-        # Show start screen if not started
-        if not game_started:
-            font = pygame.font.SysFont("Arial", 36)
-            text = font.render("Press SPACE to start", True, (255, 255, 255))
-            text_rect = text.get_rect(center=(game.width // 2, game.height // 2))
-            screen.blit(text, text_rect)
-
-            font = pygame.font.SysFont("Arial", 24)
-            mode_text = font.render(f'Mode: {game_state["mode"].upper()}', True, (255, 255, 255))
-            mode_rect = mode_text.get_rect(center=(game.width // 2, game.height // 2 + 50))
-            screen.blit(mode_text, mode_rect)
-
-            if game_state["mode"] == "agent":
-                model_text = font.render(f'Model: {game_state["model_path"] or "None"}', True, (255, 255, 255))
-                model_rect = model_text.get_rect(center=(game.width // 2, game.height // 2 + 80))
-                screen.blit(model_text, model_rect)
-
-        # Get base64 image of current screen
-        game_state["frame"] = surface_to_base64(screen)
-
-        # Cap at 10 FPS
-        clock.tick(10)
-
-    # Cleanup pygame
-    pygame.quit()
-    print("Game thread exiting")
+def _find_session(session_id, cookie_id, create=False):
+    """
+    The session a request names by ?session= (session_id) or its cookie,
+    touched, with a status: 200 found, 201 created, 404 no session, 503 the
+    server is full. Only with create=True is a session created, for a client
+    whose cookie is missing or names an expired session; an unknown
+    ?session= never creates one.
+    """
+    if session_id:
+        session = sessions.get(session_id)
+    else:
+        session = sessions.get(cookie_id) if cookie_id else None
+    if session is not None:
+        session.touch()
+        return session, 200
+    if session_id or not create:
+        return None, 404
+    session = sessions.create()
+    return (session, 201) if session else (None, 503)
+
+
+def _session(create=False):
+    """(The requesting client's session, None), or (None, an error response); see _find_session()."""
+    session, status = _find_session(request.args.get("session"), request.cookies.get(SESSION_COOKIE), create)
+    if session is None:
+        return None, _no_session_response(status)
+    if status == 201:
+        g.new_session_id = session.id
+    return session, None
+
+
+def _no_session_response(status):
+    if status == 503:
+        error, status_text = "Too many active games", f"Server is full ({sessions.max_sessions} games), try again later"
+    else:
+        error, status_text = "No game session", "No game session: load the game page first, or pass a valid ?session="
+    return jsonify({"success": False, "error": error, "status": "error", "status_text": status_text}), status
+
+
+def _not_modified(etag):
+    """304 response if the client already has the representation with this ETag, else None."""
+    if request.if_none_match.contains(etag):
+        response = Response(status=304)
+        response.set_etag(etag)
+        return response
+    return None
+
+
+def _revalidated(response, etag):
+    """Tag a response so clients revalidate it (If-None-Match) instead of refetching it."""
+    response.set_etag(etag)
+    response.headers["Cache-Control"] = "no-cache"
+    return response
+
+
+def _has_session_cookie():
+    """
+    Whether the request carries a session cookie. The game page's streams
+    create a session for a browser whose session expired (e.g. the server
+    restarted) so it can reconnect; a client without a cookie gets none.
+    """
+    return SESSION_COOKIE in request.cookies
+
+
+@app.after_request
+def set_session_cookie(response):
+    """Hand a newly created session's id to the browser."""
+    session_id = g.get("new_session_id")
+    if session_id:
+        response.set_cookie(SESSION_COOKIE, session_id, samesite="Lax")
+    return response
 
 
 @app.route("/")
 def index():
     """Render the main game page."""
-    return render_template("game_play.html", mode=game_state["mode"], model_path=game_state["model_path"] or "None")
+    session, status = _find_session(request.args.get("session"), request.cookies.get(SESSION_COOKIE), create=True)
+    if status == 503:
+        return "<h1>Server is full</h1><p>Too many active games, try again later.</p>", 503
+    if session is None:
+        return "<h1>No such game</h1><p>The game in ?session= has ended.</p>", 404
+    if status == 201:
+        g.new_session_id = session.id
+    return render_template(
+        "game_play.html",
+        mode=session.mode,
+        model_path=session.model_path or "None",
+        spectator=False,
+        stream_url="/state_stream",
+    )
 
 
 @app.route("/get_game_state", methods=["GET"])
 def get_game_state():
     """Return the current game state including the frame."""
+    session, error = _session()
+    if error is not None:
+        return error
     try:
+        # The browser client streams state deltas; polling clients can skip the base64 frame with ?frame=0.
+        # The ETag is the state version (and frame version), read before the state so it is never newer
+        channel = session.channel
+        if request.args.get("frame") != "0":
+            frame_version, frame = channel.frame_base64()
+            etag = f"{session.id}-{channel.version}-{frame_version}"
+        else:
+            frame = None
+            etag = f"{session.id}-{channel.version}"
+        not_modified = _not_modified(etag)
+        if not_modified:
+            return not_modified
+
         response = {
-            "frame": game_state.get("frame", None),
-            "score": game_state.get("score", 0),
-            "status": game_state.get("status", "waiting"),
-            "status_text": game_state.get("status_text", "Waiting to start"),
-            "last_action": game_state.get("last_action", None),
+            "frame": frame,
+            "frame_type": sessions.renderer.encoder.mimetype,
+            **session.status_dict(),
+            "session": session.id,
             "success": True,
             "error": None,
         }
-        return jsonify(response)
+        return _revalidated(jsonify(response), etag)
     except Exception as e:
         # Log the error on the server side
         print(f"Error in get_game_state: {str(e)}")
@@ -290,22 +215,125 @@ def get_game_state():
             {
                 "success": False,
                 "error": str(e),
-                "status": game_state.get("status", "error"),
+                "status": session.status,
                 "status_text": f"Error: {str(e)}",
             }
         )
 
 
+@app.route("/frame_stream")
+def frame_stream():
+    """Push frames as raw image parts of a multipart stream (shown directly by an <img> tag)."""
+    session, error = _session(create=_has_session_cookie())
+    if error is not None:
+        return error
+    channel = session.channel
+    part_header = b"--frame\r\nContent-Type: %s\r\nContent-Length: %%d\r\n\r\n" % (
+        sessions.renderer.encoder.mimetype.encode()
+    )
+
+    def generate():
+        channel.open_frame_stream(1)
+        try:
+            version = -1
+            while not channel.closed:
+                new_version, frame = channel.wait_frame(version)
+                session.touch()
+                if frame is None or new_version == version:
+                    # Nothing rendered yet (the stream just opened), or a keep-alive timeout
+                    version = new_version
+                    continue
+                version = new_version
+                yield part_header % len(frame) + frame + b"\r\n"
+        finally:
+            channel.open_frame_stream(-1)
+
+    return Response(generate(), mimetype="multipart/x-mixed-replace; boundary=frame")
+
+
+@app.route("/state_stream")
+def state_stream():
+    """
+    Push the game as server-sent state-delta messages (see game/delta.py),
+    starting with a keyframe. The client renders them on a canvas.
+    """
+    session, error = _session(create=_has_session_cookie())
+    if error is not None:
+        return error
+    return _event_stream(session, "player")
+
+
+def _event_stream(session, kind):
+    """
+    Server-sent state events of a session's channel for one subscriber. Every
+    subscriber writes the channel's pre-encoded events; one that falls behind
+    skips to the latest tick and is resynchronized with the keyframe.
+    """
+    channel = session.channel
+
+    def generate():
+        subscriber = channel.subscribe(kind)
+        try:
+            while not channel.closed:
+                tick, event, published_at = channel.wait(subscriber.tick)
+                if kind == "player":
+                    session.touch()
+                if tick == subscriber.tick:
+                    yield b": keep-alive\n\n"
+                    continue
+                yield subscriber.next_event(channel, tick, event, published_at)
+                subscriber.delivered()
+        finally:
+            channel.unsubscribe(subscriber)
+
+    return Response(generate(), mimetype="text/event-stream", headers={"Cache-Control": "no-cache"})
+
+
+@app.route("/watch")
+def watch():
+    """Spectator page for the showcase agent game."""
+    if sessions.showcase is None:
+        return "<h1>No showcase game</h1><p>Start the server with --showcase to run one.</p>", 404
+    showcase = sessions.showcase
+    return render_template(
+        "game_play.html", mode="agent", model_path=showcase.model_path, spectator=True, stream_url="/watch/stream"
+    )
+
+
+@app.route("/watch/stream")
+def watch_stream():
+    """The showcase game's state events, shared by all spectators (no session is created for them)."""
+    if sessions.showcase is None:
+        return jsonify({"success": False, "error": "No showcase game"}), 404
+    return _event_stream(sessions.showcase, "spectator")
+
+
+@app.route("/watch/stats")
+def watch_stats():
+    """Showcase subscriber count and lag, with per-subscriber sent/dropped ticks and lag."""
+    if sessions.showcase is None:
+        return jsonify({"success": False, "error": "No showcase game"}), 404
+    return jsonify(sessions.showcase.channel.subscriber_stats(detail=True))
+
+
 @app.route("/set_mode", methods=["POST"])
 def set_mode():
     """Set the game mode (human or agent)."""
+    session, error = _session()
+    if error is not None:
+        return error
     data = request.json
     mode = data.get("mode", "human")
     model_path = data.get("model_path")
 
     if mode in ["human", "agent"]:
-        game_state["mode"] = mode
-        game_state["model_path"] = model_path
+        model_path = model_path or session.model_path or sessions.default_model_path
+        if mode == "agent":
+            if not model_path or not find_checkpoints(model_path):
+                return jsonify({"status": "error", "message": f"Model file '{model_path}' does not exist"})
+            # Loaded in the background; the game waits (or keeps its current agent) until it is ready
+            sessions.reloader(model_path)
+        session.set_mode(mode, model_path)
         return jsonify({"status": "ok", "mode": mode, "model_path": model_path})
 
     return jsonify({"status": "error", "message": "Invalid mode"})
@@ -313,16 +341,43 @@ def set_mode():
 
 @app.route("/get_frame", methods=["GET"])
 def get_frame():
-    """Return the current game frame as base64 encoded image."""
-    return jsonify({"frame": game_state["frame"]})
+    """Return the current game frame as base64 encoded image, or 304 if the client has it already."""
+    session, error = _session()
+    if error is not None:
+        return error
+    frame_version, frame = session.channel.frame_base64()
+    etag = f"{session.id}-f{frame_version}"
+    not_modified = _not_modified(etag)
+    if not_modified:
+        return not_modified
+    return _revalidated(jsonify({"frame": frame, "frame_type": sessions.renderer.encoder.mimetype}), etag)
 
 
 @app.route("/send_command", methods=["POST"])
 def send_command():
     """Receive commands from the web interface."""
-    command = request.json
-    game_state["command"] = command
-    return jsonify({"status": "ok"})
+    session, error = _session()
+    if error is not None:
+        return error
+    key = (request.json or {}).get("key")
+    if not key:
+        return jsonify({"status": "error", "message": "No key given"}), 400
+    if not session.inputs.put(key):
+        # Too many key presses pending; refuse instead of dropping input silently
+        return jsonify({"status": "error", "message": "Input queue full"}), 429
+    return jsonify({"status": "ok", "queued": len(session.inputs)})
+
+
+@app.route("/sessions", methods=["GET"])
+def get_sessions():
+    """Active sessions with their tick lag, plus eviction and rejection counts."""
+    return jsonify(sessions.stats())
+
+
+@app.route("/metrics", methods=["GET"])
+def metrics():
+    """Server health in the Prometheus text format."""
+    return metrics_response(sessions.write_metrics, request_metrics)
 
 
 @app.errorhandler(Exception)
@@ -344,23 +399,155 @@ def handle_error(e):
     return f"<h1>Server Error</h1><p>{str(e)}</p>", 500
 
 
-def run_web_server(host="0.0.0.0", port=5000, mode="human", model_path=None):
-    """Start the Flask web server."""
-    # Set the game mode and model path
-    game_state["mode"] = mode
-    game_state["model_path"] = model_path
-
-    # Start the game loop in a separate thread
-    game_thread = Thread(target=game_loop)
-    game_thread.daemon = True
-    game_thread.start()
-
-    # Run the Flask web server
-    app.run(host=host, port=port, debug=False, threaded=True)
-
-    # Wait for the game thread to finish
-    game_state["running"] = False
-    game_thread.join()
+def create_asgi_app():
+    """
+    The app for the asyncio server: the streaming routes run as coroutines on
+    the event loop (woken by the channels' LoopSignals), everything else is
+    the Flask app on a thread pool.
+    """
+    asgi_app = AsgiApp(app, request_metrics=request_metrics)
+
+    def stream_session(request):
+        """Like _session() for the streams: (session, status, headers that hand a new session to the browser)."""
+        cookie_id = request.cookies.get(SESSION_COOKIE)
+        session, status = _find_session(request.args.get("session"), cookie_id, create=cookie_id is not None)
+        if status == 201:
+            return session, status, [("Set-Cookie", f"{SESSION_COOKIE}={session.id}; Path=/; SameSite=Lax")]
+        return session, status, []
+
+    def session_error(status):
+        if status == 503:
+            return error(503, "Server is full, try again later")
+        return error(404, "No game session: load the game page first, or pass a valid ?session=")
+
+    def error(status, message):
+        async def body():
+            yield json.dumps({"success": False, "error": message}).encode()
+
+        return status, [("Content-Type", "application/json")], body()
+
+    async def events(session, kind):
+        channel = session.channel
+        signal = channel.loop_signal(asyncio.get_running_loop())
+        subscriber = channel.subscribe(kind)
+        try:
+            while not channel.closed:
+                tick, event, published_at = channel.latest()
+                if kind == "player":
+                    session.touch()
+                if tick == subscriber.tick:
+                    if not await signal.wait():
+                        yield b": keep-alive\n\n"
+                    continue
+                yield subscriber.next_event(channel, tick, event, published_at)
+                subscriber.delivered()
+        finally:
+            channel.unsubscribe(subscriber)
+
+    async def frames(session):
+        channel = session.channel
+        signal = channel.loop_signal(asyncio.get_running_loop())
+        part_header = b"--frame\r\nContent-Type: %s\r\nContent-Length: %%d\r\n\r\n" % (
+            sessions.renderer.encoder.mimetype.encode()
+        )
+        channel.open_frame_stream(1)
+        try:
+            version = -1
+            while not channel.closed:
+                new_version, frame = channel.latest_frame()
+                session.touch()
+                if frame is None or new_version == version:
+                    version = new_version
+                    await signal.wait()
+                    continue
+                version = new_version
+                yield part_header % len(frame) + frame + b"\r\n"
+        finally:
+            channel.open_frame_stream(-1)
+
+    event_headers = [("Content-Type", "text/event-stream"), ("Cache-Control", "no-cache")]
+
+    @asgi_app.route("/state_stream")
+    async def state_stream_async(request):
+        session, status, headers = stream_session(request)
+        if session is None:
+            return session_error(status)
+        return 200, event_headers + headers, events(session, "player")
+
+    @asgi_app.route("/frame_stream")
+    async def frame_stream_async(request):
+        session, status, headers = stream_session(request)
+        if session is None:
+            return session_error(status)
+        content_type = ("Content-Type", "multipart/x-mixed-replace; boundary=frame")
+        return 200, [content_type] + headers, frames(session)
+
+    @asgi_app.route("/watch/stream")
+    async def watch_stream_async(request):
+        if sessions.showcase is None:
+            return error(404, "No showcase game")
+        return 200, event_headers, events(sessions.showcase, "spectator")
+
+    return asgi_app
+
+
+def run_web_server(
+    host="0.0.0.0",
+    port=5000,
+    mode="human",
+    model_path=None,
+    reload_interval=2.0,
+    fps=10,
+    max_sessions=500,
+    idle_timeout=60.0,
+    max_batch=256,
+    max_wait=0.005,
+    frame_format="png",
+    frame_quality=80,
+    png_compress_level=6,
+    showcase_model=None,
+    server="threaded",
+):
+    """Start the web server: Flask's threaded server, or the asyncio server (needs uvicorn)."""
+    global sessions
+
+    sessions = SessionManager(
+        mode=mode,
+        model_path=model_path,
+        fps=fps,
+        max_sessions=max_sessions,
+        idle_timeout=idle_timeout,
+        reload_interval=reload_interval,
+        max_batch=max_batch,
+        max_wait=max_wait,
+        frame_encoder=FrameEncoder(frame_format, quality=frame_quality, compress_level=png_compress_level),
+        showcase_model=showcase_model,
+    )
+
+    # Load and warm up the default agent before the first game starts
+    if mode == "agent" and model_path:
+        reloader = sessions.reloader(model_path, wait=True)
+        if reloader.agent is None:
+            print(f"Error setting up agent: {reloader.error}")
+            sessions.default_mode = "human"
+        else:
+            print(f"Agent ready: {reloader.source}")
+    if showcase_model:
+        reloader = sessions.reloader(showcase_model, wait=True)
+        print(f"Showcase game at /watch: {reloader.source or reloader.error}")
+
+    # Tick every session from one scheduler thread
+    sessions.start()
+
+    # Run the web server
+    if server == "asyncio":
+        serve(create_asgi_app(), host, port)
+    else:
+        app.run(host=host, port=port, debug=False, threaded=True)
+
+    # Stop the scheduler
+    sessions.stop()
+    pygame.quit()
 
 
 if __name__ == "__main__":
@@ -0,0 +1,65 @@
+#!/usr/bin/env python
+"""
+Snake Game Agent - Dataset Generation Entry Point
+Generates a sharded offline transition dataset from parallel rollouts
+"""
+import argparse
+import os
+import time
+
+from agent.dataset import HEURISTIC_POLICIES, generate_dataset
+
+
+def parse_args():
+    """Parse command line arguments."""
+    parser = argparse.ArgumentParser(description="Generate an offline transition dataset for the Snake Game RL Agent")
+    parser.add_argument(
+        "--policy",
+        type=str,
+        default="greedy",
+        help=f"Rollout policy: {', '.join(HEURISTIC_POLICIES)} or a model checkpoint path",
+    )
+    parser.add_argument("--transitions", type=int, default=1_000_000, help="Total number of transitions")
+    parser.add_argument("--shard-size", type=int, default=100_000, help="Transitions per shard")
+    parser.add_argument("--epsilon", type=float, default=0.0, help="Probability of a random action instead")
+    parser.add_argument("--workers", type=int, default=os.cpu_count(), help="Number of worker processes")
+    parser.add_argument("--seed", type=int, default=0, help="Random seed of the first shard")
+    parser.add_argument("--max-steps", type=int, default=2000, help="Maximum steps per episode")
+    parser.add_argument("--timeout", type=int, default=100, help="Timeout multiplier for steps without food")
+    parser.add_argument("--tf-threads", type=int, default=1, help="TensorFlow threads per worker (checkpoints only)")
+    parser.add_argument("--output", type=str, default="data/datasets/greedy", help="Dataset directory")
+    return parser.parse_args()
+
+
+def main():
+    """Main function to generate a dataset."""
+    args = parse_args()
+    if args.policy not in HEURISTIC_POLICIES and not os.path.exists(args.policy):
+        print(f"No model found at {args.policy}")
+        return
+
+    print(f"Generating {args.transitions} transitions with the {args.policy} policy into {args.output}")
+    start_time = time.time()
+    index = generate_dataset(
+        args.output,
+        args.transitions,
+        policy=args.policy,
+        shard_size=args.shard_size,
+        workers=args.workers,
+        seed=args.seed,
+        epsilon=args.epsilon,
+        max_steps=args.max_steps,
+        timeout_multiplier=args.timeout,
+        tf_threads=args.tf_threads,
+    )
+    duration = time.time() - start_time
+
+    print(
+        f"Dataset complete: {index['transitions']} transitions, {index['episodes']} episodes, "
+        f"mean score {index['mean_score']:.2f} ({index['transitions'] / duration:.0f} transitions/s)"
+    )
+    print(f"Index saved to {os.path.join(args.output, 'index.json')}")
+
+
+if __name__ == "__main__":
+    main()
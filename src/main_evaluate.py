@@ -0,0 +1,88 @@
+#!/usr/bin/env python
+"""
+Snake Game Agent - Evaluation Entry Point
+Evaluates trained models over many seeded headless episodes in parallel
+"""
+import argparse
+import json
+import os
+import time
+
+from agent.evaluator import PLANNER_BASELINE, evaluate_models, find_checkpoints, format_report
+
+
+def parse_args():
+    """Parse command line arguments."""
+    parser = argparse.ArgumentParser(description="Evaluate Snake Game RL Agent checkpoints")
+    parser.add_argument("--model", type=str, default="models/snake_dqn.h5", help="Path to the model to evaluate")
+    parser.add_argument(
+        "--checkpoints",
+        action="store_true",
+        help="Evaluate every <model>_<N>.h5 checkpoint saved during training, plus the final model",
+    )
+    parser.add_argument(
+        "--baseline", action="store_true", help="Also evaluate the heuristic path-planning agent as a baseline"
+    )
+    parser.add_argument("--episodes", type=int, default=100, help="Number of episodes per model")
+    parser.add_argument("--workers", type=int, default=os.cpu_count(), help="Number of worker processes")
+    parser.add_argument("--seed", type=int, default=0, help="Seed of the first episode")
+    parser.add_argument("--max-steps", type=int, default=2000, help="Maximum steps per episode")
+    parser.add_argument(
+        "--timeout", type=int, default=100, help="Timeout multiplier for steps without food"
+    )
+    parser.add_argument("--tf-threads", type=int, default=1, help="TensorFlow threads per worker process")
+    parser.add_argument(
+        "--output", type=str, default="data/evaluation.json", help="Path to save the evaluation results as JSON"
+    )
+    return parser.parse_args()
+
+
+def main():
+    """Main function to run evaluation."""
+    args = parse_args()
+
+    model_paths = find_checkpoints(args.model) if args.checkpoints else [args.model]
+    model_paths = [path for path in model_paths if os.path.exists(path)]
+    if not model_paths and not args.baseline:
+        print(f"No model found at {args.model}")
+        return
+    if args.baseline:
+        model_paths.append(PLANNER_BASELINE)
+
+    print(f"Evaluating {len(model_paths)} model(s) over {args.episodes} episodes each")
+    print(f"Using {args.workers} worker processes")
+
+    start_time = time.time()
+    summaries = evaluate_models(
+        model_paths,
+        episodes=args.episodes,
+        workers=args.workers,
+        seed=args.seed,
+        max_steps=args.max_steps,
+        timeout_multiplier=args.timeout,
+        tf_threads=args.tf_threads,
+    )
+    duration = time.time() - start_time
+
+    print(format_report(summaries))
+    print(f"Evaluation completed in {duration:.1f}s")
+
+    # Save results
+    os.makedirs(os.path.dirname(args.output) or ".", exist_ok=True)
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(
+            {
+                "episodes": args.episodes,
+                "seed": args.seed,
+                "max_steps": args.max_steps,
+                "timeout_multiplier": args.timeout,
+                "models": summaries,
+            },
+            f,
+            indent=2,
+        )
+    print(f"Results saved to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
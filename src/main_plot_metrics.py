@@ -0,0 +1,49 @@
+#!/usr/bin/env python
+"""
+Snake Game Agent - Metrics Plot Entry Point
+Draws the training metric charts from a streaming metrics log
+"""
+import argparse
+import os
+
+from agent.metrics_log import metrics_log_path
+from agent.trainer import write_metrics
+
+
+def parse_args():
+    """Parse command line arguments."""
+    parser = argparse.ArgumentParser(description="Plot training metrics from a Snake Game RL metrics log")
+    parser.add_argument(
+        "--model",
+        type=str,
+        default="models/snake_dqn.h5",
+        help="Model whose log to plot (used when --log is not given)",
+    )
+    parser.add_argument("--log-dir", type=str, default="data", help="Directory containing the metrics logs")
+    parser.add_argument(
+        "--log", type=str, default=None, help="Metrics log file (default: <log-dir>/<model>_metrics.jsonl)"
+    )
+    parser.add_argument("--episode", type=int, default=None, help="Only plot episodes up to this one")
+    parser.add_argument(
+        "--output", type=str, default=None, help="Output image (default: <log-dir>/training_metrics.png)"
+    )
+    return parser.parse_args()
+
+
+def main():
+    """Main function to plot a metrics log."""
+    args = parse_args()
+
+    log_path = args.log or metrics_log_path(args.log_dir, args.model)
+    output = args.output or os.path.join(args.log_dir, "training_metrics.png")
+    if not os.path.exists(log_path):
+        print(f"No metrics log found at {log_path}")
+        return
+
+    os.makedirs(os.path.dirname(output) or ".", exist_ok=True)
+    write_metrics(output, log_path, episode=args.episode)
+    print(f"Metrics plot saved to {output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+#!/usr/bin/env python
+"""
+Snake Game Agent - Hyperparameter Sweep Entry Point
+Trains many agent configurations in parallel and ranks them
+"""
+import argparse
+import os
+import time
+
+from agent.sweep import format_results, grid_trials, load_search_space, random_trials, run_sweep
+
+
+def parse_args():
+    """Parse command line arguments."""
+    parser = argparse.ArgumentParser(description="Hyperparameter sweep for the Snake Game RL Agent")
+    parser.add_argument(
+        "--space", type=str, default="config/sweep_space.json", help="JSON file describing the search space"
+    )
+    parser.add_argument(
+        "--search", type=str, default="random", choices=["grid", "random"], help="Search strategy"
+    )
+    parser.add_argument("--trials", type=int, default=20, help="Number of trials for random search")
+    parser.add_argument("--episodes", type=int, default=300, help="Maximum episodes per trial")
+    parser.add_argument(
+        "--min-episodes",
+        type=int,
+        default=None,
+        help="Episodes before the first successive-halving comparison (default: episodes / eta^2)",
+    )
+    parser.add_argument("--eta", type=int, default=3, help="Keep the top 1/eta trials at each rung")
+    parser.add_argument("--tf-threads", type=int, default=1, help="TensorFlow threads per worker process")
+    parser.add_argument(
+        "--workers", type=int, default=None, help="Number of worker processes (default: CPU count / TF threads)"
+    )
+    parser.add_argument("--seed", type=int, default=0, help="Random seed for sampling and training")
+    parser.add_argument("--output-dir", type=str, default="data/sweep", help="Directory for trial logs and results")
+    return parser.parse_args()
+
+
+def main():
+    """Main function to run a sweep."""
+    args = parse_args()
+
+    space = load_search_space(args.space)
+    if args.search == "grid":
+        try:
+            trials = grid_trials(space)
+        except ValueError as e:
+            raise SystemExit(f"{e} (--space {args.space})") from e
+    else:
+        trials = random_trials(space, args.trials, seed=args.seed)
+
+    print(f"Starting {args.search} search over {', '.join(space)}")
+    start_time = time.time()
+
+    results = run_sweep(
+        trials,
+        args.output_dir,
+        episodes=args.episodes,
+        workers=args.workers,
+        tf_threads=args.tf_threads,
+        min_episodes=args.min_episodes,
+        eta=args.eta,
+        seed=args.seed,
+    )
+
+    duration = time.time() - start_time
+    hours, remainder = divmod(duration, 3600)
+    minutes, seconds = divmod(remainder, 60)
+
+    print(format_results(results))
+    print(f"Sweep completed in {int(hours)}h {int(minutes)}m {int(seconds)}s")
+    print(f"Results saved to {os.path.join(args.output_dir, 'results.csv')}")
+
+
+if __name__ == "__main__":
+    main()
@@ -8,6 +8,7 @@ import os
 import platform
 import time
 
+from agent.profiler import PhaseProfiler, add_profiler_arguments
 from agent.trainer import SnakeTrainer
 
 
@@ -34,11 +35,24 @@ def parse_args():
         default=max(20, default_episodes // 10),
         help="Frequency of saving checkpoints during training",
     )
+    parser.add_argument(
+        "--keep-checkpoints",
+        type=int,
+        default=None,
+        help="Keep only the last N checkpoints plus the best one by average score (default: keep all)",
+    )
     parser.add_argument("--batch-size", type=int, default=default_batch_size, help="Batch size for training")
     parser.add_argument("--max-steps", type=int, default=default_max_steps, help="Maximum steps per episode")
     parser.add_argument(
         "--timeout", type=int, default=default_timeout, help="Timeout multiplier for steps without food"
     )
+    parser.add_argument("--n-step", type=int, default=1, help="Number of steps aggregated into each replay target")
+    parser.add_argument(
+        "--target-score",
+        type=float,
+        default=None,
+        help="Report the first episode at which the 100-episode average reaches this score",
+    )
     parser.add_argument(
         "--continue",
         dest="continue_training",
@@ -52,6 +66,13 @@ def parse_args():
         help="Start with a fresh model, ignoring any existing one",
     )
     parser.set_defaults(continue_training=True)
+    parser.add_argument(
+        "--dataset", type=str, default=None, help="Offline transition dataset used to pre-fill replay memory"
+    )
+    parser.add_argument(
+        "--pretrain-epochs", type=int, default=0, help="Passes of offline training over --dataset before training"
+    )
+    add_profiler_arguments(parser)
     return parser.parse_args()
 
 
@@ -85,6 +106,12 @@ def main():
         render_freq=args.render_freq,
         timeout_multiplier=args.timeout,
         continue_training=args.continue_training,
+        n_step=args.n_step,
+        target_score=args.target_score,
+        keep_checkpoints=args.keep_checkpoints,
+        profiler=PhaseProfiler.from_args(args),
+        dataset=args.dataset,
+        pretrain_epochs=args.pretrain_epochs,
     )
 
     # Start training
@@ -4,16 +4,26 @@ Snake Game Agent - Visual Training Entry Point
 Trains the RL agent to play snake game with web-based visualization
 """
 import argparse
+import asyncio
+import json
 import os
 import platform
 import threading
 import time
 
 import numpy as np
-from flask import Flask, jsonify, render_template, request
+import pygame
+from flask import Flask, Response, jsonify, render_template, request
 
+from agent.downsample import DownsampledSeries, SeriesTail
+from agent.metrics_log import iter_metrics_log
+from agent.profiler import PhaseProfiler, PhaseStats, add_profiler_arguments
 from agent.trainer import SnakeTrainer
-from game.snake import SnakeGame
+from agent.training_state import write_training_state
+from game.asgi import AsgiApp, LoopSignal, serve
+from game.frames import FrameEncoder
+from game.metrics import RequestMetrics, metrics_response
+from game.snake import SnakeGame, draw_game
 
 # Initialize Flask app
 app = Flask(
@@ -23,6 +33,10 @@ app = Flask(
 )
 app.config["SECRET_KEY"] = "snakegamevisualsecret!"
 
+# Latency of every request, by route, for /metrics
+request_metrics = RequestMetrics()
+request_metrics.install(app)
+
 # Global state to track training
 training_state = {
     "running": False,
@@ -36,27 +50,224 @@ training_state = {
     "total_steps": 0,
     "timeouts": 0,
     "game_state": None,
-    "frame_base64": None,
-    "losses": [],
-    "scores": [],
-    "avg_scores": [],
-    "epsilons": [],
+    "frame_version": 0,  # Of the game view served by /api/frame
     "last_update": time.time(),
     "log_messages": [],  # Queue for log messages
+    "log_seq": 0,  # Sequence number of the newest log message
 }
 
+# Per-episode series, sent to dashboards from a cursor. Only their newest
+# points are kept in memory; the chart's are also downsampled over the whole
+# run for /api/series, and the metrics log has every point.
+CHART_SERIES = ("scores", "avg_scores", "epsilons")
+series = {**{name: DownsampledSeries() for name in CHART_SERIES}, "losses": SeriesTail()}
+
+# Most points /api/series returns per series
+MAX_CHART_POINTS = 5000
+
 # Max number of log messages to keep
 MAX_LOG_MESSAGES = 100
 
+# Seconds a state stream waits for an update before sending a keep-alive
+STREAM_KEEPALIVE = 15.0
+
+# Most game view frames rendered per second for the dashboard
+MAX_FRAME_RATE = 20
+
+# Seconds after its last /api/state request a polling dashboard still counts as connected
+POLL_WINDOW = 2.0
+
+
+class StateFeed:
+    """
+    Tells state streams that the training thread updated training_state.
+    Streams send state_delta() events from their own cursor; each version's
+    event for a cursor is serialized once, so every client that is caught up
+    (all on the same cursor) writes the same bytes. Threaded-server streams
+    wait on the condition, asyncio-server streams on a LoopSignal notified
+    from the training thread.
+    """
+
+    def __init__(self):
+        self.condition = threading.Condition()
+        self.version = 0
+        self.signal = None
+        self.streams = 0  # Open state streams
+        self._events = (None, {})  # (version, {cursor: (event, next cursor)})
+
+    def publish(self):
+        with self.condition:
+            self.version += 1
+            self.condition.notify_all()
+        if self.signal:
+            self.signal.notify()
+
+    def wait(self, last_version, timeout=STREAM_KEEPALIVE):
+        """Wait for a version newer than last_version; returns the current version."""
+        with self.condition:
+            self.condition.wait_for(lambda: self.version != last_version, timeout)
+            return self.version
+
+    def event(self, cursor):
+        """(version, the state_delta from cursor as an event, the cursor after it), serialized once per version."""
+        version = self.version
+        if self._events[0] != version:
+            self._events = (version, {})
+        events = self._events[1]
+        cached = events.get(cursor)
+        if cached is None:
+            delta = state_delta(*cursor)
+            cached = events[cursor] = (
+                b"data: " + json.dumps(delta).encode() + b"\n\n",
+                (delta["series"]["next"], delta["log_seq"]),
+            )
+        return version, *cached
+
+    def open_stream(self, delta):
+        with self.condition:
+            self.streams += delta
+
+    def loop_signal(self, loop):
+        with self.condition:
+            if self.signal is None:
+                self.signal = LoopSignal(loop, STREAM_KEEPALIVE)
+            return self.signal
+
+
+state_feed = StateFeed()
+
+
+def state_delta(series_since=0, log_since=0):
+    """
+    The training state for a dashboard that has the first series_since points
+    of each series and the log messages up to sequence number log_since: the
+    current statistics, only the newer points (from "start", no older than
+    the tail kept in memory) and messages, and the version of the game view
+    (fetched from /api/frame when it changes). Its size doesn't grow with the
+    length of the run.
+    """
+    delta = {
+        key: value for key, value in training_state.items() if key not in ("log_messages", "log_seq", "last_update")
+    }
+    # Series are appended one after the other by the training thread; only send complete points
+    series_next = min(len(values) for values in series.values())
+    start = min(max(series_since, *(values.first for values in series.values())), series_next)
+    delta["series"] = {
+        "start": start,
+        "next": series_next,
+        **{name: values.values(start, series_next) for name, values in series.items()},
+    }
+    delta["logs"] = [message for message in training_state["log_messages"] if message["seq"] > log_since]
+    delta["log_seq"] = delta["logs"][-1]["seq"] if delta["logs"] else log_since
+    return delta
+
+
+def cursor_from_args(args):
+    """(series index, log sequence number) a dashboard passed as ?since= and &log_since=, 0 if missing."""
+    try:
+        return max(0, int(args.get("since", 0))), max(0, int(args.get("log_since", 0)))
+    except ValueError:
+        return 0, 0
+
+
+class FrameCapture:
+    """
+    Renders the dashboard's game view off the training thread. The trainer
+    only puts a snapshot of the game (snake, food, score) in a latest-value
+    slot, a single attribute assignment, so the training loop takes no lock
+    and never waits on rendering. A worker thread wakes MAX_FRAME_RATE times
+    a second and draws and encodes the newest snapshot; snapshots it never
+    got to are overwritten. While no dashboard is connected (no open state
+    stream and no poll within POLL_WINDOW seconds) nothing is snapshotted,
+    rendered or encoded at all.
+    """
+
+    def __init__(self, width, height):
+        self.screen = pygame.Surface((width, height))
+        self.encoder = FrameEncoder()
+        self.slot = None  # (version, snapshot), replaced whole by the training thread
+        self.version = 0
+        self.rendered_version = 0
+        self.frame = None  # Latest encoded frame, served by /api/frame
+        self.polled_at = 0.0
+        self.running = False
+        self.thread = None
+
+        self.rendered = 0
+        self.dropped = 0  # Snapshots replaced before the worker rendered them
+        self.render = PhaseStats()
+        self.encode = PhaseStats()
+        self.frame_size = PhaseStats()  # Encoded bytes per frame
+
+    def start(self):
+        self.running = True
+        self.thread = threading.Thread(target=self._run, name="frame-capture", daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        self.running = False
+        if self.thread:
+            self.thread.join()
+
+    def wanted(self):
+        """Whether any dashboard is looking at the game view."""
+        return state_feed.streams > 0 or time.monotonic() - self.polled_at < POLL_WINDOW
+
+    def publish(self, game):
+        """Offer the game's current state from the training thread."""
+        if not self.wanted():
+            return
+        self.version += 1
+        self.slot = (
+            self.version,
+            (game.grid_size, list(game.snake), game.food, game.score, game.game_over),
+        )
+
+    def _run(self):
+        interval = 1.0 / MAX_FRAME_RATE
+        while self.running:
+            time.sleep(interval)
+            slot = self.slot
+            if slot is None or slot[0] == self.rendered_version:
+                continue
+            version, snapshot = slot
+            self.dropped += version - self.rendered_version - 1
+            self.rendered_version = version
+
+            start = time.perf_counter_ns()
+            try:
+                screen = draw_game(self.screen, *snapshot)
+                drawn = time.perf_counter_ns()
+                frame = self.encoder.encode(screen)
+            except Exception as e:
+                print(f"Error rendering the game view: {e}")
+                continue
+            self.render.add(drawn - start)
+            self.encode.add(time.perf_counter_ns() - drawn)
+            self.frame_size.add(len(frame))
+            self.rendered += 1
+
+            self.frame = (self.rendered, frame)
+            training_state["frame_version"] = self.rendered
+            state_feed.publish()
+
+
+# The running VisualTrainer, for /metrics
+current_trainer = None
+
 
 def add_log_message(message):
     """Add a log message to the training state"""
-    training_state["log_messages"].append({"timestamp": time.strftime("%H:%M:%S"), "message": message})
+    training_state["log_seq"] += 1
+    training_state["log_messages"].append(
+        {"seq": training_state["log_seq"], "timestamp": time.strftime("%H:%M:%S"), "message": message}
+    )
     # Keep only the last MAX_LOG_MESSAGES
     if len(training_state["log_messages"]) > MAX_LOG_MESSAGES:
         training_state["log_messages"] = training_state["log_messages"][-MAX_LOG_MESSAGES:]
     # Also print to console for debugging
     print(f"[LOG] {message}")
+    state_feed.publish()
 
 
 # Paths for templates and static files
@@ -90,8 +301,86 @@ def index():
 
 @app.route("/api/state")
 def get_state():
-    """Return current training state as JSON"""
-    return jsonify(training_state)
+    """Return the training state as JSON, with the chart points and log messages after ?since= and &log_since="""
+    if current_trainer:
+        current_trainer.frames.polled_at = time.monotonic()
+    return jsonify(state_delta(*cursor_from_args(request.args)))
+
+
+@app.route("/api/series")
+def get_series():
+    """
+    At most ?points= points (default 500) of each chart series, from index
+    ?start= to ?end= (default: all), chosen by LTTB from the downsampled levels;
+    x is the episode number
+    """
+    try:
+        points = min(MAX_CHART_POINTS, max(10, int(request.args.get("points", 500))))
+        start = max(0, int(request.args.get("start", 0)))
+        end = int(request.args.get("end", 0)) or None
+    except ValueError:
+        return jsonify({"status": "error", "message": "start, end and points must be integers"}), 400
+
+    # Only points every chart series has, like state_delta
+    total = min(len(series[name]) for name in CHART_SERIES)
+    end = total if end is None else min(end, total)
+    chart = {}
+    for name in CHART_SERIES:
+        window = series[name].window(start, end, points)
+        chart[name] = {"x": [i + 1 for i, _ in window], "y": [value for _, value in window]}
+    return jsonify({"total": total, "start": start, "end": end, "series": chart})
+
+
+@app.route("/api/frame")
+def get_frame():
+    """The latest game view as an image, revalidated by its frame version (ETag)"""
+    if current_trainer is None or current_trainer.frames.frame is None:
+        return Response(status=204)
+    frames = current_trainer.frames
+    frames.polled_at = time.monotonic()
+    version, frame = frames.frame
+    etag = f"f{version}"
+    if request.if_none_match.contains(etag):
+        response = Response(status=304)
+    else:
+        response = Response(frame, mimetype=frames.encoder.mimetype)
+    response.set_etag(etag)
+    response.headers["Cache-Control"] = "no-cache"
+    return response
+
+
+@app.route("/api/state_stream")
+def state_stream():
+    """Push state deltas as server-sent events whenever the trainer updates the state, from ?since= and &log_since="""
+    cursor = cursor_from_args(request.args)
+
+    def generate():
+        nonlocal cursor
+        state_feed.open_stream(1)
+        try:
+            version = None
+            while True:
+                if state_feed.wait(version) == version:
+                    yield b": keep-alive\n\n"
+                    continue
+                version, event, cursor = state_feed.event(cursor)
+                yield event
+        finally:
+            state_feed.open_stream(-1)
+
+    return Response(generate(), mimetype="text/event-stream", headers={"Cache-Control": "no-cache"})
+
+
+@app.route("/metrics")
+def metrics():
+    """Training and server health in the Prometheus text format"""
+
+    def write(metrics):
+        metrics.gauge("snake_train_state_streams", "Open state streams", state_feed.streams)
+        if current_trainer:
+            current_trainer.write_metrics(metrics)
+
+    return metrics_response(write, request_metrics)
 
 
 @app.route("/api/log", methods=["POST"])
@@ -124,6 +413,33 @@ def control():
     return jsonify({"status": "ok"})
 
 
+def create_asgi_app():
+    """The app for the asyncio server: /api/state_stream runs on the event loop, the other routes are the Flask app."""
+    asgi_app = AsgiApp(app, request_metrics=request_metrics)
+
+    @asgi_app.route("/api/state_stream")
+    async def state_stream_async(request):
+        async def events(cursor):
+            signal = state_feed.loop_signal(asyncio.get_running_loop())
+            state_feed.open_stream(1)
+            try:
+                version = None
+                while True:
+                    if state_feed.version == version:
+                        if not await signal.wait():
+                            yield b": keep-alive\n\n"
+                        continue
+                    version, event, cursor = state_feed.event(cursor)
+                    yield event
+            finally:
+                state_feed.open_stream(-1)
+
+        headers = [("Content-Type", "text/event-stream"), ("Cache-Control", "no-cache")]
+        return 200, headers, events(cursor_from_args(request.args))
+
+    return asgi_app
+
+
 class VisualTrainer(SnakeTrainer):
     """Extended trainer with visualization capabilities"""
 
@@ -139,27 +455,46 @@ class VisualTrainer(SnakeTrainer):
         # Override game to capture frames
         self.game = SnakeGame(max_steps_without_food=self.timeout_multiplier)
 
+        # Always-on counters and histograms for /metrics (the profiler's phases are opt-in)
+        self.env_steps = 0
+        self.replay_steps = 0
+        self.env_steps_per_sec = 0.0  # Over the last finished episode
+        self.replay_steps_per_sec = 0.0
+        self.act_time = PhaseStats()
+        self.replay_time = PhaseStats()
+
+        # The game view is rendered from snapshots on its own thread
+        self.frames = FrameCapture(self.game.width, self.game.height)
+
+    def write_metrics(self, metrics):
+        """Add the training loop's metrics to a MetricsWriter."""
+        metrics.gauge("snake_train_episode", "Current episode", training_state["episode"])
+        metrics.counter("snake_train_env_steps_total", "Environment steps taken", self.env_steps)
+        metrics.counter("snake_train_replay_steps_total", "Experience replay updates", self.replay_steps)
+        metrics.gauge("snake_train_env_steps_per_second", "Env steps/sec over the last episode", self.env_steps_per_sec)
+        metrics.gauge(
+            "snake_train_replay_steps_per_second", "Replay steps/sec over the last episode", self.replay_steps_per_sec
+        )
+        metrics.gauge("snake_train_epsilon", "Exploration rate", self.agent.epsilon)
+        metrics.histogram("snake_train_inference_seconds", "Time for the agent to choose an action", self.act_time)
+        metrics.histogram("snake_train_replay_seconds", "Time for one experience replay update", self.replay_time)
+        frames = self.frames
+        metrics.counter("snake_train_frames_rendered_total", "Dashboard frames rendered", frames.rendered)
+        metrics.counter("snake_train_frames_dropped_total", "Snapshots replaced before rendering", frames.dropped)
+        metrics.histogram("snake_train_render_seconds", "Time to draw a dashboard frame", frames.render)
+        metrics.histogram("snake_train_encode_seconds", "Time to encode a dashboard frame", frames.encode)
+        metrics.histogram("snake_train_frame_bytes", "Encoded dashboard frame size", frames.frame_size, scale=1)
+
     def update_training_state(self, episode, step, info=None):
         """Update the training state for visualization"""
-        import base64
-        import io
-
-        import pygame
+        # The frame is rendered from this snapshot by the FrameCapture thread
+        self.frames.publish(self.game)
 
         # Skip updates if too frequent
         current_time = time.time()
         if current_time - training_state["last_update"] < 0.05:  # Max 20 updates per second
             return
 
-        # Render the current game state to a surface
-        surface = self.game.render()
-
-        # Convert Pygame surface to base64 image
-        buffer = io.BytesIO()
-        pygame.image.save(surface, buffer, "PNG")
-        buffer.seek(0)
-        img_base64 = base64.b64encode(buffer.read()).decode("utf-8")
-
         # Get event information
         if info and info.get("done", False):
             pass  # Empty block instead of removed variable
@@ -188,36 +523,47 @@ class VisualTrainer(SnakeTrainer):
                 "episode": episode + 1,
                 "total_episodes": self.episodes,
                 "score": info.get("score", 0) if info else 0,
-                "avg_score": np.mean(self.scores[-100:]) if self.scores else 0.0,
+                "avg_score": self.metrics.avg_score,
                 "epsilon": self.agent.epsilon,
                 "step": step,
                 "total_steps": self.game.total_steps,
                 "timeouts": self.timeout_count,
-                "frame_base64": img_base64,
                 "last_update": current_time,
             }
         )
-
-        # Update chart data if episode changed
-        if episode >= len(training_state["scores"]):
-            training_state["scores"].append(info.get("score", 0) if info else 0)
-            training_state["avg_scores"].append(np.mean(self.scores[-100:]) if self.scores else 0.0)
-            training_state["epsilons"].append(self.agent.epsilon)
+        state_feed.publish()
 
     def train(self):
         """Train the agent with visualization"""
         print("Starting visual training...")
+        self.frames.start()
         add_log_message("Starting visual training...")
         add_log_message(f"Training for {self.episodes} episodes")
         add_log_message(f"Model will be saved as {self.model_name}")
         print(f"Timeout multiplier: {self.timeout_multiplier}")
         add_log_message(f"Timeout multiplier: {self.timeout_multiplier}")
 
+        # Show the history of a resumed run in the charts
+        if self.start_episode:
+            add_log_message(f"Resuming from episode {self.start_episode}")
+            self.metrics.flush()
+            # Streamed into the series, which keep only what the charts need
+            for record in iter_metrics_log(self.metrics.path):
+                series["scores"].append(record["score"])
+                series["avg_scores"].append(record["avg_score"])
+                series["epsilons"].append(record["epsilon"])
+                series["losses"].append(record["loss"])
+
         # Calculate how often to print progress - handling small episode counts
         print_freq = max(1, self.episodes // 10) if self.episodes > 1 else 1
 
-        for e in range(self.episodes):
+        profiler = self.profiler
+        phase = profiler.phase
+
+        for e in range(self.start_episode, self.episodes):
             episode_start = time.time()
+            episode_env_steps, episode_replay_steps = self.env_steps, self.replay_steps
+            profiler.start_episode(e)
 
             # Reset environment and agent metrics
             state = self.game.reset()
@@ -235,14 +581,22 @@ class VisualTrainer(SnakeTrainer):
                     time.sleep(0.1)
 
                 # Decide action
-                action = self.agent.act(state)
+                with phase("act"):
+                    begin = time.perf_counter_ns()
+                    action = self.agent.act(state)
+                    self.act_time.add(time.perf_counter_ns() - begin)
 
                 # Take action
-                _, reward, done, info = self.game.step(action)
-                next_state = self.game.get_state_for_agent()
+                with phase("step"):
+                    _, reward, done, info = self.game.step(action)
+                self.env_steps += 1
+                with phase("get_state"):
+                    next_state = self.game.get_state_for_agent()
 
-                # Remember experience
-                self.agent.remember(state, action, reward, next_state, done)
+                # Remember experience (the step limit truncates the episode without making it terminal)
+                truncated = step == self.max_steps - 1
+                with phase("remember"):
+                    self.agent.remember(state, action, reward, next_state, done, truncated)
 
                 # Set current state to next state
                 state = next_state
@@ -250,18 +604,24 @@ class VisualTrainer(SnakeTrainer):
                 # Update score
                 score += reward
 
-                # Update visualization
-                self.update_training_state(e, step, info)
+                # Update visualization (the frame is rendered on another thread)
+                with phase("render"):
+                    self.update_training_state(e, step, info)
 
                 # Train the model (experience replay)
                 if len(self.agent.memory) > self.batch_size:
-                    loss = self.agent.replay()
+                    with phase("replay"):
+                        begin = time.perf_counter_ns()
+                        loss = self.agent.replay()
+                        self.replay_time.add(time.perf_counter_ns() - begin)
+                    self.replay_steps += 1
                     episode_loss.append(loss)
 
                 # Control speed of visualization
                 speed = training_state.get("speed", 1.0)
                 if self.render_freq > 0 and e % self.render_freq == 0:
-                    time.sleep(0.1 / speed)  # Adjust wait time based on speed
+                    with phase("throttle"):
+                        time.sleep(0.1 / speed)  # Adjust wait time based on speed
 
                 if done:
                     # Track timeout events
@@ -270,16 +630,21 @@ class VisualTrainer(SnakeTrainer):
                         add_log_message(f"Episode {e + 1} timeout! Total timeouts: {self.timeout_count}")
                     break
 
-            # Store metrics
+            # Store metrics (avg_score is the moving average of the last 100 episodes)
             episode_duration = time.time() - episode_start
-            self.episode_durations.append(episode_duration)
-            self.scores.append(info["score"])
-            avg_score = np.mean(self.scores[-100:])  # Moving average of last 100 episodes
-            self.avg_scores.append(avg_score)
-            self.epsilons.append(self.agent.epsilon)
+            avg_score = self.record_episode(info, episode_loss, episode_duration)
+
+            # Extend the chart series (dashboards only read the points every series has)
+            series["scores"].append(info["score"])
+            series["avg_scores"].append(avg_score)
+            series["epsilons"].append(self.agent.epsilon)
+            series["losses"].append(float(np.mean(episode_loss)) if episode_loss else None)
+            if episode_duration > 0:
+                self.env_steps_per_sec = (self.env_steps - episode_env_steps) / episode_duration
+                self.replay_steps_per_sec = (self.replay_steps - episode_replay_steps) / episode_duration
 
-            if episode_loss:
-                self.losses.append(np.mean(episode_loss))
+            if self.check_target_score(e, avg_score):
+                add_log_message(f"Target average score {self.target_score} reached at episode {e + 1}")
 
             # Print progress periodically
             if (e + 1) % print_freq == 0 or (e + 1) == self.episodes:
@@ -292,18 +657,15 @@ class VisualTrainer(SnakeTrainer):
 
             # Save the model periodically
             if self.save_freq > 0 and (e + 1) % self.save_freq == 0:
-                model_path = f"{self.model_name.replace('.h5', '')}_{e + 1}.h5"
-                self.agent.save(model_path)
-                save_msg = f"Model checkpoint saved to {model_path}"
+                with phase("checkpoint"):
+                    model_path = self.save_checkpoint(e + 1, avg_score)
+                save_msg = f"Saving model checkpoint to {model_path}"
                 print(save_msg)
                 add_log_message(save_msg)
 
-                # Plot and save metrics
-                self.plot_metrics(save=True, episode=e + 1)
-
                 # Print performance stats
                 elapsed = time.time() - self.start_time
-                avg_time_per_episode = elapsed / (e + 1)
+                avg_time_per_episode = elapsed / (e + 1 - self.start_episode)
                 estimated_time_left = avg_time_per_episode * (self.episodes - (e + 1))
                 hours, remainder = divmod(estimated_time_left, 3600)
                 minutes, seconds = divmod(remainder, 60)
@@ -314,8 +676,14 @@ class VisualTrainer(SnakeTrainer):
                     f"Timeout events: {self.timeout_count}/{e + 1} episodes ({(self.timeout_count / (e + 1)) * 100:.1f}%)"
                 )
 
-        # Save the final model
+            profiler.end_episode(e)
+
+        # Finish pending checkpoint writes, then save the final model and run state
+        self.frames.stop()
+        self.checkpoint_writer.close()
         self.agent.save(self.model_name)
+        write_training_state(self.state_dir, self.training_state_snapshot())
+        self.metrics.close()
         print(f"Final model saved to {self.model_name}")
 
         # Plot final metrics
@@ -326,11 +694,16 @@ class VisualTrainer(SnakeTrainer):
         hours, remainder = divmod(total_time, 3600)
         minutes, seconds = divmod(remainder, 60)
 
+        episodes_run = max(1, self.metrics.episodes)
+        session_episodes = max(1, self.metrics.episodes - self.start_episode)
+
         print(f"Total training time: {int(hours)}h {int(minutes)}m {int(seconds)}s")
-        print(f"Average time per episode: {total_time / self.episodes:.2f}s")
+        print(f"Average time per episode: {total_time / session_episodes:.2f}s")
         print(
-            f"Timeout events: {self.timeout_count}/{self.episodes} episodes ({(self.timeout_count / self.episodes) * 100:.1f}%)"
+            f"Timeout events: {self.timeout_count}/{episodes_run} episodes ({(self.timeout_count / episodes_run) * 100:.1f}%)"
         )
+        self.print_target_summary()
+        self.profiler.finish()
 
         # Update training state to indicate completion
         training_state["running"] = False
@@ -362,12 +735,32 @@ def parse_args():
         default=max(5, default_episodes // 10),
         help="Frequency of saving checkpoints during training",
     )
+    parser.add_argument(
+        "--keep-checkpoints",
+        type=int,
+        default=None,
+        help="Keep only the last N checkpoints plus the best one by average score (default: keep all)",
+    )
     parser.add_argument("--batch-size", type=int, default=default_batch_size, help="Batch size for training")
     parser.add_argument("--max-steps", type=int, default=default_max_steps, help="Maximum steps per episode")
     parser.add_argument(
         "--timeout", type=int, default=default_timeout, help="Timeout multiplier for steps without food"
     )
     parser.add_argument("--port", type=int, default=default_port, help="Web server port")
+    parser.add_argument(
+        "--server",
+        type=str,
+        default="threaded",
+        choices=["threaded", "asyncio"],
+        help="Flask's threaded server, or the asyncio server for many open streams (needs uvicorn)",
+    )
+    parser.add_argument("--n-step", type=int, default=1, help="Number of steps aggregated into each replay target")
+    parser.add_argument(
+        "--target-score",
+        type=float,
+        default=None,
+        help="Report the first episode at which the 100-episode average reaches this score",
+    )
     parser.add_argument(
         "--continue",
         dest="continue_training",
@@ -381,11 +774,14 @@ def parse_args():
         help="Start with a fresh model, ignoring any existing one",
     )
     parser.set_defaults(continue_training=True)
+    add_profiler_arguments(parser)
     return parser.parse_args()
 
 
 def main():
     """Main function to run training."""
+    global current_trainer
+
     args = parse_args()
 
     print("Starting Snake Game RL Visual Training...")
@@ -413,13 +809,21 @@ def main():
         timeout_multiplier=args.timeout,
         port=args.port,
         continue_training=args.continue_training,
+        n_step=args.n_step,
+        target_score=args.target_score,
+        keep_checkpoints=args.keep_checkpoints,
+        profiler=PhaseProfiler.from_args(args),
     )
+    current_trainer = trainer
 
     # Start web server in a background thread
     def run_web_server():
         print(f"Starting web server on port {args.port}")
         try:
-            app.run(host="0.0.0.0", port=args.port, debug=False, threaded=True)
+            if args.server == "asyncio":
+                serve(create_asgi_app(), "0.0.0.0", args.port)
+            else:
+                app.run(host="0.0.0.0", port=args.port, debug=False, threaded=True)
         except Exception as e:
             print(f"Error starting server: {e}")
 
@@ -4,11 +4,11 @@ Snake Game Agent - Web Interface Entry Point
 Runs the game in a web browser
 """
 import argparse
-import os
 import socket
 import sys
 import time
 
+from agent.evaluator import find_checkpoints
 from game.webserver import run_web_server
 
 
@@ -22,6 +22,54 @@ def parse_args():
     parser.add_argument(
         "--model", type=str, default="models/snake_dqn.h5", help="Path to the model file for agent mode"
     )
+    parser.add_argument(
+        "--reload-interval",
+        type=float,
+        default=2.0,
+        help="Seconds between checks for a newer checkpoint of the model in agent mode",
+    )
+    parser.add_argument("--fps", type=int, default=10, help="Game ticks per second of every session")
+    parser.add_argument("--max-sessions", type=int, default=500, help="Maximum number of concurrent games")
+    parser.add_argument(
+        "--idle-timeout", type=float, default=60.0, help="Seconds without requests before a game is closed"
+    )
+    parser.add_argument("--max-batch", type=int, default=256, help="Maximum agent observations per forward pass")
+    parser.add_argument(
+        "--max-wait-ms",
+        type=float,
+        default=5.0,
+        help="Milliseconds agent ticks may be held to batch their inference with other games",
+    )
+    parser.add_argument(
+        "--frame-format",
+        type=str,
+        default="png",
+        choices=["png", "jpeg", "webp"],
+        help="Encoding of frames for /frame_stream and the polling routes",
+    )
+    parser.add_argument(
+        "--frame-quality", type=int, default=80, help="JPEG/WebP frame quality (1-100, lower is smaller)"
+    )
+    parser.add_argument(
+        "--png-compress-level",
+        type=int,
+        default=6,
+        choices=range(10),
+        metavar="0-9",
+        help="PNG frame compression level (lower is faster, higher is smaller)",
+    )
+    parser.add_argument(
+        "--server",
+        type=str,
+        default="threaded",
+        choices=["threaded", "asyncio"],
+        help="Flask's threaded server, or the asyncio server for many open streams (needs uvicorn)",
+    )
+    parser.add_argument(
+        "--showcase",
+        action="store_true",
+        help="Run an agent game with --model that any number of spectators can watch at /watch",
+    )
     parser.add_argument(
         "--episodes", type=int, default=1000, help="Number of episodes to train (for train mode in CLI)"
     )
@@ -44,7 +92,7 @@ def main():
     # Validate model path for agent mode
     model_path = None
     if args.mode == "agent":
-        if os.path.exists(args.model):
+        if find_checkpoints(args.model):
             model_path = args.model
             print(f"Using agent model: {model_path}")
         else:
@@ -52,6 +100,14 @@ def main():
             print("Running in human mode instead.")
             args.mode = "human"
 
+    showcase_model = None
+    if args.showcase:
+        if find_checkpoints(args.model):
+            showcase_model = args.model
+            print(f"Showcase game with {showcase_model} at http://localhost:{args.port}/watch")
+        else:
+            print(f"Warning: Model file {args.model} not found, running without a showcase game.")
+
     if args.mode == "human":
         print("Starting Snake game in human mode...")
     elif args.mode == "agent":
@@ -64,7 +120,23 @@ def main():
     while retry_count < max_retries:
         try:
             # Run the web server
-            run_web_server(host="0.0.0.0", port=args.port, mode=args.mode, model_path=model_path)
+            run_web_server(
+                host="0.0.0.0",
+                port=args.port,
+                mode=args.mode,
+                model_path=model_path,
+                reload_interval=args.reload_interval,
+                fps=args.fps,
+                max_sessions=args.max_sessions,
+                idle_timeout=args.idle_timeout,
+                max_batch=args.max_batch,
+                max_wait=args.max_wait_ms / 1000,
+                frame_format=args.frame_format,
+                frame_quality=args.frame_quality,
+                png_compress_level=args.png_compress_level,
+                showcase_model=showcase_model,
+                server=args.server,
+            )
             break
         except OSError as e:
             if "Address already in use" in str(e):
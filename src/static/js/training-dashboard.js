@@ -12,7 +12,16 @@ let lastUpdateTime = null;
 const pollingInterval = 100; // ms between updates
 const isPolling = true;
 let scoreChart;
-let lastProcessedLogCount = 0; // Track how many logs we've already processed
+const chartPoints = 500; // Points drawn per chart series, whatever the number of episodes
+const chartRefreshInterval = 1000; // Min ms between chart refreshes
+let chartWindow = 0; // Episodes shown in the chart (0 = all)
+let chartFetchedAt = 0;
+let chartFetching = false;
+let chartStale = false; // Episodes finished during a chart fetch
+let chartRefreshTimer = null;
+let seriesNext = 0; // Chart points received so far (the server sends the ones after this index)
+let logSeq = 0; // Sequence number of the newest log message received
+let frameVersion = 0; // Version of the game view shown
 
 /**
  * Initialize everything when the page is loaded
@@ -24,8 +33,8 @@ document.addEventListener('DOMContentLoaded', function() {
   // Add event listeners to buttons
   setupEventListeners();
 
-  // Start polling for updates
-  pollForUpdates();
+  // Draw the chart, then receive updates from its end (the history is only fetched downsampled)
+  refreshChart().then(startUpdates);
 
   // Initial log
   logToConsole('Snake Game Training Dashboard v1.1 initialized');
@@ -40,7 +49,6 @@ function initChart() {
   scoreChart = new Chart(ctx, {
     type: 'line',
     data: {
-      labels: [],
       datasets: [{
         label: 'Score',
         data: [],
@@ -64,6 +72,7 @@ function initChart() {
     },
     options: {
       responsive: true,
+      animation: false,
       scales: {
         y: {
           beginAtZero: true,
@@ -82,6 +91,10 @@ function initChart() {
           }
         },
         x: {
+          type: 'linear',
+          ticks: {
+            precision: 0
+          },
           title: {
             display: true,
             text: 'Episode'
@@ -126,6 +139,12 @@ function setupEventListeners() {
     }
   });
 
+  // Chart window selector
+  document.getElementById('chartWindow').addEventListener('change', function() {
+    chartWindow = Number(this.value);
+    refreshChart();
+  });
+
   // Clear console button
   document.getElementById('clearConsole').addEventListener('click', function() {
     document.getElementById('console-content').innerHTML = '';
@@ -148,13 +167,49 @@ function updateSpeed(newSpeed) {
   logToConsole(`Speed changed to ${newSpeed}x`);
 }
 
+/**
+ * Query string asking the server only for chart points and log messages we don't have yet
+ */
+function stateQuery() {
+  return `?since=${seriesNext}&log_since=${logSeq}`;
+}
+
+/**
+ * Receive state updates as server-sent events; poll instead if the stream can't be opened
+ */
+function startUpdates() {
+  if (!window.EventSource) {
+    pollForUpdates();
+    return;
+  }
+
+  const events = new EventSource('/api/state_stream' + stateQuery());
+  events.onmessage = event => {
+    lastUpdateTime = new Date();
+    const connectionStatus = document.getElementById('connection-status');
+    connectionStatus.className = 'connected';
+    connectionStatus.textContent = 'Connected';
+    updateDashboard(JSON.parse(event.data));
+  };
+  events.onerror = () => {
+    const connectionStatus = document.getElementById('connection-status');
+    connectionStatus.className = 'disconnected';
+    connectionStatus.textContent = 'Connection Error';
+    if (events.readyState === EventSource.CLOSED) {
+      // Not a dropped connection (EventSource reconnects by itself) but a refused stream
+      logToConsole('State stream unavailable, polling instead');
+      pollForUpdates();
+    }
+  };
+}
+
 /**
  * Start polling the server for updates
  */
 function pollForUpdates() {
   if (!isPolling) return;
 
-  fetch('/api/state')
+  fetch('/api/state' + stateQuery())
     .then(response => response.json())
     .then(data => {
       lastUpdateTime = new Date();
@@ -198,17 +253,14 @@ setInterval(() => {
  * Process any new log messages
  */
 function processLogMessages(messages) {
-  if (!messages || messages.length === 0) return;
+  // A reconnected stream resends from the cursor it was opened with; skip what we have
+  const newMessages = messages.filter(logMsg => logMsg.seq > logSeq);
+  if (newMessages.length === 0) return;
+  logSeq = newMessages[newMessages.length - 1].seq;
 
   const consoleContent = document.getElementById('console-content');
   const wasAtBottom = consoleContent.scrollHeight - consoleContent.clientHeight <= consoleContent.scrollTop + 5;
 
-  // Get new messages since our last update
-  const newMessages = messages.slice(lastProcessedLogCount);
-
-  // Update our counter
-  lastProcessedLogCount = messages.length;
-
   // Add new messages to the console
   for (const logMsg of newMessages) {
     const logElement = document.createElement('div');
@@ -227,9 +279,10 @@ function processLogMessages(messages) {
  * Update all dashboard elements with new data
  */
 function updateDashboard(data) {
-  // Update game display
-  if (data.frame_base64) {
-    document.getElementById('game-canvas').src = 'data:image/png;base64,' + data.frame_base64;
+  // Update game display (the image is fetched separately, only when it changed)
+  if (data.frame_version && data.frame_version !== frameVersion) {
+    frameVersion = data.frame_version;
+    document.getElementById('game-canvas').src = `/api/frame?v=${frameVersion}`;
   }
 
   // Update statistics
@@ -247,18 +300,68 @@ function updateDashboard(data) {
   document.getElementById('episodeProgress').textContent = `${progress.toFixed(1)}%`;
 
   // Update chart
-  if (data.episode > 0 && data.episode > scoreChart.data.labels.length) {
-    scoreChart.data.labels.push(data.episode);
-    scoreChart.data.datasets[0].data.push(data.score);
-    scoreChart.data.datasets[1].data.push(data.avg_score);
-    scoreChart.data.datasets[2].data.push(data.epsilon);
-    scoreChart.update();
-  }
+  seriesUpdated(data.series);
 
   // Process any new log messages
-  if (data.log_messages && data.log_messages.length > 0) {
-    processLogMessages(data.log_messages);
+  processLogMessages(data.logs);
+}
+
+/**
+ * Redraw the chart when episodes finished, at most once per chartRefreshInterval
+ */
+function seriesUpdated(series) {
+  // A reconnected stream resends from its original cursor
+  if (series.next <= seriesNext) return;
+  seriesNext = series.next;
+  scheduleChartRefresh();
+}
+
+/**
+ * Refresh the chart now, or when chartRefreshInterval has passed since the last refresh
+ */
+function scheduleChartRefresh() {
+  const wait = chartFetchedAt + chartRefreshInterval - Date.now();
+  if (wait <= 0) {
+    refreshChart();
+  } else if (!chartRefreshTimer) {
+    chartRefreshTimer = setTimeout(() => {
+      chartRefreshTimer = null;
+      refreshChart();
+    }, wait);
+  }
+}
+
+/**
+ * Fetch a fixed number of points of the chart window, downsampled by the server, and redraw the chart
+ */
+function refreshChart() {
+  if (chartFetching) {
+    chartStale = true;
+    return Promise.resolve();
   }
+  chartFetching = true;
+  chartFetchedAt = Date.now();
+
+  const start = chartWindow ? Math.max(0, seriesNext - chartWindow) : 0;
+  return fetch(`/api/series?points=${chartPoints}&start=${start}`)
+    .then(response => response.json())
+    .then(data => {
+      seriesNext = Math.max(seriesNext, data.total);
+      const names = ['scores', 'avg_scores', 'epsilons'];
+      names.forEach((name, i) => {
+        const series = data.series[name];
+        scoreChart.data.datasets[i].data = series.x.map((x, j) => ({ x: x, y: series.y[j] }));
+      });
+      scoreChart.update();
+    })
+    .catch(error => logToConsole(`Chart update failed: ${error.message}`))
+    .finally(() => {
+      chartFetching = false;
+      if (chartStale) {
+        chartStale = false;
+        scheduleChartRefresh();
+      }
+    });
 }
 
 /**
@@ -0,0 +1,51 @@
+"""
+Checks for the heuristic path-planning agent
+"""
+
+import os
+import sys
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src"))
+
+from agent.planner_agent import PlannerAgent  # noqa: E402
+from game.snake import DOWN, LEFT, RIGHT, UP, SnakeGame  # noqa: E402
+
+# Offset of the cell behind the head for each direction
+BEHIND = {UP: (0, 1), RIGHT: (-1, 0), DOWN: (0, -1), LEFT: (1, 0)}
+
+
+def _game(snake, direction, food):
+    game = SnakeGame()
+    game.snake = list(snake)
+    game.direction = direction
+    game.update_empty_cells()
+    game.food = food
+    return game
+
+
+def test_short_snake_reaches_food_behind_it():
+    """A snake of length 1 or 2 must turn around instead of reversing (which the game treats as straight)."""
+    for length in (1, 2):
+        for direction, (dx, dy) in BEHIND.items():
+            head = (20, 15)
+            snake = [(head[0] + dx * i, head[1] + dy * i) for i in range(length)]
+            game = _game(snake, direction, (head[0] + dx * 5, head[1] + dy * 5))
+            agent = PlannerAgent(game)
+            for _ in range(20):
+                _, _, done, _ = game.step(agent.act())
+                assert not done, f"length {length}, direction {direction}: crashed at {game.snake[0]}"
+                if game.score:
+                    break
+            assert game.score == 1, f"length {length}, direction {direction}: food not reached"
+
+
+def test_reported_reversal_case():
+    game = _game([(20, 15)], RIGHT, (15, 15))
+    agent = PlannerAgent(game)
+    for _ in range(10):
+        _, _, done, _ = game.step(agent.act())
+        assert not done
+        if game.score:
+            break
+    assert game.score == 1